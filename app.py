@@ -1,10 +1,39 @@
-from flask import Flask, render_template, Response, request, redirect, url_for, jsonify, flash
-import cv2
+from flask import Flask, render_template, Response, request, redirect, url_for, jsonify, flash, abort, send_file, stream_with_context
+import functools
+import json
 import os
 import re
-
-from db import init_db, list_detections, list_sessions
+import shutil
+import time
+
+import metrics
+from broadcast import FrameHub
+from backends import LazyBackend, load_backend
+from cameras import BatchScheduler, CameraRegistry, parse_camera_sources
+from encoder import DEFAULT_LADDER, AdaptiveEncoder, mjpeg_stream
+from export import FORMATS as EXPORT_FORMATS, export_detections
+from db import (
+    RetentionJob,
+    close_writers,
+    flush_writer,
+    get_snapshot,
+    import_snapshot_dir,
+    init_db,
+    list_detections_page,
+    list_rollups,
+    list_sessions,
+    list_snapshot_classes,
+    list_snapshots,
+)
 from detector import DetectionService
+from pipeline import StreamPipeline
+from roi import RegionBackend, RegionPlanner, parse_regions
+from scheduler import InferenceScheduler
+from snapshots import SnapshotWriter
+from stats import RESOLUTIONS, RollingStats
+from sources import open_source
+from thumbnails import ThumbnailCache
+from workers import WorkerPool
 
 app = Flask(__name__)
 app.secret_key = "secret_key"
@@ -20,6 +49,26 @@ def _get_env_int(name, default):
         return default
 
 
+def _get_env_float(name, default):
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+def _get_env_int_list(name, default):
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        return [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        return default
+
+
 def _sanitize_session_name(value):
     if not value:
         return ""
@@ -27,44 +76,256 @@ def _sanitize_session_name(value):
     cleaned = re.sub(r"[^A-Za-z0-9_-]", "", cleaned)
     return cleaned[:40]
 
+
+def _recording_path(path):
+    """``CAMERA_RECORD`` with the start time appended, so a restart never truncates an earlier recording."""
+    stem, ext = os.path.splitext(path)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    candidate, idx = f"{stem}_{stamp}{ext}", 1
+    while os.path.exists(candidate):
+        candidate, idx = f"{stem}_{stamp}_{idx}{ext}", idx + 1
+    return candidate
+
+
 camera = None
+pipeline = None
 running = False
 session_name = None
 
-camera_index = _get_env_int("CAMERA_INDEX", 0)
+camera_source = os.environ.get("CAMERA_SOURCE", str(_get_env_int("CAMERA_INDEX", 0)))
+camera_record = os.environ.get("CAMERA_RECORD") or None
 model_path = os.environ.get("MODEL_PATH", "yolov10n.pt")
+model_backend = os.environ.get("MODEL_BACKEND", "ultralytics")
 snapshot_dir = os.environ.get("SNAPSHOT_DIR", os.path.join("static", "snapshots"))
 db_path = os.environ.get("DETECTION_DB", os.path.join("data", "detections.db"))
 init_db(db_path)
 
+# Started before any other thread so the workers are forked from a quiet process.
+# Neither path waits for the weights: the server comes up at once and ``/ready``
+# reports when the model has loaded and warmed up.
+inference_workers = _get_env_int("INFERENCE_WORKERS", 0)
+model_ready_timeout = _get_env_float("MODEL_READY_TIMEOUT", 30.0)
+worker_pool = None
+if inference_workers > 0:
+    worker_pool = WorkerPool(
+        functools.partial(
+            load_backend, model_backend, model_path, device="cpu", warmup_runs=_get_env_int("MODEL_WARMUP", 1)
+        ),
+        workers=inference_workers,
+    ).start(wait=False)
+    model = worker_pool
+else:
+    model = LazyBackend(
+        functools.partial(load_backend, model_backend, model_path, device="cpu"),
+        warmup_runs=_get_env_int("MODEL_WARMUP", 1),
+    ).start()
+
+# Hamming distance (of 64 bits) under which a snapshot repeats a recent one; -1 keeps every image.
+snapshot_dedup_distance = _get_env_int("SNAPSHOT_DEDUP_DISTANCE", -1)
+snapshot_writer = SnapshotWriter(
+    snapshot_dir,
+    workers=_get_env_int("SNAPSHOT_WORKERS", 2),
+    queue_size=_get_env_int("SNAPSHOT_QUEUE_SIZE", 8),
+    drop_policy=os.environ.get("SNAPSHOT_DROP_POLICY", "drop_oldest"),
+    db_path=db_path,
+    mode=os.environ.get("SNAPSHOT_MODE", "frame"),
+    crop_padding=_get_env_float("SNAPSHOT_CROP_PADDING", 0.15),
+    frame_sample_seconds=_get_env_float("SNAPSHOT_FRAME_SAMPLE", 60.0),
+    dedup_distance=snapshot_dedup_distance if snapshot_dedup_distance >= 0 else None,
+    dedup_recent=_get_env_int("SNAPSHOT_DEDUP_RECENT", 8),
+    dedup_keys=_get_env_int("SNAPSHOT_DEDUP_KEYS", 256),
+)
+
+def _remove_session_snapshots(sessions):
+    for name in sessions:
+        if _sanitize_session_name(name) == name:
+            shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
+
+
+retention_days = _get_env_float("RETENTION_DAYS", 0.0)
+retention_job = None
+if retention_days > 0:
+    retention_job = RetentionJob(
+        retention_days,
+        interval=_get_env_int("RETENTION_INTERVAL", 3600),
+        on_pruned=_remove_session_snapshots,
+        db_path=db_path,
+    ).start()
+
+thumbnail_cache = ThumbnailCache(
+    os.environ.get("THUMBNAIL_DIR", os.path.join("data", "thumbnails")),
+    max_bytes=_get_env_int("THUMBNAIL_CACHE_MB", 256) * 1024 * 1024,
+)
+SNAPSHOT_PAGE_SIZE = 24
+
+inference_budget_ms = _get_env_float("INFERENCE_BUDGET_MS", 0.0)
+
+
+def _make_scheduler():
+    return InferenceScheduler(
+        motion_threshold=_get_env_float("MOTION_THRESHOLD", 4.0),
+        max_skip=_get_env_int("MOTION_MAX_SKIP", 30),
+        imgsz_ladder=_get_env_int_list("IMGSZ_LADDER", []),
+        frame_budget=inference_budget_ms / 1000 if inference_budget_ms > 0 else None,
+    )
+
+
+scheduler = _make_scheduler()
+stats_flush_interval = _get_env_float("STATS_FLUSH_INTERVAL", 60.0)
+
 detector = DetectionService(
     model_path=model_path,
     device="cpu",
+    backend=model,
     output_dir=snapshot_dir,
     db_path=db_path,
+    snapshot_writer=snapshot_writer,
+    track_iou=_get_env_float("TRACK_IOU_THRESHOLD", 0.5),
+    track_max_age=_get_env_int("TRACK_MAX_AGE", 30),
+    scheduler=scheduler,
+    stats_flush_interval=stats_flush_interval,
 )
+SSE_KEEPALIVE = _get_env_float("SSE_KEEPALIVE", 15.0)
+stream_jpeg_quality = _get_env_int("STREAM_JPEG_QUALITY", 80)
+STREAM_LADDER = ((1.0, stream_jpeg_quality, None),) + DEFAULT_LADDER[1:]
+stream_adaptive = os.environ.get("STREAM_ADAPTIVE", "1") != "0"
+raw_viewers = set()
 
+roi_tile_size = _get_env_int("ROI_TILE_SIZE", 0)
 
-def generate_frames():
-    global running, camera, session_name
-    while running and camera and camera.isOpened():
-        success, frame = camera.read()
-        if not success:
-            flash("[ERROR] Failed to read from camera.", "error")
-            break
 
-        try:
-            frame = detector.process_frame(frame)
-        except RuntimeError as exc:
-            flash(f"[ERROR] {exc}", "error")
-            break
+def _with_regions(backend, camera_id=None):
+    raw = None
+    if camera_id:
+        raw = os.environ.get("ROI_REGIONS_" + camera_id.upper().replace("-", "_"))
+    if raw is None:
+        raw = os.environ.get("ROI_REGIONS", "")
+    regions = parse_regions(raw)
+    if not regions and not roi_tile_size:
+        return backend
+    planner = RegionPlanner(
+        regions,
+        tile_size=roi_tile_size or None,
+        overlap=_get_env_float("ROI_TILE_OVERLAP", 0.2),
+    )
+    return RegionBackend(backend, planner)
+
+
+batcher = None
+cameras = None
+camera_sources = parse_camera_sources(os.environ.get("CAMERA_SOURCES", ""))
+if camera_sources:
+    # Every stream, including the default one, goes through the batcher so the
+    # weights are loaded once and only one thread ever calls the model.
+    batcher = BatchScheduler(
+        detector.backend,
+        max_batch=_get_env_int("BATCH_MAX_SIZE", 8),
+        max_wait=_get_env_float("BATCH_MAX_WAIT_MS", 10.0) / 1000,
+    ).start()
+    detector.backend = batcher
+    cameras = CameraRegistry(
+        lambda camera_id: DetectionService(
+            backend=_with_regions(batcher, camera_id),
+            output_dir=snapshot_dir,
+            db_path=db_path,
+            snapshot_writer=snapshot_writer,
+            track_iou=_get_env_float("TRACK_IOU_THRESHOLD", 0.5),
+            track_max_age=_get_env_int("TRACK_MAX_AGE", 30),
+            scheduler=_make_scheduler(),
+            stats_flush_interval=stats_flush_interval,
+        ),
+        drop_policy=os.environ.get("PIPELINE_DROP_POLICY", "latest"),
+        jpeg_quality=stream_jpeg_quality,
+        viewer_queue_size=_get_env_int("VIEWER_QUEUE_SIZE", 2),
+    )
+    for camera_id, source in camera_sources:
+        cameras.add(camera_id, source)
+detector.backend = _with_regions(detector.backend)
+
+
+def _make_encoder():
+    level = request.args.get("level", type=int)
+    if level is None and not stream_adaptive:
+        level = 0
+    return AdaptiveEncoder(STREAM_LADDER, raw=request.args.get("raw") == "1", level=level)
+
+
+def _start_pipeline():
+    global pipeline
+    if not running or camera is None or not camera.isOpened():
+        return None
+    if pipeline is not None and pipeline.running:
+        return pipeline
+    # ``RegionBackend`` keeps the pool's submit/result, so test the capability, not identity.
+    pooled = hasattr(detector.backend, "submit")
+    pipeline = StreamPipeline(
+        camera,
+        detector.process_frame,
+        drop_policy=os.environ.get("PIPELINE_DROP_POLICY", "latest"),
+        jpeg_quality=stream_jpeg_quality,
+        publish=hub.publish,
+        submit=detector.submit_frame if pooled else None,
+        in_flight=inference_workers,
+        describe=detector.current_boxes,
+        keep_raw=lambda: bool(raw_viewers),
+    ).start()
+    return pipeline
+
+
+def _stop_pipeline():
+    global pipeline
+    current, pipeline = pipeline, None
+    if current is not None:
+        current.stop()
+
+
+hub = FrameHub(
+    on_active=_start_pipeline,
+    on_idle=_stop_pipeline,
+    queue_size=_get_env_int("VIEWER_QUEUE_SIZE", 2),
+)
+
 
-        ret, buffer = cv2.imencode('.jpg', frame)
-        if not ret:
-            continue
-        frame_bytes = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+def _pipeline_failed():
+    if pipeline is not None and pipeline.error:
+        flash(f"[ERROR] {pipeline.error}", "error")
+        return True
+    return False
+
+
+def generate_frames(encoder):
+    subscriber = hub.subscribe()
+    if encoder.raw:
+        raw_viewers.add(subscriber.id)
+    try:
+        yield from mjpeg_stream(subscriber, encoder, keep_going=lambda: running, failed=_pipeline_failed)
+    finally:
+        raw_viewers.discard(subscriber.id)
+        hub.unsubscribe(subscriber)
+
+
+def _box_events(frame_hub):
+    # Box clients ride along with a video viewer and must not start the camera on their own.
+    subscriber = frame_hub.subscribe(passive=True)
+    try:
+        while not subscriber.closed:
+            packet = subscriber.get(timeout=SSE_KEEPALIVE)
+            if packet is None:
+                yield ": keep-alive\n\n"
+                continue
+            height, width = packet.frame.shape[:2]
+            payload = {"seq": packet.seq, "width": width, "height": height, "boxes": packet.boxes or []}
+            yield f"id: {packet.seq}\ndata: {json.dumps(payload)}\n\n"
+    finally:
+        frame_hub.unsubscribe(subscriber)
+
+
+def _event_stream(events):
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.route('/')
@@ -72,11 +333,28 @@ def index():
     return render_template('index.html')
 
 
+def _wait_for_model():
+    """Give a loading model up to ``MODEL_READY_TIMEOUT`` seconds; an error message if it is not ready."""
+    if model.wait_ready(model_ready_timeout):
+        return None
+    if model.error:
+        return f"Model failed to load: {model.error}"
+    return "Model is still loading; try again shortly."
+
+
 @app.route('/start', methods=['POST'])
 def start():
     global camera, running, session_name
+    error = _wait_for_model()
+    if error:
+        flash(f"[ERROR] {error}", "error")
+        return redirect(url_for('index'))
     if camera is None or not camera.isOpened():
-        camera = cv2.VideoCapture(camera_index)
+        try:
+            camera = open_source(camera_source, record_to=_recording_path(camera_record) if camera_record else None)
+        except ValueError as exc:
+            flash(f"[ERROR] {exc}", "error")
+            return redirect(url_for('index'))
         if not camera.isOpened():
             flash("[ERROR] Failed to open the camera.", "error")
             return redirect(url_for('index'))
@@ -92,28 +370,151 @@ def start():
         flash("[INFO] Session name was normalized for safety.", "info")
     session_name = detector.start_session(cleaned)
     running = True
+    if hub.subscriber_count:
+        _start_pipeline()
     return redirect(url_for('detection', session=session_name))
 
 
 @app.route('/detection')
 def detection():
-    return render_template('detection.html', session_name=session_name)
+    return render_template(
+        'detection.html',
+        session_name=session_name,
+        client_overlay=request.args.get("overlay") == "client",
+    )
 
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    return Response(generate_frames(_make_encoder()), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+
+@app.route('/video_feed/boxes')
+def video_feed_boxes():
+    return _event_stream(_box_events(hub))
 
 
 @app.route('/detections')
 def get_detections():
-    return jsonify(detections=detector.latest_detections)
+    return _detections_response(detector)
+
+
+@app.route('/detections/stream')
+def detections_stream():
+    return _detections_event_stream(detector)
+
+
+def _detections_response(service):
+    _, version, detections = service.detections_since(None)
+    etag = f"v{version}"
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = jsonify(detections=detections, version=version)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _sse_event(kind, version, detections):
+    return f"id: {version}\nevent: {kind}\ndata: {json.dumps(detections)}\n\n"
+
+
+def _detections_event_stream(service):
+    last_event_id = request.headers.get("Last-Event-ID", type=int)
+
+    def generate(version):
+        kind, version, detections = service.detections_since(version)
+        yield "retry: 2000\n\n"
+        if kind is not None:
+            yield _sse_event(kind, version, detections)
+        while True:
+            if not service.wait_for_change(version, timeout=SSE_KEEPALIVE):
+                yield ": keep-alive\n\n"
+                continue
+            kind, version, detections = service.detections_since(version)
+            if kind is not None:
+                yield _sse_event(kind, version, detections)
+
+    return _event_stream(generate(last_event_id))
+
+
+def _get_camera(camera_id):
+    stream = cameras.get(camera_id) if cameras is not None else None
+    if stream is None:
+        abort(404)
+    return stream
+
+
+@app.route('/api/cameras')
+def api_cameras():
+    return jsonify(
+        cameras=cameras.stats() if cameras is not None else [],
+        batching=batcher.stats() if batcher is not None else None,
+    )
+
+
+@app.route('/cameras/<camera_id>/start', methods=['POST'])
+def camera_start(camera_id):
+    stream = _get_camera(camera_id)
+    error = _wait_for_model()
+    if error:
+        return jsonify(error=error), 503
+    session_input = request.form.get("session_name") or request.args.get("session_name")
+    cleaned = _sanitize_session_name(session_input)
+    if session_input and not cleaned:
+        return jsonify(error="Session name must use letters, numbers, hyphens, or underscores."), 400
+    try:
+        session = stream.start(cleaned)
+    except RuntimeError as exc:
+        return jsonify(error=str(exc)), 503
+    return jsonify(camera=camera_id, session=session)
+
+
+@app.route('/cameras/<camera_id>/stop', methods=['POST'])
+def camera_stop(camera_id):
+    stream = _get_camera(camera_id)
+    stream.stop()
+    snapshot_writer.flush(timeout=5)
+    flush_writer(db_path)
+    return jsonify(camera=camera_id, session=stream.session_name)
+
+
+@app.route('/cameras/<camera_id>/video_feed')
+def camera_video_feed(camera_id):
+    stream = _get_camera(camera_id)
+    return Response(stream.mjpeg_frames(_make_encoder()), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+
+@app.route('/cameras/<camera_id>/video_feed/boxes')
+def camera_video_feed_boxes(camera_id):
+    return _event_stream(_box_events(_get_camera(camera_id).hub))
+
+
+@app.route('/cameras/<camera_id>/detections')
+def camera_detections(camera_id):
+    return _detections_response(_get_camera(camera_id).service)
+
+
+@app.route('/cameras/<camera_id>/detections/stream')
+def camera_detections_stream(camera_id):
+    return _detections_event_stream(_get_camera(camera_id).service)
+
+
+@app.route('/cameras/<camera_id>/stats')
+def camera_stats(camera_id):
+    return _stats_response(_get_camera(camera_id).service)
 
 
 @app.route('/stop', methods=['POST'])
 def stop():
     global running, camera
     running = False
+    _stop_pipeline()
+    hub.close_all()
+    detector.flush_stats(block=True)
+    snapshot_writer.flush(timeout=5)
+    flush_writer(db_path)
     flash("[INFO] Detection stopped. You can now view session snapshots.", "info")
     if camera and camera.isOpened():
         camera.release()
@@ -121,32 +522,85 @@ def stop():
     return redirect(url_for('detection', session=session_name))
 
 
+def _snapshot_payload(row):
+    return {
+        "id": row["id"],
+        "class_name": row["class_name"],
+        "created_at": row["created_at"],
+        "size_bytes": row["size_bytes"],
+        "url": url_for('static', filename=f'snapshots/{row["path"]}'),
+        "thumbnail_url": url_for('snapshot_thumbnail', snapshot_id=row["id"]),
+        "frame_url": url_for('static', filename=f'snapshots/{row["frame_path"]}') if row["frame_path"] else None,
+    }
+
+
 @app.route('/snapshots')
 def snapshots():
     session = request.args.get("session")
     if not session:
         flash("[ERROR] Session is required to view snapshots.", "error")
         return redirect(url_for('index'))
-    session_dir = os.path.join(detector.output_dir, session)
-    snapshots = {}
 
-    if not os.path.exists(session_dir):
-        flash(f"[ERROR] Session '{session}' not found.", "error")
-        return redirect(url_for('index'))
+    classes = list_snapshot_classes(session, db_path=db_path)
+    if not classes:
+        session_dir = os.path.join(detector.output_dir, session)
+        if _sanitize_session_name(session) != session or not os.path.isdir(session_dir):
+            flash(f"[ERROR] Session '{session}' not found.", "error")
+            return redirect(url_for('index'))
+        import_snapshot_dir(session, session_dir, db_path=db_path)
+        classes = list_snapshot_classes(session, db_path=db_path)
 
-    for cls in os.listdir(session_dir):
-        class_path = os.path.join(session_dir, cls)
-        if os.path.isdir(class_path):
-            images = [
-                url_for('static', filename=f'snapshots/{session}/{cls}/{img}')
-                for img in os.listdir(class_path)
-                if img.lower().endswith(('.jpg', '.png'))
-            ]
-            snapshots[cls] = images
+    snapshots = {}
+    for entry in classes:
+        rows = list_snapshots(session, entry["class_name"], limit=SNAPSHOT_PAGE_SIZE, db_path=db_path)
+        snapshots[entry["class_name"]] = {
+            "total": entry["total"],
+            "images": [_snapshot_payload(row) for row in rows],
+            "next_cursor": rows[-1]["id"] if len(rows) == SNAPSHOT_PAGE_SIZE else None,
+        }
 
     return render_template('snapshots.html', session=session, snapshots=snapshots)
 
 
+@app.route('/snapshots/<int:snapshot_id>/thumbnail')
+def snapshot_thumbnail(snapshot_id):
+    row = get_snapshot(snapshot_id, db_path=db_path)
+    if row is None:
+        abort(404)
+    thumb_path = thumbnail_cache.get(snapshot_id, os.path.join(detector.output_dir, row["path"]))
+    if thumb_path is None:
+        abort(404)
+    return send_file(os.path.abspath(thumb_path), mimetype="image/jpeg", max_age=86400)
+
+
+@app.route('/api/snapshots')
+def api_snapshots():
+    session = request.args.get("session")
+    if not session:
+        return jsonify(error="session query parameter is required"), 400
+    limit = min(request.args.get("limit", SNAPSHOT_PAGE_SIZE, type=int), 500)
+    cursor = request.args.get("cursor", type=int)
+    rows = list_snapshots(
+        session,
+        class_name=request.args.get("class"),
+        before_id=cursor,
+        limit=limit,
+        db_path=db_path,
+    )
+    return jsonify(
+        snapshots=[_snapshot_payload(row) for row in rows],
+        next_cursor=rows[-1]["id"] if len(rows) == limit else None,
+    )
+
+
+@app.route('/api/snapshots/stats')
+def api_snapshot_stats():
+    session = request.args.get("session") or session_name
+    if not session:
+        return jsonify(error="session query parameter is required"), 400
+    return jsonify(session=session, **snapshot_writer.session_stats(session))
+
+
 @app.route('/api/sessions')
 def api_sessions():
     return jsonify(sessions=list_sessions(db_path=db_path))
@@ -158,20 +612,130 @@ def api_detections():
     if not session:
         return jsonify(error="session query parameter is required"), 400
     limit = _get_env_int("DETECTIONS_LIMIT", 100)
-    return jsonify(detections=list_detections(session, limit=limit, db_path=db_path))
+    limit = max(1, min(request.args.get("limit", limit, type=int), 1000))
+    try:
+        rows, next_cursor = list_detections_page(
+            session, limit=limit, cursor=request.args.get("cursor"), db_path=db_path
+        )
+    except ValueError:
+        return jsonify(error="invalid cursor"), 400
+    return jsonify(detections=rows, next_cursor=next_cursor)
+
+
+@app.route('/api/export')
+def api_export():
+    """Stream every matching detection of a session as NDJSON or CSV, optionally gzipped."""
+    session = request.args.get("session")
+    if not session:
+        return jsonify(error="session query parameter is required"), 400
+    fmt = request.args.get("format", "ndjson")
+    compress = request.args.get("gzip", "0") != "0"
+    classes = [name for name in request.args.get("class", "").split(",") if name]
+    try:
+        chunks = export_detections(
+            session,
+            fmt=fmt,
+            start=request.args.get("start"),
+            end=request.args.get("end"),
+            class_names=classes,
+            compress=compress,
+            db_path=db_path,
+        )
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+    filename = f"{_sanitize_session_name(session) or 'detections'}.{fmt}" + (".gz" if compress else "")
+    return Response(
+        stream_with_context(chunks),
+        mimetype="application/gzip" if compress else EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.route('/api/stats')
+def api_stats():
+    return _stats_response(detector)
+
+
+def _stats_response(service):
+    """Per-class counts, confidence and occupancy for a session.
+
+    The live session is served from the service's in-memory rings; any other
+    session is rebuilt from its minute rollups in the database.
+    """
+    resolution = request.args.get("resolution", "second")
+    if resolution not in RESOLUTIONS:
+        return jsonify(error="resolution must be 'second' or 'minute'"), 400
+    window = max(1, min(request.args.get("window", 60, type=int), 1440))
+    session = request.args.get("session") or service.session_name
+    if not session:
+        return jsonify(error="session query parameter is required"), 400
+
+    if session == service.session_name:
+        stats, now, source = service.stats, None, "memory"
+    else:
+        resolution = "minute"
+        stats = RollingStats.from_rollups(list_rollups(session, minutes=window, db_path=db_path))
+        now, source = stats.latest("minute"), "database"
+        if now is None:
+            return jsonify(error=f"no stats for session '{session}'"), 404
+    payload = stats.summary(resolution, window, now=now)
+    if request.args.get("series", "0") != "0":
+        payload["series"] = stats.series(resolution, window, now=now)
+    return jsonify(session=session, source=source, **payload)
+
+
+@app.route('/api/stream')
+def api_stream():
+    return jsonify(
+        running=running,
+        viewers=hub.stats(),
+        scheduler=scheduler.stats(),
+        pipeline=pipeline.stats() if pipeline is not None else None,
+        cameras=cameras.stats() if cameras is not None else [],
+        workers=worker_pool.stats() if worker_pool is not None else None,
+    )
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    if not metrics.REGISTRY.enabled:
+        return Response("metrics disabled\n", status=404, mimetype="text/plain")
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/ready')
+def ready():
+    """Readiness probe: 200 once the model is loaded and warm, 503 until then."""
+    payload = {"ready": model.ready, "model": model.stats()}
+    return jsonify(payload), 200 if model.ready else 503
 
 
 @app.route('/health')
 def health():
-    return jsonify(status="ok")
+    return jsonify(
+        status="ok",
+        snapshots=snapshot_writer.stats(),
+        thumbnails=thumbnail_cache.stats(),
+        pipeline=pipeline.stats() if pipeline is not None else None,
+        workers=worker_pool.stats() if worker_pool is not None else None,
+    )
 
 
 @app.route('/exit', methods=['POST'])
 def exit_app():
     global running, camera
     running = False
+    _stop_pipeline()
     if camera and camera.isOpened():
         camera.release()
+    detector.flush_stats(block=True)
+    if cameras is not None:
+        cameras.close_all()
+        batcher.stop()
+    if worker_pool is not None:
+        worker_pool.close()
+    snapshot_writer.close(timeout=5)
+    close_writers(timeout=5)
     os._exit(0)
     return "Exited"
 
@@ -0,0 +1,313 @@
+import ast
+import os
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+
+Detections = namedtuple("Detections", ["xyxy", "conf", "cls"])
+
+
+def empty_detections():
+    return Detections(
+        np.zeros((0, 4), dtype=np.float32),
+        np.zeros(0, dtype=np.float32),
+        np.zeros(0, dtype=np.int64),
+    )
+
+
+class InferenceBackend:
+    """Common interface for the model engines behind ``DetectionService``.
+
+    ``predict`` takes a list of BGR frames and returns one ``Detections`` per
+    frame with boxes in that frame's pixel coordinates.
+    """
+
+    name = None
+
+    def __init__(self):
+        self.names = {}
+        self.warmup_seconds = 0.0
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        raise NotImplementedError
+
+    def warmup(self, runs=1, shape=(480, 640, 3)):
+        started = time.perf_counter()
+        frame = np.zeros(shape, dtype=np.uint8)
+        for _ in range(runs):
+            self.predict([frame])
+        self.warmup_seconds = time.perf_counter() - started
+        return self.warmup_seconds
+
+
+class UltralyticsBackend(InferenceBackend):
+    name = "ultralytics"
+
+    def __init__(self, model_path, device="cpu"):
+        super().__init__()
+        from ultralytics import YOLO
+
+        self.device = device
+        self.model = YOLO(model_path).to(device)
+        self.names = self.model.names
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        kwargs = {}
+        if imgsz:
+            kwargs["imgsz"] = imgsz
+        if conf is not None:
+            kwargs["conf"] = conf
+        if iou is not None:
+            kwargs["iou"] = iou
+        results = self.model.predict(
+            source=list(frames), device=self.device, stream=False, verbose=False, **kwargs
+        )
+        return [_from_boxes(result.boxes) for result in results]
+
+
+class OnnxBackend(InferenceBackend):
+    """CPU ONNX Runtime engine for models exported with ``yolo export format=onnx``.
+
+    Handles both end-to-end exports (``[x1, y1, x2, y2, score, class]`` rows, as
+    produced for YOLOv10) and raw ``(4 + classes, anchors)`` heads, which are
+    decoded and filtered with a NumPy NMS.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path, imgsz=640, conf=0.25, iou=0.45, threads=None):
+        super().__init__()
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        height, width = model_input.shape[2:4]
+        self.static_size = (height, width) if isinstance(height, int) and isinstance(width, int) else None
+        self.batched = not isinstance(model_input.shape[0], int) or model_input.shape[0] > 1
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+
+        raw_names = self.session.get_modelmeta().custom_metadata_map.get("names")
+        self.names = ast.literal_eval(raw_names) if raw_names else {}
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        size = self.static_size or (imgsz or self.imgsz,) * 2
+        conf = self.conf if conf is None else conf
+        iou = self.iou if iou is None else iou
+
+        prepared = [letterbox(frame, size) for frame in frames]
+        blob = preprocess([image for image, _, _ in prepared])
+        if self.batched:
+            outputs = self.session.run(None, {self.input_name: blob})[0]
+        else:
+            outputs = np.concatenate(
+                [self.session.run(None, {self.input_name: blob[idx:idx + 1]})[0] for idx in range(len(blob))]
+            )
+
+        detections = []
+        for output, frame, (_, ratio, pad) in zip(outputs, frames, prepared):
+            boxes, scores, classes = decode_output(output, conf, iou)
+            boxes = scale_boxes(boxes, ratio, pad, frame.shape[:2])
+            detections.append(Detections(boxes, scores, classes))
+        return detections
+
+
+BACKENDS = {
+    UltralyticsBackend.name: UltralyticsBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+class LazyBackend:
+    """Builds a backend on a background thread so the server can answer first.
+
+    ``loader`` creates the real backend (e.g. a ``functools.partial`` of
+    ``load_backend``); ``warmup_runs`` synthetic frames then go through it.
+    ``state`` moves from ``loading`` through ``warming`` to ``ready``, or to
+    ``failed`` with ``error`` set. ``predict`` waits for the model, so the
+    facade can be used anywhere a backend is expected.
+    """
+
+    def __init__(self, loader, warmup_runs=0):
+        self.loader = loader
+        self.warmup_runs = warmup_runs
+        self.backend = None
+        self.state = "pending"
+        self.error = None
+        self.load_seconds = None
+        self.ready_seconds = None
+        self._started = None
+        self._done = threading.Event()
+
+    def start(self):
+        self._started = time.monotonic()
+        self.state = "loading"
+        threading.Thread(target=self._load, name="model-loader", daemon=True).start()
+        return self
+
+    @property
+    def names(self):
+        return self.backend.names if self.backend is not None else {}
+
+    @property
+    def warmup_seconds(self):
+        return self.backend.warmup_seconds if self.backend is not None else 0.0
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def wait_ready(self, timeout=None):
+        """True once the model is loaded and warm; False on timeout or failure."""
+        self._done.wait(timeout)
+        return self.ready
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        if not self.wait_ready():
+            raise RuntimeError(f"Model failed to load: {self.error}")
+        return self.backend.predict(frames, imgsz=imgsz, conf=conf, iou=iou)
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "error": self.error,
+            "load_seconds": _rounded(self.load_seconds),
+            "warmup_seconds": _rounded(self.warmup_seconds),
+            "ready_seconds": _rounded(self.ready_seconds),
+        }
+
+    def _load(self):
+        try:
+            backend = self.loader()
+            self.load_seconds = time.monotonic() - self._started
+            self.backend = backend
+            if self.warmup_runs:
+                self.state = "warming"
+                backend.warmup(self.warmup_runs)
+        except Exception as exc:
+            self.error = str(exc)
+            self.state = "failed"
+        else:
+            self.ready_seconds = time.monotonic() - self._started
+            self.state = "ready"
+        finally:
+            self._done.set()
+
+
+def _rounded(seconds):
+    return round(seconds, 3) if seconds is not None else None
+
+
+def load_backend(name, model_path, device="cpu", warmup_runs=0, **kwargs):
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(
+            f"Model file not found at '{model_path}'. Download yolov10n.pt and place it in the root."
+        )
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{name}'. Choose one of: {', '.join(BACKENDS)}.")
+    if name == UltralyticsBackend.name:
+        backend = UltralyticsBackend(model_path, device=device)
+    else:
+        backend = BACKENDS[name](model_path, **kwargs)
+    if warmup_runs:
+        backend.warmup(warmup_runs)
+    return backend
+
+
+def letterbox(frame, size, color=114):
+    """Resize keeping aspect ratio and pad to ``size`` (height, width)."""
+    height, width = frame.shape[:2]
+    target_h, target_w = size
+    ratio = min(target_h / height, target_w / width)
+    new_w, new_h = int(round(width * ratio)), int(round(height * ratio))
+    if (new_w, new_h) != (width, height):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (target_w - new_w) / 2, (target_h - new_h) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    padded = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(color,) * 3)
+    return padded, ratio, (left, top)
+
+
+def preprocess(images):
+    """Stack BGR uint8 images into a normalised RGB NCHW float32 blob."""
+    batch = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+
+def decode_output(output, conf, iou):
+    if output.ndim == 2 and output.shape[-1] == 6:
+        keep = output[:, 4] >= conf
+        rows = output[keep]
+        return rows[:, :4].astype(np.float32), rows[:, 4].astype(np.float32), rows[:, 5].astype(np.int64)
+
+    preds = output.T
+    class_scores = preds[:, 4:]
+    classes = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(preds)), classes]
+    keep = scores >= conf
+    preds, scores, classes = preds[keep], scores[keep], classes[keep]
+
+    cx, cy, w, h = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    keep = batched_nms(boxes, scores, classes, iou)
+    return boxes[keep].astype(np.float32), scores[keep].astype(np.float32), classes[keep].astype(np.int64)
+
+
+def scale_boxes(boxes, ratio, pad, shape):
+    if not len(boxes):
+        return boxes.reshape(0, 4)
+    boxes = boxes.copy()
+    boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad[0]) / ratio
+    boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad[1]) / ratio
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+    return boxes
+
+
+def nms(boxes, scores, iou_threshold):
+    """Indices of boxes kept by greedy non-maximum suppression, best score first."""
+    if not len(boxes):
+        return np.zeros(0, dtype=np.int64)
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        inter_w = (np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest])).clip(0)
+        inter_h = (np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest])).clip(0)
+        inter = inter_w * inter_h
+        union = areas[best] + areas[rest] - inter
+        iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def batched_nms(boxes, scores, classes, iou_threshold):
+    """Class-aware NMS: boxes are offset per class so different classes never overlap."""
+    if not len(boxes):
+        return np.zeros(0, dtype=np.int64)
+    offsets = classes.astype(boxes.dtype)[:, None] * (boxes.max() + 1)
+    return nms(boxes + offsets, scores, iou_threshold)
+
+
+def _from_boxes(boxes):
+    if boxes is None or not len(boxes):
+        return empty_detections()
+    return Detections(
+        boxes.xyxy.cpu().numpy().astype(np.float32),
+        boxes.conf.cpu().numpy().astype(np.float32),
+        boxes.cls.cpu().numpy().astype(np.int64),
+    )
@@ -0,0 +1,306 @@
+import argparse
+import glob
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+import cv2
+
+from backends import BACKENDS, load_backend
+from db import (
+    DEFAULT_DB_PATH,
+    TIMESTAMP_FORMAT,
+    flush_writer,
+    get_batch_progress,
+    get_writer,
+    init_db,
+    update_batch_progress,
+)
+from tracker import IoUTracker
+
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+_END_OF_SOURCE = object()
+_DONE = object()
+
+
+def expand_inputs(inputs):
+    """Resolve files, directories and glob patterns into a sorted list of media files."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, name) for name in sorted(os.listdir(item))]
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            candidates = sorted(glob.glob(item, recursive=True))
+        for path in candidates:
+            if path.lower().endswith(VIDEO_EXTENSIONS + IMAGE_EXTENSIONS) and path not in paths:
+                paths.append(path)
+    return paths
+
+
+def iter_frames(path, start_frame=0, start_time=None):
+    """Yield ``(frame_idx, frame, timestamp)``, stamping each frame with its place in the footage.
+
+    Frames are timed from ``start_time``, or from the file itself when it is
+    ``None``: an image's modification time, or for a video the modification
+    time minus its duration, since the file is finalised when recording ends.
+    """
+    if path.lower().endswith(IMAGE_EXTENSIONS):
+        if start_frame == 0:
+            frame = cv2.imread(path)
+            if frame is not None:
+                yield 0, frame, _format(start_time or datetime.fromtimestamp(os.path.getmtime(path)))
+        return
+
+    capture = cv2.VideoCapture(path)
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        if start_time is None:
+            duration = capture.get(cv2.CAP_PROP_FRAME_COUNT) / fps if fps > 0 else 0.0
+            start_time = datetime.fromtimestamp(os.path.getmtime(path) - duration)
+        if start_frame:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        frame_idx = start_frame
+        while True:
+            success, frame = capture.read()
+            if not success:
+                break
+            offset = frame_idx / fps if fps > 0 else 0.0
+            yield frame_idx, frame, _format(start_time + timedelta(seconds=offset))
+            frame_idx += 1
+    finally:
+        capture.release()
+
+
+def _format(moment):
+    return moment.strftime(TIMESTAMP_FORMAT)
+
+
+class FrameReader:
+    """Decodes sources ahead of inference on a background thread."""
+
+    def __init__(self, sources, prefetch=32, start_times=None):
+        self.sources = sources
+        self.start_times = start_times or {}
+        self.frames = queue.Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="batch-reader", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def __iter__(self):
+        while True:
+            item = self.frames.get()
+            if item is _DONE:
+                return
+            yield item
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self.frames.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            for source, start_frame in self.sources:
+                for frame_idx, frame, timestamp in iter_frames(source, start_frame, self.start_times.get(source)):
+                    if not self._put((source, frame_idx, frame, timestamp)):
+                        return
+                if not self._put((source, _END_OF_SOURCE, None, None)):
+                    return
+        finally:
+            self.frames.put(_DONE)
+
+
+class BatchProcessor:
+    """Runs mini-batched inference over recorded media and records detections.
+
+    Progress is committed per source after the detections of every batch are
+    flushed, so an interrupted run resumes from the last completed batch.
+    Detections are stamped with the frame's time in the footage (see
+    ``iter_frames``), not with the time they were processed; ``start_times``
+    maps a source path to the wall-clock time of its first frame.
+    """
+
+    def __init__(self, backend, session_name, db_path=DEFAULT_DB_PATH, batch_size=8, prefetch=32,
+                 imgsz=640, conf=0.25, start_times=None):
+        self.backend = backend
+        self.session_name = session_name
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.prefetch = prefetch
+        self.imgsz = imgsz
+        self.conf = conf
+        self.start_times = start_times or {}
+        self.frames_processed = 0
+        self.detections = 0
+        self._trackers = {}
+
+    def run(self, paths):
+        progress = get_batch_progress(self.session_name, db_path=self.db_path)
+        sources = []
+        for path in paths:
+            state = progress.get(path)
+            if state and state["completed"]:
+                continue
+            sources.append((path, state["frames_done"] if state else 0))
+
+        start = time.perf_counter()
+        reader = FrameReader(sources, prefetch=self.prefetch, start_times=self.start_times).start()
+        batch = []
+        finished = []
+        try:
+            for source, frame_idx, frame, timestamp in reader:
+                if frame_idx is _END_OF_SOURCE:
+                    finished.append(source)
+                    if not batch:
+                        finished = self._complete(finished)
+                    continue
+                batch.append((source, frame_idx, frame, timestamp))
+                if len(batch) >= self.batch_size:
+                    self._process(batch)
+                    batch = []
+                    finished = self._complete(finished)
+            self._process(batch)
+            self._complete(finished)
+        finally:
+            reader.stop()
+
+        elapsed = time.perf_counter() - start
+        return {
+            "sources": len(sources),
+            "skipped": len(paths) - len(sources),
+            "frames": self.frames_processed,
+            "detections": self.detections,
+            "seconds": round(elapsed, 2),
+            "fps": round(self.frames_processed / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+    def _process(self, batch):
+        if not batch:
+            return
+        results = self.backend.predict(
+            [frame for _, _, frame, _ in batch],
+            imgsz=self.imgsz,
+            conf=self.conf,
+        )
+        writer = get_writer(self.db_path)
+        last_frames = {}
+        for (source, frame_idx, _, timestamp), detections in zip(batch, results):
+            last_frames[source] = frame_idx
+            if not len(detections.xyxy):
+                continue
+            tracker = self._trackers.setdefault(source, IoUTracker())
+            tracked = tracker.update(detections.xyxy, detections.cls, detections.conf)
+            for cls_id, conf, (_, is_new) in zip(detections.cls, detections.conf, tracked):
+                if not is_new:
+                    continue
+                writer.submit(
+                    self.session_name,
+                    self.backend.names[int(cls_id)],
+                    float(conf) * 100,
+                    timestamp,
+                    block=True,
+                )
+                self.detections += 1
+        self.frames_processed += len(batch)
+        self._save_progress(last_frames, completed=False)
+
+    def _complete(self, sources):
+        if sources:
+            self._save_progress(dict.fromkeys(sources), completed=True)
+            for source in sources:
+                self._trackers.pop(source, None)
+        return []
+
+    def _save_progress(self, last_frames, completed):
+        flush_writer(self.db_path)
+        updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        progress = get_batch_progress(self.session_name, db_path=self.db_path)
+        for source, frame_idx in last_frames.items():
+            frames_done = progress.get(source, {}).get("frames_done", 0)
+            if frame_idx is not None:
+                frames_done = frame_idx + 1
+            update_batch_progress(
+                self.session_name, source, frames_done, completed, updated_at, db_path=self.db_path
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run detection over video files and image folders.")
+    parser.add_argument("inputs", nargs="+", help="Video files, image directories or glob patterns.")
+    parser.add_argument("--session", required=True, help="Session name to record detections under.")
+    parser.add_argument("--model", default=os.environ.get("MODEL_PATH", "yolov10n.pt"))
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=os.environ.get("MODEL_BACKEND", "ultralytics"))
+    parser.add_argument("--db", default=os.environ.get("DETECTION_DB", DEFAULT_DB_PATH))
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--prefetch", type=int, default=32)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument(
+        "--start-time",
+        action="append",
+        default=[],
+        metavar="[PATH=]TIME",
+        help="Wall-clock time of a source's first frame, 'YYYY-MM-DD HH:MM:SS'. Repeat as PATH=TIME for "
+        "several sources; a bare TIME needs a single input file. Other sources use the file's "
+        "modification time, minus the duration for videos.",
+    )
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        parser.error("No video or image files matched the given inputs.")
+
+    start_times = {}
+    for value in args.start_time:
+        path, _, moment = value.rpartition("=")
+        if not path:
+            if len(paths) != 1:
+                parser.error("--start-time without PATH= needs exactly one input file.")
+            path = paths[0]
+        if path not in paths:
+            parser.error(f"--start-time names '{path}', which is not one of the inputs.")
+        try:
+            start_times[path] = datetime.strptime(moment, TIMESTAMP_FORMAT)
+        except ValueError:
+            parser.error("--start-time must look like YYYY-MM-DD HH:MM:SS or PATH=YYYY-MM-DD HH:MM:SS.")
+
+    init_db(args.db)
+    backend = load_backend(args.backend, args.model, device=args.device, warmup_runs=1)
+    processor = BatchProcessor(
+        backend,
+        args.session,
+        db_path=args.db,
+        batch_size=args.batch_size,
+        prefetch=args.prefetch,
+        imgsz=args.imgsz,
+        conf=args.conf,
+        start_times=start_times,
+    )
+    summary = processor.run(paths)
+    print(
+        f"[INFO] Processed {summary['frames']} frames from {summary['sources']} sources "
+        f"({summary['skipped']} already done) in {summary['seconds']}s: "
+        f"{summary['fps']} frames/sec, {summary['detections']} detections."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Hot-path benchmarks that run without a camera or real model weights.
+
+Run from the project root::
+
+    python -m benchmarks.bench --output bench.json
+    python -m benchmarks.bench --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from backends import Detections
+from batch import expand_inputs, iter_frames
+from db import close_writers, flush_writer, get_writer, init_db, list_detections, list_sessions
+from detector import DetectionService
+from pipeline import encode_jpeg, mjpeg_part
+from snapshots import SnapshotWriter
+
+
+class StubBackend:
+    """Stands in for a model: returns ``boxes`` slowly drifting synthetic boxes per frame."""
+
+    def __init__(self, boxes=5, classes=3, latency=0.0, seed=0):
+        self.names = {idx: f"class_{idx}" for idx in range(classes)}
+        self.latency = latency
+        self.warmup_seconds = 0.0
+        rng = np.random.default_rng(seed)
+        top_left = rng.uniform(0, 400, size=(boxes, 2))
+        size = rng.uniform(40, 120, size=(boxes, 2))
+        self._boxes = np.hstack([top_left, top_left + size]).astype(np.float32)
+        self._conf = rng.uniform(0.4, 0.99, size=boxes).astype(np.float32)
+        self._cls = (np.arange(boxes) % classes).astype(np.int64)
+        self._step = 0
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        if self.latency:
+            time.sleep(self.latency)
+        results = []
+        for _ in frames:
+            self._step += 1
+            shift = np.float32(self._step % 5)
+            results.append(Detections(self._boxes + shift, self._conf, self._cls))
+        return results
+
+
+def synthetic_frames(count, width=640, height=480, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    return [np.roll(base, shift=idx * 3, axis=1) for idx in range(count)]
+
+
+def recorded_frames(inputs, count):
+    frames = []
+    for path in expand_inputs(inputs):
+        for _, frame in iter_frames(path):
+            frames.append(frame)
+            if len(frames) >= count:
+                return frames
+    return frames
+
+
+def summarize(name, latencies, items=None, elapsed=None):
+    latencies = np.asarray(latencies, dtype=np.float64) * 1000
+    items = len(latencies) if items is None else items
+    elapsed = latencies.sum() / 1000 if elapsed is None else elapsed
+    return {
+        "name": name,
+        "items": items,
+        "seconds": round(elapsed, 4),
+        "throughput_per_s": round(items / elapsed, 2) if elapsed > 0 else None,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 4) if len(latencies) else None,
+        "p95_ms": round(float(np.percentile(latencies, 95)), 4) if len(latencies) else None,
+        "p99_ms": round(float(np.percentile(latencies, 99)), 4) if len(latencies) else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def bench_process_frame(frames, tmp_dir, boxes):
+    db_path = os.path.join(tmp_dir, "process.db")
+    init_db(db_path)
+    service = DetectionService(
+        backend=StubBackend(boxes=boxes),
+        output_dir=os.path.join(tmp_dir, "process_snapshots"),
+        db_path=db_path,
+    )
+    service.start_session("bench")
+    latencies = []
+    for frame in frames:
+        frame = frame.copy()
+        started = time.perf_counter()
+        service.process_frame(frame)
+        latencies.append(time.perf_counter() - started)
+    service.snapshot_writer.close()
+    return summarize("process_frame", latencies)
+
+
+def bench_record_detection(rows, tmp_dir):
+    db_path = os.path.join(tmp_dir, "record.db")
+    init_db(db_path)
+    writer = get_writer(db_path)
+    base = datetime(2026, 1, 1)
+    latencies = []
+    started = time.perf_counter()
+    for idx in range(rows):
+        detected_at = (base + timedelta(seconds=idx)).strftime("%Y-%m-%d %H:%M:%S")
+        call_started = time.perf_counter()
+        # Blocking submits apply back-pressure instead of dropping rows, so
+        # the read benchmarks below always run over exactly ``rows`` rows.
+        writer.submit(f"session_{idx % 10}", "person", 50.0, detected_at, block=True)
+        latencies.append(time.perf_counter() - call_started)
+    flush_writer(db_path)
+    result = summarize("record_detection", latencies, elapsed=time.perf_counter() - started)
+    result["dropped"] = writer.dropped
+
+    conn = sqlite3.connect(db_path)
+    stored = conn.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+    conn.close()
+    if stored != rows:
+        raise RuntimeError(f"Expected {rows} detections in the benchmark database, found {stored}.")
+    return result, db_path
+
+
+def bench_list_queries(db_path, runs):
+    detection_latencies, session_latencies = [], []
+    for idx in range(runs):
+        started = time.perf_counter()
+        list_detections(f"session_{idx % 10}", limit=100, db_path=db_path)
+        detection_latencies.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        list_sessions(db_path=db_path)
+        session_latencies.append(time.perf_counter() - started)
+    return [
+        summarize("list_detections", detection_latencies),
+        summarize("list_sessions", session_latencies),
+    ]
+
+
+def bench_snapshots(frames, tmp_dir):
+    writer = SnapshotWriter(os.path.join(tmp_dir, "snapshots"), workers=2, queue_size=len(frames))
+    latencies = []
+    started = time.perf_counter()
+    for idx, frame in enumerate(frames):
+        call_started = time.perf_counter()
+        writer.submit(frame, "bench", ["person", "dog"], f"2026-01-01 00_00_{idx:06d}")
+        latencies.append(time.perf_counter() - call_started)
+    writer.close()
+    result = summarize("snapshot_write", latencies, elapsed=time.perf_counter() - started)
+    result["encode_ms_avg"] = writer.stats()["encode_ms_avg"]
+    return result
+
+
+def bench_mjpeg(frames, quality):
+    latencies = []
+    for frame in frames:
+        started = time.perf_counter()
+        mjpeg_part(encode_jpeg(frame, quality))
+        latencies.append(time.perf_counter() - started)
+    return summarize("mjpeg_encode", latencies)
+
+
+def compare(results, baseline):
+    previous = {entry["name"]: entry for entry in baseline["results"]}
+    lines = []
+    for entry in results:
+        old = previous.get(entry["name"])
+        if not old or not old.get("p50_ms") or not entry.get("p50_ms"):
+            continue
+        delta = (entry["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100
+        lines.append(
+            f"{entry['name']:<18} p50 {old['p50_ms']:>9.3f} -> {entry['p50_ms']:>9.3f} ms ({delta:+.1f}%)"
+        )
+    return lines
+
+
+def run(args):
+    if args.frames_from:
+        frames = recorded_frames(args.frames_from, args.frames)
+    else:
+        frames = synthetic_frames(args.frames, args.width, args.height)
+    if not frames:
+        raise SystemExit("No frames available for benchmarking.")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results.append(bench_process_frame(frames, tmp_dir, args.boxes))
+        record_result, db_path = bench_record_detection(args.rows, tmp_dir)
+        results.append(record_result)
+        results.extend(bench_list_queries(db_path, args.query_runs))
+        results.append(bench_snapshots(frames, tmp_dir))
+        results.append(bench_mjpeg(frames, args.jpeg_quality))
+        close_writers()
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {
+            "frames": len(frames),
+            "width": int(frames[0].shape[1]),
+            "height": int(frames[0].shape[0]),
+            "boxes": args.boxes,
+            "rows": args.rows,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the detection hot path.")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--frames-from", nargs="+", help="Video files or image folders to use instead of synthetic frames.")
+    parser.add_argument("--boxes", type=int, default=5, help="Boxes returned by the stub model per frame.")
+    parser.add_argument("--rows", type=int, default=100000, help="Detection rows inserted before querying.")
+    parser.add_argument("--query-runs", type=int, default=50)
+    parser.add_argument("--jpeg-quality", type=int, default=80)
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run to compare against.")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    for entry in report["results"]:
+        print(
+            f"{entry['name']:<18} {entry['throughput_per_s']:>12} /s  "
+            f"p50 {entry['p50_ms']:.3f}  p95 {entry['p95_ms']:.3f}  p99 {entry['p99_ms']:.3f} ms  "
+            f"rss {entry['peak_rss_mb']} MB"
+        )
+    if args.compare:
+        with open(args.compare) as handle:
+            for line in compare(report["results"], json.load(handle)):
+                print(line)
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+
+def _peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere.
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+if __name__ == "__main__":
+    main()
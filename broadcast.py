@@ -0,0 +1,135 @@
+import itertools
+import queue
+import threading
+
+import metrics
+
+
+class Subscriber:
+    """One viewer of a ``FrameHub`` with its own small frame queue.
+
+    When the viewer falls behind the oldest queued frame is discarded, so a
+    slow client skips frames instead of stalling the producer.
+    """
+
+    def __init__(self, subscriber_id, queue_size=2, passive=False):
+        self.id = subscriber_id
+        self.passive = passive
+        self.delivered = 0
+        self.dropped = 0
+        self.closed = False
+        self.encoder = None
+        self._queue = queue.Queue(maxsize=queue_size)
+
+    def get(self, timeout=None):
+        if self.closed:
+            return None
+        try:
+            item = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if item is None:
+            self.closed = True
+            return None
+        self.delivered += 1
+        return item
+
+    def offer(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                    metrics.inc("detector_viewer_frames_dropped_total")
+                except queue.Empty:
+                    pass
+
+    def close(self):
+        self.closed = True
+        self.offer(None)
+
+    def stats(self):
+        offered = self.delivered + self.dropped
+        return {
+            "id": self.id,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "drop_rate": round(self.dropped / offered, 3) if offered else 0.0,
+            "encoder": self.encoder.stats() if self.encoder is not None else None,
+        }
+
+
+class FrameHub:
+    """Fans frames from a single producer out to any number of subscribers.
+
+    ``on_active`` runs when the first subscriber joins and ``on_idle`` when the
+    last one leaves, so the producer only runs while someone is watching.
+    Passive subscribers receive whatever is published but never start or
+    keep the producer running on their own.
+    """
+
+    def __init__(self, on_active=None, on_idle=None, queue_size=2):
+        self.on_active = on_active
+        self.on_idle = on_idle
+        self.queue_size = queue_size
+        self.published = 0
+        self._subscribers = {}
+        self._viewers = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._lifecycle_lock = threading.Lock()
+
+    def subscribe(self, passive=False):
+        with self._lifecycle_lock:
+            subscriber = Subscriber(next(self._ids), self.queue_size, passive)
+            with self._lock:
+                self._subscribers[subscriber.id] = subscriber
+                if not passive:
+                    self._viewers += 1
+                first = not passive and self._viewers == 1
+            if first and self.on_active:
+                self.on_active()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lifecycle_lock:
+            with self._lock:
+                removed = self._subscribers.pop(subscriber.id, None)
+                idle = False
+                if removed is not None and not removed.passive:
+                    self._viewers -= 1
+                    idle = self._viewers == 0
+            if idle and self.on_idle:
+                self.on_idle()
+
+    def publish(self, item):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+            self.published += 1
+        for subscriber in subscribers:
+            subscriber.offer(item)
+
+    def close_all(self):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for subscriber in subscribers:
+            subscriber.close()
+
+    @property
+    def subscriber_count(self):
+        """Subscribers that keep the producer running; passive ones are not counted."""
+        with self._lock:
+            return self._viewers
+
+    def stats(self):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+            published = self.published
+        return {
+            "subscribers": len(subscribers),
+            "published": published,
+            "clients": [subscriber.stats() for subscriber in subscribers],
+        }
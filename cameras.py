@@ -0,0 +1,310 @@
+import re
+import threading
+import time
+from datetime import datetime
+
+import metrics
+from broadcast import FrameHub
+from encoder import mjpeg_stream
+from pipeline import DROP_STALE, StreamPipeline
+from sources import open_source
+
+
+class _Request:
+    __slots__ = ("frame", "imgsz", "result", "error", "done")
+
+    def __init__(self, frame, imgsz):
+        self.frame = frame
+        self.imgsz = imgsz
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class BatchScheduler:
+    """Shares one model between several streams by batching their frames.
+
+    Has the same ``predict`` signature as an inference backend, so every
+    stream's ``DetectionService`` can use it in place of the model. Calls from
+    different threads are queued; a single worker gathers them until every
+    recently active caller has a frame waiting, ``max_batch`` is reached or the
+    oldest frame has waited ``max_wait`` seconds, then runs one batched
+    ``predict`` per input size and hands each caller its own result.
+    """
+
+    def __init__(self, backend, max_batch=8, max_wait=0.01, idle_after=1.0):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.idle_after = idle_after
+        self.batches = 0
+        self.frames = 0
+        self.last_batch_ms = None
+        self._pending = []
+        self._callers = {}
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def names(self):
+        return self.backend.names
+
+    @property
+    def warmup_seconds(self):
+        return self.backend.warmup_seconds
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        if conf is not None or iou is not None or self._thread is None:
+            # Per-call thresholds cannot be shared with other streams' frames.
+            return self.backend.predict(frames, imgsz=imgsz, conf=conf, iou=iou)
+
+        requests = [_Request(frame, imgsz) for frame in frames]
+        with self._cond:
+            self._callers[threading.get_ident()] = time.monotonic()
+            self._pending.extend(requests)
+            self._cond.notify_all()
+        results = []
+        for request in requests:
+            request.done.wait()
+            if request.error is not None:
+                raise request.error
+            results.append(request.result)
+        return results
+
+    def stats(self):
+        with self._cond:
+            active_streams = self._expected(time.monotonic())
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "avg_batch_size": round(self.frames / self.batches, 2) if self.batches else None,
+            "last_batch_ms": self.last_batch_ms,
+            "active_streams": active_streams,
+        }
+
+    def _expected(self, now):
+        # Callers hold ``self._cond``: predict, stats and the batch thread all touch ``_callers``.
+        for ident, seen in list(self._callers.items()):
+            if now - seen > self.idle_after:
+                self._callers.pop(ident, None)
+        return max(1, len(self._callers))
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                if self._stop.is_set():
+                    return None
+                self._cond.wait(0.5)
+            deadline = time.monotonic() + self.max_wait
+            while not self._stop.is_set():
+                now = time.monotonic()
+                wanted = min(self.max_batch, self._expected(now))
+                if len(self._pending) >= wanted or now >= deadline:
+                    break
+                self._cond.wait(deadline - now)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.imgsz, []).append(request)
+
+            started = time.perf_counter()
+            for imgsz, requests in groups.items():
+                try:
+                    results = self.backend.predict([request.frame for request in requests], imgsz=imgsz)
+                except Exception as exc:
+                    for request in requests:
+                        request.error = exc
+                        request.done.set()
+                    continue
+                for request, result in zip(requests, results):
+                    request.result = result
+                    request.done.set()
+            elapsed = time.perf_counter() - started
+            metrics.observe("batch_inference", elapsed)
+            self.batches += 1
+            self.frames += len(batch)
+            self.last_batch_ms = round(elapsed * 1000, 2)
+
+        with self._cond:
+            pending, self._pending = self._pending, []
+        for request in pending:
+            request.error = RuntimeError("Batch scheduler stopped.")
+            request.done.set()
+
+
+class CameraStream:
+    """One camera with its own session, ``DetectionService``, pipeline and viewers."""
+
+    def __init__(
+        self,
+        camera_id,
+        source,
+        service,
+        open_capture=open_source,
+        drop_policy=DROP_STALE,
+        jpeg_quality=80,
+        viewer_queue_size=2,
+    ):
+        self.camera_id = camera_id
+        self.source = source
+        self.service = service
+        self.open_capture = open_capture
+        self.drop_policy = drop_policy
+        self.jpeg_quality = jpeg_quality
+        self.capture = None
+        self.pipeline = None
+        self.running = False
+        self.session_name = None
+        self.raw_viewers = set()
+        self._lock = threading.Lock()
+        self.hub = FrameHub(on_active=self._start_pipeline, on_idle=self._stop_pipeline, queue_size=viewer_queue_size)
+
+    def start(self, session_name=None):
+        if self.capture is None or not self.capture.isOpened():
+            capture = self.open_capture(self.source)
+            if not capture.isOpened():
+                capture.release()
+                raise RuntimeError(f"Failed to open camera '{self.camera_id}'.")
+            self.capture = capture
+        if not session_name:
+            session_name = f"{self.camera_id}_" + datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.session_name = self.service.start_session(session_name)
+        self.running = True
+        if self.hub.subscriber_count:
+            self._start_pipeline()
+        return self.session_name
+
+    def stop(self):
+        self.running = False
+        self._stop_pipeline()
+        self.hub.close_all()
+        self.service.flush_stats(block=True)
+
+    def close(self):
+        self.stop()
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+    def mjpeg_frames(self, encoder):
+        subscriber = self.hub.subscribe()
+        if encoder.raw:
+            self.raw_viewers.add(subscriber.id)
+        try:
+            yield from mjpeg_stream(
+                subscriber,
+                encoder,
+                keep_going=lambda: self.running,
+                failed=lambda: self.pipeline is not None and self.pipeline.error is not None,
+            )
+        finally:
+            self.raw_viewers.discard(subscriber.id)
+            self.hub.unsubscribe(subscriber)
+
+    def stats(self):
+        pipeline = self.pipeline
+        return {
+            "id": self.camera_id,
+            "running": self.running,
+            "session": self.session_name,
+            "viewers": self.hub.stats(),
+            "scheduler": self.service.scheduler.stats() if self.service.scheduler is not None else None,
+            "pipeline": pipeline.stats() if pipeline is not None else None,
+        }
+
+    def _start_pipeline(self):
+        with self._lock:
+            if not self.running or self.capture is None or not self.capture.isOpened():
+                return None
+            if self.pipeline is not None and self.pipeline.running:
+                return self.pipeline
+            self.pipeline = StreamPipeline(
+                self.capture,
+                self.service.process_frame,
+                drop_policy=self.drop_policy,
+                jpeg_quality=self.jpeg_quality,
+                publish=self.hub.publish,
+                describe=self.service.current_boxes,
+                keep_raw=lambda: bool(self.raw_viewers),
+            ).start()
+            return self.pipeline
+
+    def _stop_pipeline(self):
+        with self._lock:
+            current, self.pipeline = self.pipeline, None
+        if current is not None:
+            current.stop()
+
+
+class CameraRegistry:
+    """Named ``CameraStream``s; ``make_service(camera_id)`` wires each to the shared model."""
+
+    def __init__(self, make_service, **stream_options):
+        self.make_service = make_service
+        self.stream_options = stream_options
+        self._streams = {}
+
+    def add(self, camera_id, source):
+        if camera_id in self._streams:
+            raise ValueError(f"Camera '{camera_id}' is already registered.")
+        stream = CameraStream(camera_id, source, self.make_service(camera_id), **self.stream_options)
+        self._streams[camera_id] = stream
+        return stream
+
+    def get(self, camera_id):
+        return self._streams.get(camera_id)
+
+    def ids(self):
+        return list(self._streams)
+
+    def close_all(self):
+        for stream in self._streams.values():
+            stream.close()
+
+    def stats(self):
+        return [stream.stats() for stream in self._streams.values()]
+
+
+def parse_camera_sources(raw):
+    """Parse ``"front=0,door=rtsp://host/stream"`` into ``[(id, source), ...]``.
+
+    Entries without a name are called ``cam<n>``. Sources are anything
+    ``sources.open_source`` accepts; numeric ones become device indexes.
+    """
+    cameras = []
+    for position, part in enumerate(part.strip() for part in (raw or "").split(",")):
+        if not part:
+            continue
+        name, sep, source = part.partition("=")
+        name = name.strip()
+        if not sep or not re.fullmatch(r"[A-Za-z0-9_-]+", name):
+            name, source = f"cam{position}", part
+        source = source.strip()
+        if not name or not source:
+            raise ValueError(f"Invalid camera source entry '{part}'.")
+        cameras.append((name, int(source) if source.isdigit() else source))
+    return cameras
@@ -1,9 +1,138 @@
+import atexit
+import calendar
 import os
+import queue
 import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import metrics
 
 
 DEFAULT_DB_PATH = os.path.join("data", "detections.db")
 
+WRITER_QUEUE_SIZE = 10000
+WRITER_BATCH_SIZE = 200
+WRITER_FLUSH_INTERVAL = 0.5
+# A locked database (a reader or the retention job mid-transaction) is retried with backoff.
+WRITER_RETRIES = 3
+WRITER_RETRY_DELAY = 0.1
+
+_STOP = object()
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_INSERT_STATEMENTS = {
+    "detection": """
+        INSERT INTO detections (session_name, class_name, confidence, detected_at, detected_at_epoch)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    "snapshot": """
+        INSERT OR REPLACE INTO snapshots (session_name, class_name, created_at, path, size_bytes, frame_path)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    "rollup": """
+        INSERT OR REPLACE INTO detection_rollups (
+            session_name, class_name, minute_epoch, count, conf_min, conf_sum, conf_max, frames_present, frames
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+}
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+_UPSERT_SESSION = """
+    INSERT INTO sessions (session_name, first_seen_epoch, last_seen_epoch, last_seen, total)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (session_name) DO UPDATE SET
+        first_seen_epoch = MIN(first_seen_epoch, excluded.first_seen_epoch),
+        last_seen = CASE
+            WHEN excluded.last_seen_epoch >= last_seen_epoch THEN excluded.last_seen
+            ELSE last_seen
+        END,
+        last_seen_epoch = MAX(last_seen_epoch, excluded.last_seen_epoch),
+        total = total + excluded.total
+"""
+
+
+def to_epoch(timestamp):
+    """Seconds since the epoch for a ``TIMESTAMP_FORMAT`` string, read the way SQLite's ``strftime('%s')`` does."""
+    try:
+        return calendar.timegm(time.strptime(timestamp, TIMESTAMP_FORMAT))
+    except (TypeError, ValueError):
+        return calendar.timegm(time.localtime())
+
+
+def _migrate_epoch_columns(conn):
+    conn.execute("ALTER TABLE detections ADD COLUMN detected_at_epoch INTEGER")
+    conn.execute("UPDATE detections SET detected_at_epoch = CAST(strftime('%s', detected_at) AS INTEGER)")
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_detections_session_epoch
+        ON detections (session_name, detected_at_epoch, id)
+        """
+    )
+
+
+def _migrate_sessions_table(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_name TEXT PRIMARY KEY,
+            first_seen_epoch INTEGER NOT NULL,
+            last_seen_epoch INTEGER NOT NULL,
+            last_seen TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_seen ON sessions (last_seen_epoch)")
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO sessions (session_name, first_seen_epoch, last_seen_epoch, last_seen, total)
+        SELECT session_name, MIN(detected_at_epoch), MAX(detected_at_epoch), MAX(detected_at), COUNT(*)
+        FROM detections
+        GROUP BY session_name
+        """
+    )
+
+
+def _migrate_rollups_table(conn):
+    # One row per session, class and minute; class "" holds the minute's frame count.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS detection_rollups (
+            session_name TEXT NOT NULL,
+            class_name TEXT NOT NULL,
+            minute_epoch INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            conf_min REAL,
+            conf_sum REAL NOT NULL,
+            conf_max REAL,
+            frames_present INTEGER NOT NULL,
+            frames INTEGER NOT NULL,
+            PRIMARY KEY (session_name, minute_epoch, class_name)
+        )
+        """
+    )
+
+
+def _migrate_snapshot_frame_path(conn):
+    # Set for crop snapshots: the sampled full frame the crop was cut from.
+    conn.execute("ALTER TABLE snapshots ADD COLUMN frame_path TEXT")
+
+
+# Applied in order; PRAGMA user_version records how many have run.
+MIGRATIONS = [
+    _migrate_epoch_columns,
+    _migrate_sessions_table,
+    _migrate_rollups_table,
+    _migrate_snapshot_frame_path,
+]
+
 
 def init_db(db_path=DEFAULT_DB_PATH):
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
@@ -19,31 +148,279 @@ def init_db(db_path=DEFAULT_DB_PATH):
         )
         """
     )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS batch_progress (
+            session_name TEXT NOT NULL,
+            source TEXT NOT NULL,
+            frames_done INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (session_name, source)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_name TEXT NOT NULL,
+            class_name TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            path TEXT NOT NULL UNIQUE,
+            size_bytes INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_snapshots_session_class
+        ON snapshots (session_name, class_name, id)
+        """
+    )
     conn.commit()
+
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with conn:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
     conn.close()
 
 
+class DetectionWriter:
+    """Writes detection and snapshot rows from a bounded queue on a single background thread.
+
+    Rows are flushed with ``executemany`` once ``batch_size`` rows are pending or
+    ``flush_interval`` seconds have passed since the first pending row. When the
+    queue is full new rows are dropped and counted in ``dropped``. A batch that
+    finds the database locked is retried with backoff; one that still fails is
+    logged and counted in ``failed``.
+    """
+
+    def __init__(
+        self,
+        db_path=DEFAULT_DB_PATH,
+        queue_size=WRITER_QUEUE_SIZE,
+        batch_size=WRITER_BATCH_SIZE,
+        flush_interval=WRITER_FLUSH_INTERVAL,
+    ):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.failed = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="detection-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, session_name, class_name, confidence, detected_at, block=False):
+        row = (session_name, class_name, confidence, detected_at, to_epoch(detected_at))
+        return self._enqueue("detection", row, block)
+
+    def submit_snapshot(self, session_name, class_name, created_at, path, size_bytes, frame_path=None, block=False):
+        row = (session_name, class_name, created_at, path, size_bytes, frame_path)
+        return self._enqueue("snapshot", row, block)
+
+    def submit_rollups(self, session_name, rows, block=False):
+        """Queue minute rollups from ``RollingStats.drain_minutes``; False if any were dropped."""
+        queued = True
+        for row in rows:
+            queued = self._enqueue("rollup", (session_name,) + tuple(row), block) and queued
+        return queued
+
+    def _enqueue(self, kind, row, block):
+        if self._closed:
+            return False
+        try:
+            self._queue.put((kind, row), block=block)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self, timeout=None):
+        if self._closed or not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        pending = []
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is None or item is _STOP or isinstance(item, threading.Event):
+                    self._write_rows(conn, pending)
+                    pending = []
+                    deadline = None
+                    if item is _STOP:
+                        break
+                    if item is not None:
+                        item.set()
+                    continue
+
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(pending) >= self.batch_size:
+                    self._write_rows(conn, pending)
+                    pending = []
+                    deadline = None
+        finally:
+            conn.close()
+
+    def _write_rows(self, conn, rows):
+        if not rows:
+            return
+        by_kind = {}
+        for kind, row in rows:
+            by_kind.setdefault(kind, []).append(row)
+        started = time.perf_counter()
+        for attempt in range(WRITER_RETRIES + 1):
+            try:
+                with conn:
+                    for kind, kind_rows in by_kind.items():
+                        conn.executemany(_INSERT_STATEMENTS[kind], kind_rows)
+                    if "detection" in by_kind:
+                        conn.executemany(_UPSERT_SESSION, _session_deltas(by_kind["detection"]))
+                break
+            except sqlite3.Error as exc:
+                if _is_locked(exc) and attempt < WRITER_RETRIES:
+                    time.sleep(WRITER_RETRY_DELAY * 2 ** attempt)
+                    continue
+                print(f"[ERROR] Dropped {len(rows)} queued rows after a failed write to {self.db_path}: {exc!r}")
+                self.failed += len(rows)
+                metrics.inc("detector_db_rows_failed_total", len(rows))
+                return
+        metrics.observe("db_write", time.perf_counter() - started)
+        metrics.inc("detector_db_rows_written_total", len(by_kind.get("detection", ())))
+        self.written += len(rows)
+
+
+def _is_locked(exc):
+    return isinstance(exc, sqlite3.OperationalError) and "locked" in str(exc)
+
+
+def _session_deltas(rows):
+    deltas = {}
+    for session_name, _, _, detected_at, epoch in rows:
+        delta = deltas.get(session_name)
+        if delta is None:
+            deltas[session_name] = [session_name, epoch, epoch, detected_at, 1]
+            continue
+        delta[1] = min(delta[1], epoch)
+        if epoch >= delta[2]:
+            delta[2] = epoch
+            delta[3] = detected_at
+        delta[4] += 1
+    return list(deltas.values())
+
+
+def get_writer(db_path=DEFAULT_DB_PATH):
+    with _writers_lock:
+        writer = _writers.get(db_path)
+        if writer is None:
+            writer = DetectionWriter(db_path)
+            _writers[db_path] = writer
+        return writer
+
+
+def flush_writer(db_path=DEFAULT_DB_PATH, timeout=None):
+    writer = _writers.get(db_path)
+    if writer is None:
+        return True
+    return writer.flush(timeout)
+
+
+def close_writers(timeout=None):
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close(timeout)
+
+
+atexit.register(close_writers)
+
+
 def record_detection(session_name, class_name, confidence, detected_at, db_path=DEFAULT_DB_PATH):
-    conn = sqlite3.connect(db_path)
-    conn.execute(
+    return get_writer(db_path).submit(session_name, class_name, confidence, detected_at)
+
+
+def record_snapshot(session_name, class_name, created_at, path, size_bytes, db_path=DEFAULT_DB_PATH, frame_path=None):
+    return get_writer(db_path).submit_snapshot(session_name, class_name, created_at, path, size_bytes, frame_path)
+
+
+def record_rollups(session_name, rows, db_path=DEFAULT_DB_PATH, block=False):
+    return get_writer(db_path).submit_rollups(session_name, rows, block=block)
+
+
+def list_rollups(session_name, minutes=None, db_path=DEFAULT_DB_PATH):
+    """Minute rollups of a session, oldest first, in the row shape ``drain_minutes`` produces.
+
+    With ``minutes`` only the last ``minutes`` minutes the session has rows for
+    are returned.
+    """
+    flush_writer(db_path)
+    params = [session_name]
+    since = ""
+    if minutes is not None:
+        since = """
+            AND minute_epoch > (
+                SELECT MAX(minute_epoch) FROM detection_rollups WHERE session_name = ?
+            ) - ?
         """
-        INSERT INTO detections (session_name, class_name, confidence, detected_at)
-        VALUES (?, ?, ?, ?)
+        params.extend([session_name, minutes * 60])
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        f"""
+        SELECT class_name, minute_epoch, count, conf_min, conf_sum, conf_max, frames_present, frames
+        FROM detection_rollups
+        WHERE session_name = ? {since}
+        ORDER BY minute_epoch, class_name
         """,
-        (session_name, class_name, confidence, detected_at),
-    )
-    conn.commit()
+        params,
+    ).fetchall()
     conn.close()
+    return rows
 
 
 def list_sessions(db_path=DEFAULT_DB_PATH):
+    flush_writer(db_path)
     conn = sqlite3.connect(db_path)
     cursor = conn.execute(
         """
-        SELECT session_name, MAX(detected_at) AS last_seen, COUNT(*) AS total
-        FROM detections
-        GROUP BY session_name
-        ORDER BY last_seen DESC
+        SELECT session_name, last_seen, total
+        FROM sessions
+        ORDER BY last_seen_epoch DESC
         """
     )
     rows = [
@@ -55,22 +432,305 @@ def list_sessions(db_path=DEFAULT_DB_PATH):
 
 
 def list_detections(session_name, limit=100, db_path=DEFAULT_DB_PATH):
+    rows, _ = list_detections_page(session_name, limit=limit, db_path=db_path)
+    return rows
+
+
+def list_detections_page(session_name, limit=100, cursor=None, db_path=DEFAULT_DB_PATH):
+    """Newest-first page of detections and the cursor for the next page (``None`` at the end).
+
+    Cursors are ``"<epoch>:<id>"`` strings taken from the last row of the previous
+    page, so each page is an index range scan regardless of how deep it is.
+    """
+    flush_writer(db_path)
+    params = [session_name]
+    keyset = ""
+    if cursor:
+        epoch, row_id = (int(part) for part in cursor.split(":", 1))
+        keyset = "AND (detected_at_epoch, id) < (?, ?)"
+        params.extend([epoch, row_id])
+    params.append(limit)
+    conn = sqlite3.connect(db_path)
+    result = conn.execute(
+        f"""
+        SELECT id, class_name, confidence, detected_at, detected_at_epoch
+        FROM detections
+        WHERE session_name = ? {keyset}
+        ORDER BY detected_at_epoch DESC, id DESC
+        LIMIT ?
+        """,
+        params,
+    ).fetchall()
+    conn.close()
+    rows = [
+        {"class_name": row[1], "confidence": row[2], "timestamp": row[3]}
+        for row in result
+    ]
+    next_cursor = f"{result[-1][4]}:{result[-1][0]}" if len(result) == limit else None
+    return rows, next_cursor
+
+
+def iter_detections(
+    session_name,
+    start_epoch=None,
+    end_epoch=None,
+    class_names=None,
+    chunk_size=1000,
+    db_path=DEFAULT_DB_PATH,
+):
+    """Oldest-first detections of a session, yielded as lists of at most ``chunk_size`` rows.
+
+    The query runs once and rows are pulled with ``fetchmany``, so memory does
+    not grow with the size of the result. ``end_epoch`` is exclusive.
+    """
+    flush_writer(db_path)
+    clauses = ["session_name = ?"]
+    params = [session_name]
+    if start_epoch is not None:
+        clauses.append("detected_at_epoch >= ?")
+        params.append(start_epoch)
+    if end_epoch is not None:
+        clauses.append("detected_at_epoch < ?")
+        params.append(end_epoch)
+    if class_names:
+        clauses.append(f"class_name IN ({', '.join('?' * len(class_names))})")
+        params.extend(class_names)
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute(
+            f"""
+            SELECT id, class_name, confidence, detected_at
+            FROM detections
+            WHERE {" AND ".join(clauses)}
+            ORDER BY detected_at_epoch, id
+            """,
+            params,
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [
+                {
+                    "id": row[0],
+                    "session_name": session_name,
+                    "class_name": row[1],
+                    "confidence": row[2],
+                    "timestamp": row[3],
+                }
+                for row in rows
+            ]
+    finally:
+        conn.close()
+
+
+def prune_sessions(older_than_epoch, batch_size=5000, db_path=DEFAULT_DB_PATH):
+    """Delete sessions last seen before ``older_than_epoch`` and return their names.
+
+    Rows are removed in ``batch_size`` chunks, each in its own short transaction,
+    so the background writer is never blocked for long.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    sessions = [
+        row[0]
+        for row in conn.execute(
+            "SELECT session_name FROM sessions WHERE last_seen_epoch < ?", (older_than_epoch,)
+        ).fetchall()
+    ]
+    for session_name in sessions:
+        for table in ("detections", "snapshots"):
+            while True:
+                with conn:
+                    deleted = conn.execute(
+                        f"""
+                        DELETE FROM {table}
+                        WHERE id IN (SELECT id FROM {table} WHERE session_name = ? LIMIT ?)
+                        """,
+                        (session_name, batch_size),
+                    ).rowcount
+                if deleted < batch_size:
+                    break
+        with conn:
+            conn.execute("DELETE FROM batch_progress WHERE session_name = ?", (session_name,))
+            conn.execute("DELETE FROM detection_rollups WHERE session_name = ?", (session_name,))
+            conn.execute("DELETE FROM sessions WHERE session_name = ?", (session_name,))
+    conn.close()
+    return sessions
+
+
+class RetentionJob:
+    """Periodically prunes sessions older than ``max_age_days`` on a daemon thread."""
+
+    def __init__(self, max_age_days, interval=3600, on_pruned=None, db_path=DEFAULT_DB_PATH):
+        self.max_age_days = max_age_days
+        self.interval = interval
+        self.on_pruned = on_pruned
+        self.db_path = db_path
+        self.pruned = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self):
+        cutoff = calendar.timegm(time.localtime()) - int(self.max_age_days * 86400)
+        sessions = prune_sessions(cutoff, db_path=self.db_path)
+        self.pruned += len(sessions)
+        if sessions and self.on_pruned:
+            self.on_pruned(sessions)
+        return sessions
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except sqlite3.Error:
+                pass
+            self._stop.wait(self.interval)
+
+
+def get_batch_progress(session_name, db_path=DEFAULT_DB_PATH):
     conn = sqlite3.connect(db_path)
     cursor = conn.execute(
         """
-        SELECT class_name, confidence, detected_at
-        FROM detections
+        SELECT source, frames_done, completed
+        FROM batch_progress
         WHERE session_name = ?
-        ORDER BY detected_at DESC
+        """,
+        (session_name,),
+    )
+    progress = {
+        row[0]: {"frames_done": row[1], "completed": bool(row[2])}
+        for row in cursor.fetchall()
+    }
+    conn.close()
+    return progress
+
+
+def update_batch_progress(session_name, source, frames_done, completed, updated_at, db_path=DEFAULT_DB_PATH):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO batch_progress (session_name, source, frames_done, completed, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (session_name, source, frames_done, int(completed), updated_at),
+    )
+    conn.commit()
+    conn.close()
+
+
+def list_snapshots(session_name, class_name=None, before_id=None, limit=50, db_path=DEFAULT_DB_PATH):
+    """Newest-first page of catalogued snapshots; pass the last ``id`` as ``before_id`` for the next page."""
+    flush_writer(db_path)
+    clauses = ["session_name = ?"]
+    params = [session_name]
+    if class_name:
+        clauses.append("class_name = ?")
+        params.append(class_name)
+    if before_id is not None:
+        clauses.append("id < ?")
+        params.append(before_id)
+    params.append(limit)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.execute(
+        f"""
+        SELECT id, class_name, created_at, path, size_bytes, frame_path
+        FROM snapshots
+        WHERE {" AND ".join(clauses)}
+        ORDER BY id DESC
         LIMIT ?
         """,
-        (session_name, limit),
+        params,
     )
     rows = [
-        {"class_name": row[0], "confidence": row[1], "timestamp": row[2]}
+        {
+            "id": row[0],
+            "class_name": row[1],
+            "created_at": row[2],
+            "path": row[3],
+            "size_bytes": row[4],
+            "frame_path": row[5],
+        }
         for row in cursor.fetchall()
     ]
     conn.close()
     return rows
 
 
+def list_snapshot_classes(session_name, db_path=DEFAULT_DB_PATH):
+    flush_writer(db_path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.execute(
+        """
+        SELECT class_name, COUNT(*)
+        FROM snapshots
+        WHERE session_name = ?
+        GROUP BY class_name
+        ORDER BY class_name
+        """,
+        (session_name,),
+    )
+    rows = [{"class_name": row[0], "total": row[1]} for row in cursor.fetchall()]
+    conn.close()
+    return rows
+
+
+def get_snapshot(snapshot_id, db_path=DEFAULT_DB_PATH):
+    conn = sqlite3.connect(db_path)
+    row = conn.execute(
+        "SELECT id, session_name, class_name, created_at, path, size_bytes, frame_path FROM snapshots WHERE id = ?",
+        (snapshot_id,),
+    ).fetchone()
+    conn.close()
+    if row is None:
+        return None
+    return {
+        "id": row[0],
+        "session_name": row[1],
+        "class_name": row[2],
+        "created_at": row[3],
+        "path": row[4],
+        "size_bytes": row[5],
+        "frame_path": row[6],
+    }
+
+
+def import_snapshot_dir(session_name, session_dir, db_path=DEFAULT_DB_PATH):
+    """Catalogue snapshots written before the catalog existed; returns the number of files added."""
+    rows = []
+    for class_name in sorted(os.listdir(session_dir)):
+        class_path = os.path.join(session_dir, class_name)
+        # ``_frames`` holds the full frames sampled for crop snapshots.
+        if class_name.startswith("_") or not os.path.isdir(class_path):
+            continue
+        for name in sorted(os.listdir(class_path)):
+            if not name.lower().endswith((".jpg", ".png")):
+                continue
+            file_path = os.path.join(class_path, name)
+            created_at = datetime.fromtimestamp(os.path.getmtime(file_path)).strftime("%Y-%m-%d %H:%M:%S")
+            rows.append(
+                (
+                    session_name,
+                    class_name,
+                    created_at,
+                    f"{session_name}/{class_name}/{name}",
+                    os.path.getsize(file_path),
+                )
+            )
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO snapshots (session_name, class_name, created_at, path, size_bytes)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+    conn.close()
+    return len(rows)
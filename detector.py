@@ -1,32 +1,66 @@
 import os
+import threading
+import time
+from collections import deque
 from datetime import datetime
 
 import cv2
-from ultralytics import YOLO
 
-from db import record_detection
+import metrics
+from backends import load_backend
+from db import record_detection, record_rollups
+from snapshots import SnapshotWriter
+from stats import RollingStats
+from tracker import IoUTracker
 
 
 class DetectionService:
-    def __init__(self, model_path="yolov10n.pt", device="cpu", output_dir=None, db_path=None):
+    def __init__(
+        self,
+        model_path="yolov10n.pt",
+        device="cpu",
+        output_dir=None,
+        db_path=None,
+        snapshot_writer=None,
+        track_iou=0.5,
+        track_max_age=30,
+        scheduler=None,
+        delta_history=256,
+        stats_flush_interval=60.0,
+        backend="ultralytics",
+        warmup_runs=0,
+    ):
         self.model_path = model_path
         self.device = device
         self.output_dir = output_dir or os.path.join("static", "snapshots")
         self.db_path = db_path
 
-        if not os.path.exists(self.model_path):
-            raise FileNotFoundError(
-                f"Model file not found at '{self.model_path}'. Download yolov10n.pt and place it in the root."
-            )
-
-        self.model = YOLO(self.model_path).to(self.device)
+        if isinstance(backend, str):
+            backend = load_backend(backend, self.model_path, device=self.device, warmup_runs=warmup_runs)
+        self.backend = backend
         self.session_name = None
         self.detection_history = {}
         self.latest_detections = []
+        self.version = 0
+        self.scheduler = scheduler
+        self._last_boxes = []
+        self._changes = deque(maxlen=delta_history)
+        self._state_cond = threading.Condition()
+        self.stats = RollingStats()
+        self.stats_flush_interval = stats_flush_interval
+        self._stats_flushed_at = time.monotonic()
 
         os.makedirs(self.output_dir, exist_ok=True)
+        self.snapshot_writer = snapshot_writer or SnapshotWriter(self.output_dir)
+        self.tracker = IoUTracker(iou_threshold=track_iou, max_age=track_max_age)
+
+    @property
+    def model(self):
+        """The engine's own model object (``YOLO`` for Ultralytics), kept for pre-backend callers."""
+        return getattr(self.backend, "model", self.backend)
 
     def start_session(self, session_name=None):
+        self.flush_stats(block=True)
         cleaned = (session_name or "").strip().replace(" ", "_")
         if cleaned:
             self.session_name = cleaned
@@ -34,47 +68,188 @@ class DetectionService:
             self.session_name = "session_" + datetime.now().strftime("%Y%m%d_%H%M%S")
 
         self.detection_history = {}
-        self.latest_detections = []
+        self.stats = RollingStats()
+        with self._state_cond:
+            self.latest_detections = []
+            self.version += 1
+            # A ``None`` delta tells listeners the state was reset, not patched.
+            self._changes.append((self.version, None))
+            self._state_cond.notify_all()
+        self.tracker.reset()
+        self._last_boxes = []
+        if self.scheduler is not None:
+            self.scheduler.reset()
         return self.session_name
 
     def process_frame(self, frame):
+        if not self._begin_frame(frame):
+            return self._skip_frame(frame)
+
+        started = time.perf_counter()
+        detections = self.backend.predict([frame], imgsz=self._imgsz())[0]
+        return self._finish_frame(frame, detections, time.perf_counter() - started)
+
+    def submit_frame(self, frame):
+        """Start ``frame`` on a backend with ``submit``/``result`` (a ``WorkerPool``).
+
+        Returns a callable that waits for the model and finishes the frame like
+        ``process_frame``. Callers must invoke these in submission order, since
+        tracking and drawing depend on the previous frame.
+        """
+        if not self._begin_frame(frame):
+            return lambda: self._skip_frame(frame)
+
+        ticket = self.backend.submit(frame, imgsz=self._imgsz())
+
+        def complete():
+            detections, elapsed = self.backend.result(ticket)
+            return self._finish_frame(frame, detections, elapsed)
+
+        return complete
+
+    def flush_stats(self, block=False):
+        """Queue the minute rollups changed since the last flush for the summary table.
+
+        Rows the writer queue turns away are marked dirty again and retried on
+        the next flush; pass ``block=True`` when stopping, as there is none.
+        """
+        self._stats_flushed_at = time.monotonic()
+        if not self.session_name or self.db_path is None:
+            return
+        rows = self.stats.drain_minutes()
+        if rows and not record_rollups(self.session_name, rows, db_path=self.db_path, block=block):
+            self.stats.restore_minutes(rows)
+
+    def current_boxes(self):
+        """Boxes drawn on the last processed frame, as JSON-ready dicts."""
+        return [
+            {
+                "box": [int(x1), int(y1), int(x2), int(y2)],
+                "class_name": class_name,
+                "confidence": round(confidence, 1),
+            }
+            for x1, y1, x2, y2, class_name, confidence in self._last_boxes
+        ]
+
+    def _begin_frame(self, frame):
         if not self.session_name:
             raise RuntimeError("Session not started.")
+        metrics.inc("detector_frames_processed_total")
+        return self.scheduler is None or self.scheduler.should_infer(frame)
+
+    def _imgsz(self):
+        return self.scheduler.imgsz if self.scheduler is not None else None
+
+    def _skip_frame(self, frame):
+        # The scheduler reuses the last detections, so the stats count them again
+        # and rollups do not depend on the skip ratio.
+        self.stats.observe([box[4] for box in self._last_boxes], [box[5] for box in self._last_boxes])
+        self._maybe_flush_stats()
+        return self._redraw(frame)
+
+    def _maybe_flush_stats(self):
+        if time.monotonic() - self._stats_flushed_at >= self.stats_flush_interval:
+            self.flush_stats()
+
+    def _redraw(self, frame):
+        with metrics.timer("draw"):
+            for box in self._last_boxes:
+                self._draw_box(frame, *box)
+        return frame
 
-        results = self.model.predict(source=frame, device=self.device, stream=False, verbose=False)[0]
-        boxes = results.boxes
+    def _finish_frame(self, frame, detections, elapsed):
+        metrics.observe("inference", elapsed)
+        if self.scheduler is not None:
+            self.scheduler.record_inference(elapsed)
+        self._last_boxes = []
 
-        if boxes is not None and len(boxes):
-            clss = boxes.cls.cpu().numpy().astype(int)
-            confs = boxes.conf.cpu().numpy()
-            xyxy = boxes.xyxy.cpu().numpy().astype(int)
+        if len(detections.xyxy):
+            clss = detections.cls
+            confs = detections.conf
+            xyxy = detections.xyxy.astype(int)
+            timestamp = self._timestamp_str()
+            new_classes = set()
+            new_boxes = []
+            changed = set()
+            names = []
+            confidences = []
+            metrics.inc("detector_detections_total", len(xyxy))
+            with metrics.timer("track"):
+                tracked = self.tracker.update(xyxy, clss, confs)
 
-            for (box, cls_id, conf) in zip(xyxy, clss, confs):
+            for (box, cls_id, conf, (_, is_new)) in zip(xyxy, clss, confs, tracked):
                 x1, y1, x2, y2 = box
-                class_name = self.model.names[int(cls_id)]
+                class_name = self.backend.names[int(cls_id)]
                 confidence = float(conf) * 100
-                timestamp = self._timestamp_str()
 
-                self._update_history(class_name, confidence, timestamp)
-                self._record_detection(class_name, confidence, timestamp)
-                self._draw_box(frame, x1, y1, x2, y2, class_name, confidence)
-                self._save_snapshot(frame, class_name, timestamp)
+                if self._update_history(class_name, confidence, timestamp):
+                    changed.add(class_name)
+                self._last_boxes.append((x1, y1, x2, y2, class_name, confidence))
+                if is_new:
+                    self._record_detection(class_name, confidence, timestamp)
+                    new_classes.add(class_name)
+                    new_boxes.append((int(x1), int(y1), int(x2), int(y2), class_name))
+                names.append(class_name)
+                confidences.append(confidence)
+            self._redraw(frame)
 
-        self._refresh_latest_detections()
+            if new_classes:
+                with metrics.timer("snapshot_submit"):
+                    self._save_snapshot(frame, new_classes, timestamp, new_boxes)
+            if changed:
+                self._publish_changes(changed)
+            self.stats.observe(names, confidences)
+        else:
+            self.tracker.update([], [])
+            self.stats.observe([], [])
+        self._maybe_flush_stats()
         return frame
 
+    def detections_since(self, version=None):
+        """Changes after ``version`` as ``(kind, version, detections)``.
+
+        ``kind`` is ``"delta"`` when only the changed entries are returned,
+        ``"full"`` when the caller has to replace its whole list (no or unknown
+        version, or a session reset since then) and ``None`` when up to date.
+        """
+        with self._state_cond:
+            if version == self.version:
+                return None, self.version, []
+            oldest = self._changes[0][0] if self._changes else self.version + 1
+            if version is None or version > self.version or version < oldest - 1:
+                return "full", self.version, list(self.latest_detections)
+            merged = {}
+            for change_version, entries in self._changes:
+                if change_version <= version:
+                    continue
+                if entries is None:
+                    return "full", self.version, list(self.latest_detections)
+                for entry in entries:
+                    merged[entry["index"]] = entry
+            return "delta", self.version, [merged[idx] for idx in sorted(merged)]
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until the state moves past ``version``; False on timeout."""
+        with self._state_cond:
+            return self._state_cond.wait_for(lambda: self.version != version, timeout)
+
     def _timestamp_str(self):
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     def _update_history(self, class_name, confidence, timestamp):
         if class_name not in self.detection_history:
             self.detection_history[class_name] = {
+                "index": len(self.detection_history) + 1,
                 "confidence": round(confidence, 2),
                 "timestamp": timestamp,
             }
-        elif confidence > self.detection_history[class_name]["confidence"]:
-            self.detection_history[class_name]["confidence"] = round(confidence, 2)
-            self.detection_history[class_name]["timestamp"] = timestamp
+            return True
+        entry = self.detection_history[class_name]
+        if round(confidence, 2) > entry["confidence"]:
+            entry["confidence"] = round(confidence, 2)
+            entry["timestamp"] = timestamp
+            return True
+        return False
 
     def _draw_box(self, frame, x1, y1, x2, y2, class_name, confidence):
         color = (0, 165, 255)
@@ -82,24 +257,36 @@ class DetectionService:
         cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
         cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
 
-    def _save_snapshot(self, frame, class_name, timestamp):
-        class_dir = os.path.join(self.output_dir, self.session_name, class_name)
-        os.makedirs(class_dir, exist_ok=True)
-        safe_time = timestamp.replace(":", "_")
-        snap_path = os.path.join(class_dir, f"{safe_time}.jpg")
-        cv2.imwrite(snap_path, frame)
+    def _save_snapshot(self, frame, class_names, timestamp, boxes=None):
+        # The caller keeps drawing on and streaming ``frame``, so hand the writer a copy.
+        self.snapshot_writer.submit(frame.copy(), self.session_name, class_names, timestamp, boxes=boxes)
 
     def _record_detection(self, class_name, confidence, timestamp):
         record_detection(self.session_name, class_name, confidence, timestamp, db_path=self.db_path)
 
-    def _refresh_latest_detections(self):
-        self.latest_detections = []
-        for idx, (cls, data) in enumerate(self.detection_history.items(), start=1):
-            self.latest_detections.append(
+    def _publish_changes(self, class_names):
+        entries = []
+        for cls in class_names:
+            data = self.detection_history[cls]
+            entries.append(
                 {
-                    "index": idx,
+                    "index": data["index"],
                     "class_name": cls,
                     "confidence": data["confidence"],
                     "timestamp": data["timestamp"],
                 }
             )
+        entries.sort(key=lambda entry: entry["index"])
+
+        with self._state_cond:
+            # Copy-on-write so request threads can serialise the list without a lock.
+            latest = list(self.latest_detections)
+            for entry in entries:
+                if entry["index"] > len(latest):
+                    latest.append(entry)
+                else:
+                    latest[entry["index"] - 1] = entry
+            self.latest_detections = latest
+            self.version += 1
+            self._changes.append((self.version, entries))
+            self._state_cond.notify_all()
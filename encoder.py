@@ -0,0 +1,126 @@
+import time
+
+from pipeline import mjpeg_part
+
+
+# (scale, JPEG quality, max FPS) from best to cheapest; ``None`` means no FPS cap.
+DEFAULT_LADDER = (
+    (1.0, 80, None),
+    (0.75, 70, 15),
+    (0.5, 60, 10),
+    (0.35, 50, 5),
+)
+
+
+class AdaptiveEncoder:
+    """Picks the stream variant for one viewer from how fast its sends drain.
+
+    ``record`` is given the time each part spent being written to the client.
+    When sending takes more than ``step_down_at`` of the time between frames,
+    or the viewer's queue dropped frames, the encoder moves one rung down the
+    ladder; when it stays under ``step_up_at`` it moves back up. Changes are at
+    least ``hold_seconds`` apart so the level does not flap. Frames are taken
+    from ``FramePacket.encode``, which shares variants between viewers.
+    """
+
+    def __init__(
+        self,
+        ladder=DEFAULT_LADDER,
+        raw=False,
+        level=None,
+        step_down_at=0.8,
+        step_up_at=0.3,
+        hold_seconds=2.0,
+        smoothing=0.3,
+    ):
+        self.ladder = ladder
+        self.raw = raw
+        self.fixed = level is not None
+        self.level = min(max(level or 0, 0), len(ladder) - 1)
+        self.step_down_at = step_down_at
+        self.step_up_at = step_up_at
+        self.hold_seconds = hold_seconds
+        self.smoothing = smoothing
+        self.sent = 0
+        self.skipped = 0
+        self.bytes_sent = 0
+        self.send_seconds = None
+        self.frame_interval = None
+        self._last_captured = None
+        self._last_change = None
+        self._drops = 0
+
+    def encode(self, packet):
+        """JPEG bytes to send for ``packet``, or ``None`` if the FPS cap skips it."""
+        scale, quality, max_fps = self.ladder[self.level]
+        if max_fps and self._last_captured is not None and packet.captured_at - self._last_captured < 1.0 / max_fps:
+            self.skipped += 1
+            return None
+        return packet.encode(quality, scale, raw=self.raw)
+
+    def record(self, nbytes, send_seconds, captured_at, dropped=0, now=None):
+        now = time.monotonic() if now is None else now
+        self.sent += 1
+        self.bytes_sent += nbytes
+        self.send_seconds = self._smooth(self.send_seconds, send_seconds)
+        if self._last_captured is not None:
+            self.frame_interval = self._smooth(self.frame_interval, captured_at - self._last_captured)
+        self._last_captured = captured_at
+        new_drops, self._drops = dropped - self._drops, dropped
+
+        if self.fixed or self.frame_interval is None:
+            return
+        if self._last_change is not None and now - self._last_change < self.hold_seconds:
+            return
+        load = self.send_seconds / max(self.frame_interval, 1e-3)
+        if (new_drops > 0 or load > self.step_down_at) and self.level < len(self.ladder) - 1:
+            self.level += 1
+            self._last_change = now
+        elif load < self.step_up_at and self.level > 0:
+            self.level -= 1
+            self._last_change = now
+
+    def stats(self):
+        scale, quality, max_fps = self.ladder[self.level]
+        return {
+            "level": self.level,
+            "scale": scale,
+            "quality": quality,
+            "max_fps": max_fps,
+            "raw": self.raw,
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "send_ms_avg": round(self.send_seconds * 1000, 2) if self.send_seconds is not None else None,
+            "throughput_kbps": (
+                round(self.bytes_sent / self.sent * 8 / 1000 / self.send_seconds, 1)
+                if self.sent and self.send_seconds
+                else None
+            ),
+        }
+
+    def _smooth(self, current, value):
+        if current is None:
+            return value
+        return current + self.smoothing * (value - current)
+
+
+def mjpeg_stream(subscriber, encoder, keep_going, failed=None):
+    """Multipart parts for one viewer, timing each send to drive ``encoder``.
+
+    With a WSGI server the generator resumes only after the previous part was
+    written, so the time spent in ``yield`` is the send time. ``failed`` is
+    polled when no frame arrives and ends the stream when it returns true.
+    """
+    subscriber.encoder = encoder
+    while keep_going() and not subscriber.closed:
+        packet = subscriber.get(timeout=1.0)
+        if packet is None:
+            if failed is not None and failed():
+                break
+            continue
+        jpeg = encoder.encode(packet)
+        if jpeg is None:
+            continue
+        started = time.monotonic()
+        yield mjpeg_part(jpeg)
+        encoder.record(len(jpeg), time.monotonic() - started, packet.captured_at, subscriber.dropped)
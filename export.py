@@ -0,0 +1,135 @@
+"""Streaming export of stored detections as NDJSON or CSV.
+
+Rows are read in chunks from a single query and encoded chunk by chunk, so an
+export of any size runs in constant memory. From the command line::
+
+    python -m export --session lobby --format csv --start "2026-02-11 00:00:00" --gzip --output lobby.csv.gz
+"""
+
+import argparse
+import calendar
+import csv
+import io
+import json
+import sys
+import time
+import zlib
+
+from db import DEFAULT_DB_PATH, TIMESTAMP_FORMAT, iter_detections
+
+
+FIELDS = ("id", "session_name", "class_name", "confidence", "timestamp")
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def parse_time(value):
+    """Bound for ``detected_at_epoch`` from Unix epoch seconds or a local ``TIMESTAMP_FORMAT`` string.
+
+    ``detected_at_epoch`` is local wall-clock time read as UTC (see
+    ``db.to_epoch``), so epoch numbers are shifted onto the same scale.
+    ``None`` passes through.
+    """
+    if value is None or value == "":
+        return None
+    if value.strip().isdigit():
+        return calendar.timegm(time.localtime(int(value)))
+    try:
+        return calendar.timegm(time.strptime(value.strip(), TIMESTAMP_FORMAT))
+    except ValueError:
+        raise ValueError(f"Invalid time '{value}'; use epoch seconds or YYYY-MM-DD HH:MM:SS.") from None
+
+
+def ndjson_chunks(chunks):
+    for rows in chunks:
+        yield "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of text chunks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_detections(
+    session_name,
+    fmt="ndjson",
+    start=None,
+    end=None,
+    class_names=None,
+    compress=False,
+    chunk_size=1000,
+    db_path=DEFAULT_DB_PATH,
+):
+    """Chunks of the encoded export: ``str`` pieces, or gzip ``bytes`` with ``compress``."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose one of: {', '.join(FORMATS)}.")
+    chunks = iter_detections(
+        session_name,
+        start_epoch=parse_time(start),
+        end_epoch=parse_time(end),
+        class_names=class_names,
+        chunk_size=chunk_size,
+        db_path=db_path,
+    )
+    encoded = ndjson_chunks(chunks) if fmt == "ndjson" else csv_chunks(chunks)
+    return gzip_chunks(encoded) if compress else encoded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export stored detections as NDJSON or CSV.")
+    parser.add_argument("--session", required=True)
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("--start", help="Unix epoch seconds or local 'YYYY-MM-DD HH:MM:SS' (inclusive).")
+    parser.add_argument("--end", help="Unix epoch seconds or local 'YYYY-MM-DD HH:MM:SS' (exclusive).")
+    parser.add_argument("--class", dest="classes", action="append", help="Only this class; repeat for more.")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--output", help="File to write; standard output by default.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = parser.parse_args(argv)
+
+    try:
+        chunks = export_detections(
+            args.session,
+            fmt=args.format,
+            start=args.start,
+            end=args.end,
+            class_names=args.classes,
+            compress=args.gzip,
+            db_path=args.db,
+        )
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+
+    if args.output:
+        handle = open(args.output, "wb") if args.gzip else open(args.output, "w", newline="")
+    else:
+        handle = sys.stdout.buffer if args.gzip else sys.stdout
+    try:
+        for chunk in chunks:
+            handle.write(chunk)
+    finally:
+        if args.output:
+            handle.close()
+
+
+if __name__ == "__main__":
+    main()
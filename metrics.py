@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+STAGE_HISTOGRAM = "detector_stage_seconds"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``observe`` is a bisect plus three additions."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Registry:
+    """Holds the process-wide counters and per-stage latency histograms.
+
+    When disabled, ``timer`` hands out a shared no-op context manager and
+    ``inc`` returns immediately, so instrumented code pays no clock reads,
+    locks or allocations.
+    """
+
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._counters = {}
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text=""):
+        counter = self._counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(name, Counter(name, help_text))
+        return counter
+
+    def stage(self, name):
+        histogram = self._stages.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(name, Histogram(self.buckets))
+        return histogram
+
+    def timer(self, stage):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.stage(stage))
+
+    def observe(self, stage, seconds):
+        if self.enabled:
+            self.stage(stage).observe(seconds)
+
+    def inc(self, name, amount=1):
+        if self.enabled:
+            self.counter(name).inc(amount)
+
+    def render(self):
+        # Snapshot under the lock: a metric registered mid-scrape would
+        # otherwise resize the dicts while they are being iterated.
+        with self._lock:
+            counters = sorted(self._counters.items())
+            stages = sorted(self._stages.items())
+
+        lines = []
+        for name, counter in counters:
+            if counter.help:
+                lines.append(f"# HELP {name} {counter.help}")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {counter.value}")
+
+        if stages:
+            lines.append(f"# HELP {STAGE_HISTOGRAM} Time spent in each stage of the detection pipeline.")
+            lines.append(f"# TYPE {STAGE_HISTOGRAM} histogram")
+        for stage, histogram in stages:
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{STAGE_HISTOGRAM}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{STAGE_HISTOGRAM}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{STAGE_HISTOGRAM}_count{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry(enabled=os.environ.get("METRICS_ENABLED", "1") != "0")
+
+REGISTRY.counter("detector_frames_processed_total", "Frames passed through DetectionService.process_frame.")
+REGISTRY.counter("detector_frames_dropped_total", "Frames replaced before the next pipeline stage took them.")
+REGISTRY.counter("detector_viewer_frames_dropped_total", "Encoded frames discarded for viewers that fell behind.")
+REGISTRY.counter("detector_detections_total", "Boxes returned by the model.")
+REGISTRY.counter("detector_db_rows_written_total", "Detection rows committed to SQLite.")
+REGISTRY.counter(
+    "detector_db_rows_failed_total", "Queued rows (detections, snapshots and rollups) lost to a failed SQLite write."
+)
+
+
+def timer(stage):
+    return REGISTRY.timer(stage)
+
+
+def observe(stage, seconds):
+    REGISTRY.observe(stage, seconds)
+
+
+def inc(name, amount=1):
+    REGISTRY.inc(name, amount)
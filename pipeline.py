@@ -0,0 +1,278 @@
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+
+import metrics
+
+
+DROP_STALE = "latest"
+BLOCK = "block"
+DROP_POLICIES = (DROP_STALE, BLOCK)
+
+
+class FrameSlot:
+    """Single-item handoff between two pipeline stages.
+
+    With the ``latest`` policy a new item replaces an unconsumed one (counted in
+    ``dropped``); with ``block`` the producer waits until the consumer took it.
+    """
+
+    def __init__(self, policy=DROP_STALE):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown frame drop policy '{policy}'.")
+        self.policy = policy
+        self.dropped = 0
+        self._item = None
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if self.policy == BLOCK:
+                while self._item is not None and not self._closed:
+                    self._cond.wait()
+            if self._closed:
+                return False
+            if self._item is not None:
+                self.dropped += 1
+                metrics.inc("detector_frames_dropped_total")
+            self._item = item
+            self._cond.notify_all()
+        return True
+
+    def get(self, timeout=None):
+        with self._cond:
+            if self._item is None and not self._closed:
+                self._cond.wait(timeout)
+            item = self._item
+            self._item = None
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class FramePacket:
+    """A captured frame on its way to viewers.
+
+    ``encode`` memoizes every (quality, scale, raw) variant, so a variant is
+    encoded at most once however many viewers ask for it, and only when one
+    does. ``raw`` is the frame before boxes were drawn (when the pipeline keeps
+    it) and ``boxes`` the detections drawn on ``frame``.
+    """
+
+    __slots__ = ("seq", "captured_at", "frame", "raw", "boxes", "quality", "latency", "_variants", "_lock")
+
+    def __init__(self, seq, captured_at, frame, quality=80):
+        self.seq = seq
+        self.captured_at = captured_at
+        self.frame = frame
+        self.raw = None
+        self.boxes = None
+        self.quality = quality
+        self.latency = None
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    @property
+    def jpeg(self):
+        """The full-size frame at the pipeline's quality, encoded on first access."""
+        return self.encode(self.quality)
+
+    def encode(self, quality=80, scale=1.0, raw=False):
+        key = (quality, scale, raw and self.raw is not None)
+        with self._lock:
+            if key not in self._variants:
+                frame = self.raw if key[2] else self.frame
+                with metrics.timer("encode"):
+                    if scale < 1.0:
+                        height, width = frame.shape[:2]
+                        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+                        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                    self._variants[key] = encode_jpeg(frame, quality)
+            return self._variants[key]
+
+
+class StreamPipeline:
+    """Runs capture, inference and publishing on three threads.
+
+    Stages are connected by ``FrameSlot`` handoffs so each stage works on the
+    newest frame available and the stream throughput is bounded by the slowest
+    stage rather than the sum of all of them. Processed packets go to
+    ``publish`` when given, otherwise they are read with ``get``. Nothing is
+    JPEG-encoded here: ``FramePacket.encode`` does that once per variant a
+    viewer asks for, so no full-size frame is encoded when nobody wants one.
+
+    With ``submit`` (e.g. ``DetectionService.submit_frame``) the inference
+    stage only starts frames and up to ``in_flight`` of them are finished, in
+    capture order, by a fourth thread.
+
+    ``describe`` is called after each frame is processed to attach its boxes
+    to the packet, and while ``keep_raw()`` is true an undrawn copy of the
+    frame is kept for viewers that draw overlays themselves.
+    """
+
+    def __init__(
+        self,
+        camera,
+        process,
+        drop_policy=DROP_STALE,
+        jpeg_quality=80,
+        latency_window=300,
+        publish=None,
+        submit=None,
+        in_flight=1,
+        describe=None,
+        keep_raw=None,
+    ):
+        self.camera = camera
+        self.process = process
+        self.submit = submit
+        self.describe = describe
+        self.keep_raw = keep_raw
+        self.publish = publish
+        self.jpeg_quality = jpeg_quality
+        self.error = None
+        self.frames_captured = 0
+        self.frames_published = 0
+        self._latencies = deque(maxlen=latency_window)
+        self._capture_slot = FrameSlot(DROP_STALE)
+        self._publish_slot = FrameSlot(drop_policy)
+        self._output_slot = FrameSlot(DROP_STALE)
+        self._in_flight = queue.Queue(maxsize=max(1, in_flight))
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        stages = [
+            ("capture", self._capture_loop),
+            ("inference", self._inference_loop),
+            ("publish", self._publish_loop),
+        ]
+        if self.submit is not None:
+            stages.append(("collect", self._collect_loop))
+        for name, target in stages:
+            thread = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        for slot in (self._capture_slot, self._publish_slot, self._output_slot):
+            slot.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    def get(self, timeout=1.0):
+        return self._output_slot.get(timeout)
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+        return {
+            "frames_captured": self.frames_captured,
+            "frames_published": self.frames_published,
+            "dropped_before_inference": self._capture_slot.dropped,
+            "dropped_before_publish": self._publish_slot.dropped,
+            "dropped_before_send": self._output_slot.dropped,
+            "latency_ms_avg": _ms(sum(latencies) / len(latencies)) if latencies else None,
+            "latency_ms_p95": _ms(latencies[int(0.95 * (len(latencies) - 1))]) if latencies else None,
+        }
+
+    def _fail(self, message):
+        self.error = message
+        self.stop(timeout=0)
+
+    def _capture_loop(self):
+        seq = 0
+        while not self._stop.is_set():
+            with metrics.timer("capture"):
+                success, frame = self.camera.read()
+            captured_at = time.monotonic()
+            if not success:
+                self._fail("Failed to read from camera.")
+                return
+            seq += 1
+            self.frames_captured += 1
+            self._capture_slot.put(FramePacket(seq, captured_at, frame, self.jpeg_quality))
+
+    def _inference_loop(self):
+        while not self._stop.is_set():
+            packet = self._capture_slot.get(timeout=0.5)
+            if packet is None:
+                continue
+            if self.keep_raw is not None and self.keep_raw():
+                packet.raw = packet.frame.copy()
+            try:
+                if self.submit is not None:
+                    complete = self.submit(packet.frame)
+                else:
+                    packet.frame = self.process(packet.frame)
+            except RuntimeError as exc:
+                self._fail(str(exc))
+                return
+            if self.submit is None:
+                self._processed(packet)
+                continue
+            while not self._stop.is_set():
+                try:
+                    self._in_flight.put((packet, complete), timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+    def _collect_loop(self):
+        while not self._stop.is_set():
+            try:
+                packet, complete = self._in_flight.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                packet.frame = complete()
+            except RuntimeError as exc:
+                self._fail(str(exc))
+                return
+            self._processed(packet)
+
+    def _processed(self, packet):
+        if self.describe is not None:
+            packet.boxes = self.describe()
+        self._publish_slot.put(packet)
+
+    def _publish_loop(self):
+        while not self._stop.is_set():
+            packet = self._publish_slot.get(timeout=0.5)
+            if packet is None:
+                continue
+            packet.latency = time.monotonic() - packet.captured_at
+            self._latencies.append(packet.latency)
+            self.frames_published += 1
+            if self.publish is not None:
+                self.publish(packet)
+            else:
+                self._output_slot.put(packet)
+
+
+def encode_jpeg(frame, quality=80):
+    ret, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if ret else None
+
+
+def mjpeg_part(jpeg):
+    return b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n'
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
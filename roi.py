@@ -0,0 +1,158 @@
+import numpy as np
+
+from backends import Detections, batched_nms, empty_detections
+
+
+class RegionPlanner:
+    """Turns regions of interest into the crop windows sent to the model.
+
+    ``regions`` are ``(x, y, width, height)`` tuples in pixels, or in fractions
+    of the frame when every value is at most 1. Without regions the whole
+    frame is one region. With ``tile_size`` a region larger than one tile is
+    covered by ``tile_size`` squares overlapping by ``overlap``, so small
+    objects keep their native resolution. Windows are cached per frame shape.
+    """
+
+    def __init__(self, regions=None, tile_size=None, overlap=0.2):
+        self.regions = list(regions or [])
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self._cache = {}
+
+    def windows(self, shape):
+        height, width = shape[:2]
+        key = (height, width)
+        if key not in self._cache:
+            windows = []
+            for x1, y1, x2, y2 in self._resolve(width, height):
+                if self.tile_size:
+                    windows.extend(tile_windows(x1, y1, x2, y2, self.tile_size, self.overlap))
+                else:
+                    windows.append((x1, y1, x2, y2))
+            self._cache[key] = windows
+        return self._cache[key]
+
+    def _resolve(self, width, height):
+        if not self.regions:
+            return [(0, 0, width, height)]
+        resolved = []
+        for region in self.regions:
+            x, y, w, h = region
+            if all(value <= 1 for value in region):
+                x, y, w, h = x * width, y * height, w * width, h * height
+            x1, y1 = max(0, int(round(x))), max(0, int(round(y)))
+            x2, y2 = min(width, int(round(x + w))), min(height, int(round(y + h)))
+            if x2 > x1 and y2 > y1:
+                resolved.append((x1, y1, x2, y2))
+        return resolved
+
+
+def tile_windows(x1, y1, x2, y2, tile, overlap=0.2):
+    """Overlapping ``tile``-sized windows covering ``(x1, y1, x2, y2)``; the last one is flush with the edge."""
+    step = max(1, int(tile * (1 - overlap)))
+
+    def starts(low, high):
+        if high - low <= tile:
+            return [low]
+        return list(range(low, high - tile, step)) + [high - tile]
+
+    return [
+        (x, y, min(x + tile, x2), min(y + tile, y2))
+        for y in starts(y1, y2)
+        for x in starts(x1, x2)
+    ]
+
+
+class RegionBackend:
+    """Backend wrapper that runs the model on crop windows instead of whole frames.
+
+    Crops of every frame in a ``predict`` call go to the wrapped backend in a
+    single batched call. Boxes are shifted back to frame coordinates and, when
+    a frame has several windows, duplicates from overlapping windows are merged
+    with class-aware NMS. When the wrapped backend pipelines frames with
+    ``submit``/``result`` (a ``WorkerPool``), so does the wrapper: each crop
+    is submitted on its own and ``result`` merges them.
+    """
+
+    def __init__(self, backend, planner, iou=0.5):
+        self.backend = backend
+        self.planner = planner
+        self.iou = iou
+        if hasattr(backend, "submit"):
+            self.submit = self._submit
+            self.result = self._result
+
+    @property
+    def names(self):
+        return self.backend.names
+
+    @property
+    def warmup_seconds(self):
+        return self.backend.warmup_seconds
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        crops, owners = [], []
+        for idx, frame in enumerate(frames):
+            for window in self.planner.windows(frame.shape):
+                x1, y1, x2, y2 = window
+                crops.append(frame[y1:y2, x1:x2])
+                owners.append((idx, window))
+        if not crops:
+            return [empty_detections() for _ in frames]
+
+        results = self.backend.predict(crops, imgsz=imgsz, conf=conf, iou=iou)
+        parts = [[] for _ in frames]
+        for (idx, window), detections in zip(owners, results):
+            if len(detections.xyxy):
+                parts[idx].append(_shift(detections, window))
+        return [self._merge(frame_parts, self.iou if iou is None else iou) for frame_parts in parts]
+
+    def _submit(self, frame, imgsz=None, conf=None, iou=None):
+        windows = self.planner.windows(frame.shape)
+        tickets = [
+            self.backend.submit(frame[y1:y2, x1:x2], imgsz=imgsz, conf=conf, iou=iou)
+            for x1, y1, x2, y2 in windows
+        ]
+        return windows, tickets, iou
+
+    def _result(self, handle, timeout=None):
+        """``(detections, seconds)`` for a ``submit`` handle; seconds add up over the crops."""
+        windows, tickets, iou = handle
+        parts, elapsed = [], 0.0
+        for window, ticket in zip(windows, tickets):
+            detections, seconds = self.backend.result(ticket, timeout)
+            elapsed += seconds
+            if len(detections.xyxy):
+                parts.append(_shift(detections, window))
+        return self._merge(parts, self.iou if iou is None else iou), elapsed
+
+    def _merge(self, parts, iou):
+        if not parts:
+            return empty_detections()
+        if len(parts) == 1:
+            return parts[0]
+        xyxy = np.concatenate([part.xyxy for part in parts])
+        conf = np.concatenate([part.conf for part in parts])
+        cls = np.concatenate([part.cls for part in parts])
+        keep = batched_nms(xyxy, conf, cls, iou)
+        return Detections(xyxy[keep], conf[keep], cls[keep])
+
+
+def _shift(detections, window):
+    x1, y1 = window[:2]
+    offset = np.array([x1, y1, x1, y1], dtype=detections.xyxy.dtype)
+    return Detections(detections.xyxy + offset, detections.conf, detections.cls)
+
+
+def parse_regions(raw):
+    """Parse ``"x,y,w,h;x,y,w,h"`` into region tuples; an empty string means the whole frame."""
+    regions = []
+    for part in (raw or "").split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        values = [float(value) for value in part.split(",")]
+        if len(values) != 4 or values[2] <= 0 or values[3] <= 0:
+            raise ValueError(f"Invalid region '{part}'; expected x,y,width,height.")
+        regions.append(tuple(values))
+    return regions
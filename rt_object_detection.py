@@ -4,49 +4,46 @@ import time
 from datetime import datetime
 
 import cv2
-from ultralytics import YOLO
+
+from backends import load_backend
+from scheduler import InferenceScheduler
+from sources import open_source
+from tracker import IoUTracker
 
 # ──────────────────────────────────────────────────────────────
 # Configuration
 # ──────────────────────────────────────────────────────────────
-WEBCAM_INDEX = 0            # default webcam
+SOURCE       = 0            # webcam index, video path or "clip.frames?speed=max"
 IMGSZ        = 480          # inference resolution (square)
 CONF_THRES   = 0.60         # detection confidence threshold
 IOU_THRES    = 0.45         # NMS IoU threshold
 MODEL_PATH   = "yolov10n.pt"  # your model file
+MODEL_BACKEND = "ultralytics"  # or "onnx" with an exported .onnx file
+WARMUP_RUNS  = 1            # synthetic frames run at load time
 TARGET_FPS   = 5            # desired FPS
 SNAP_DIR     = "snapshots"  # snapshot save dir
 os.makedirs(SNAP_DIR, exist_ok=True)
 
 MAX_IOU_THRESHOLD = 0.5     # threshold to consider same object
+TRACK_MAX_AGE = 30          # frames a lost object is remembered
+MOTION_THRESHOLD = 4.0      # mean gray-level change that triggers inference
+MOTION_MAX_SKIP = 30        # force inference after this many skipped frames
+IMGSZ_LADDER = [IMGSZ, 384, 320]  # resolutions tried under CPU pressure
 
 # ──────────────────────────────────────────────────────────────
 # Load YOLO model (CPU only)
 # ──────────────────────────────────────────────────────────────
-model = YOLO(MODEL_PATH).to("cpu")
+model = load_backend(MODEL_BACKEND, MODEL_PATH, device="cpu", warmup_runs=WARMUP_RUNS)
+print(f"[INFO] Model warm-up took {model.warmup_seconds:.2f}s.")
 
 # ──────────────────────────────────────────────────────────────
-# Initialize webcam
+# Initialize video source
 # ──────────────────────────────────────────────────────────────
-cap = cv2.VideoCapture(WEBCAM_INDEX)
+cap = open_source(SOURCE)
 cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
 cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
 if not cap.isOpened():
-    raise RuntimeError("Cannot open webcam. Check index/permissions.")
-
-# ──────────────────────────────────────────────────────────────
-# IoU function
-# ──────────────────────────────────────────────────────────────
-def compute_iou(box1, box2):
-    xA = max(box1[0], box2[0])
-    yA = max(box1[1], box2[1])
-    xB = min(box1[2], box2[2])
-    yB = min(box1[3], box2[3])
-    interArea = max(0, xB - xA) * max(0, yB - yA)
-    box1Area = (box1[2] - box1[0]) * (box1[3] - box1[1])
-    box2Area = (box2[2] - box2[0]) * (box2[3] - box2[1])
-    unionArea = box1Area + box2Area - interArea
-    return interArea / unionArea if unionArea > 0 else 0
+    raise RuntimeError("Cannot open video source. Check index/path/permissions.")
 
 # ──────────────────────────────────────────────────────────────
 # Initialize variables
@@ -55,8 +52,15 @@ fps_ema = 0.0
 prev_time = time.time()
 frame_idx = 0
 session_cnt = Counter()
-saved_instances = {}  # class_name -> list of saved boxes
+tracker = IoUTracker(iou_threshold=MAX_IOU_THRESHOLD, max_age=TRACK_MAX_AGE)
 min_frame_interval = 1.0 / TARGET_FPS
+scheduler = InferenceScheduler(
+    motion_threshold=MOTION_THRESHOLD,
+    max_skip=MOTION_MAX_SKIP,
+    imgsz_ladder=IMGSZ_LADDER,
+    frame_budget=min_frame_interval,
+)
+last_drawn = []  # boxes reused while the scene is static
 
 print("[INFO] Starting inference loop. Press 'q' to exit.")
 
@@ -71,54 +75,61 @@ while True:
         print("[WARN] Frame grab failed. Exiting…")
         break
 
-    result = model.predict(
-        source=frame,
-        imgsz=IMGSZ,
-        conf=CONF_THRES,
-        iou=IOU_THRES,
-        device="cpu",
-        half=False,
-        stream=False,
-        verbose=False,
-    )[0]
-
-    boxes = result.boxes
+    # Skip inference while the scene is static and redraw the last boxes
+    run_inference = scheduler.should_infer(frame)
+    boxes = None
+    if run_inference:
+        infer_start = time.time()
+        boxes = model.predict(
+            [frame],
+            imgsz=scheduler.imgsz,
+            conf=CONF_THRES,
+            iou=IOU_THRES,
+        )[0]
+        scheduler.record_inference(time.time() - infer_start)
+        last_drawn = []
+    else:
+        for x1, y1, x2, y2, label in last_drawn:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(frame, label, (x1, y1 - 8),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
     detected_this_frame = False
     new_object_detected = False
     frame_classes_this_frame = set()
 
-    if boxes is not None and len(boxes):
-        clss = boxes.cls.cpu().numpy().astype(int)
+    if boxes is not None and len(boxes.xyxy):
+        clss = boxes.cls
         names = [model.names[c] for c in clss]
         counts = Counter(names)
         session_cnt.update(counts)
         detected_this_frame = True
 
-        for box, cls_id, conf in zip(boxes.xyxy.cpu().numpy().astype(int), clss, boxes.conf.cpu().numpy()):
+        xyxy = boxes.xyxy.astype(int)
+        confs = boxes.conf
+        tracked = tracker.update(xyxy, clss, confs)
+
+        for box, cls_id, conf, (_, is_new) in zip(xyxy, clss, confs, tracked):
             x1, y1, x2, y2 = box
             cls_name = model.names[int(cls_id)]
             frame_classes_this_frame.add(cls_name)
 
             # Draw bounding box
+            label = f"{cls_name} {conf:.2f}"
             cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.putText(frame, f"{cls_name} {conf:.2f}", (x1, y1 - 8),
+            cv2.putText(frame, label, (x1, y1 - 8),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+            last_drawn.append((x1, y1, x2, y2, label))
 
-            # Check if new object using IoU
-            prev_boxes = saved_instances.get(cls_name, [])
-            is_new = True
-            for prev_box in prev_boxes:
-                if compute_iou([x1, y1, x2, y2], prev_box) > MAX_IOU_THRESHOLD:
-                    is_new = False
-                    break
-
+            # Snapshot once per tracked object
             if is_new:
                 new_object_detected = True
-                saved_instances.setdefault(cls_name, []).append([x1, y1, x2, y2])
 
         # Print detected object summary
         joined = " ".join(f"{k}:{v}" for k, v in counts.items())
         print(f"Frame {frame_idx}: {joined}")
+    elif run_inference:
+        tracker.update([], [])
 
     # Save snapshot only for new object
     if new_object_detected:
@@ -157,4 +168,8 @@ cv2.destroyAllWindows()
 
 print("[INFO] Session complete. Total objects detected:")
 for name, count in session_cnt.items():
-    print(f"  {name}: {count}")
\ No newline at end of file
+    print(f"  {name}: {count}")
+
+sched = scheduler.stats()
+print(f"[INFO] Inference ran on {sched['inferred']}/{sched['frames']} frames "
+      f"(skip ratio {sched['skip_ratio']:.0%}, final imgsz {sched['imgsz']}).")
\ No newline at end of file
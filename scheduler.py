@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+
+
+class InferenceScheduler:
+    """Decides per frame whether a full model pass is needed.
+
+    Each frame is reduced to a small grayscale probe and compared with the probe
+    of the last frame that went through the model. While the mean absolute
+    difference stays under ``motion_threshold`` the caller can reuse the previous
+    detections; ``max_skip`` forces a refresh so slow changes are not missed.
+
+    With an ``imgsz_ladder`` and a ``frame_budget`` (seconds), the inference
+    resolution steps down while the smoothed inference time exceeds the budget
+    and back up once there is headroom again.
+    """
+
+    def __init__(
+        self,
+        motion_threshold=4.0,
+        max_skip=30,
+        probe_size=(64, 48),
+        imgsz_ladder=None,
+        frame_budget=None,
+        window_seconds=10.0,
+    ):
+        self.motion_threshold = motion_threshold
+        self.max_skip = max_skip
+        self.probe_size = probe_size
+        self.imgsz_ladder = list(imgsz_ladder or [])
+        self.frame_budget = frame_budget
+        self.window_seconds = window_seconds
+        # record_inference runs on the inference thread while stats is polled by requests.
+        self._times_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.inferred = 0
+        self.skipped = 0
+        self.last_motion = None
+        self._reference = None
+        self._since_inference = 0
+        self._inference_ema = None
+        self._ladder_idx = 0
+        self._inference_times = deque()
+
+    @property
+    def imgsz(self):
+        if not self.imgsz_ladder:
+            return None
+        return self.imgsz_ladder[self._ladder_idx]
+
+    def should_infer(self, frame):
+        self.frames += 1
+        if not self.motion_threshold:
+            return self._accept(None)
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        probe = cv2.resize(gray, self.probe_size, interpolation=cv2.INTER_AREA)
+        if self._reference is None or self._since_inference >= self.max_skip:
+            return self._accept(probe)
+
+        self.last_motion = float(cv2.absdiff(probe, self._reference).mean())
+        if self.last_motion >= self.motion_threshold:
+            return self._accept(probe)
+
+        self.skipped += 1
+        self._since_inference += 1
+        return False
+
+    def record_inference(self, seconds):
+        now = time.monotonic()
+        with self._times_lock:
+            self._inference_times.append(now)
+            while self._inference_times and now - self._inference_times[0] > self.window_seconds:
+                self._inference_times.popleft()
+
+        if not self.imgsz_ladder or not self.frame_budget:
+            return
+        if self._inference_ema is None:
+            self._inference_ema = seconds
+        else:
+            self._inference_ema = 0.8 * self._inference_ema + 0.2 * seconds
+        if self._inference_ema > self.frame_budget and self._ladder_idx < len(self.imgsz_ladder) - 1:
+            self._ladder_idx += 1
+            self._inference_ema = None
+        elif self._inference_ema < 0.5 * self.frame_budget and self._ladder_idx > 0:
+            self._ladder_idx -= 1
+            self._inference_ema = None
+
+    def stats(self):
+        now = time.monotonic()
+        with self._times_lock:
+            recent = [stamp for stamp in self._inference_times if now - stamp <= self.window_seconds]
+        span = now - recent[0] if len(recent) > 1 else 0.0
+        return {
+            "frames": self.frames,
+            "inferred": self.inferred,
+            "skipped": self.skipped,
+            "skip_ratio": round(self.skipped / self.frames, 3) if self.frames else 0.0,
+            "inference_fps": round((len(recent) - 1) / span, 2) if span > 0 else 0.0,
+            "last_motion": None if self.last_motion is None else round(self.last_motion, 2),
+            "imgsz": self.imgsz,
+        }
+
+    def _accept(self, probe):
+        self.inferred += 1
+        self._since_inference = 0
+        if probe is not None:
+            self._reference = probe
+        return True
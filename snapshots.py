@@ -0,0 +1,391 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import cv2
+import numpy as np
+
+import metrics
+from db import record_snapshot
+
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+
+FRAME_MODE = "frame"
+CROP_MODE = "crop"
+MODES = (FRAME_MODE, CROP_MODE)
+
+FRAMES_DIR = "_frames"
+
+
+def dhash(image, size=8):
+    """64-bit difference hash: one bit per pixel, set when it is brighter than its right neighbour."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    return int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), "big")
+
+
+class DuplicateIndex:
+    """Recent perceptual hashes per ``(session, class)`` key, with LRU eviction of keys.
+
+    ``seen`` is true when a hash is within ``max_distance`` bits of one of the
+    last ``recent`` hashes kept for its key; otherwise the hash is remembered.
+    At most ``max_keys`` keys are held, so memory stays bounded.
+    """
+
+    def __init__(self, max_distance=6, recent=8, max_keys=256):
+        self.max_distance = max_distance
+        self.recent = recent
+        self.max_keys = max_keys
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seen(self, key, value):
+        with self._lock:
+            hashes = self._keys.get(key)
+            if hashes is None:
+                hashes = self._keys[key] = deque(maxlen=self.recent)
+                if len(self._keys) > self.max_keys:
+                    self._keys.popitem(last=False)
+            else:
+                self._keys.move_to_end(key)
+            if any(bin(value ^ other).count("1") <= self.max_distance for other in hashes):
+                return True
+            hashes.append(value)
+            return False
+
+
+class SnapshotWriter:
+    """Encodes and writes snapshots on a small pool of worker threads.
+
+    Each job is one frame: it is JPEG-encoded once, written into the first
+    class directory and hard-linked into the others, so the
+    ``<output_dir>/<session>/<class>/`` layout is unchanged. With a ``db_path``
+    every written file is also registered in the snapshot catalog.
+
+    In ``crop`` mode only each new object's box, padded by ``crop_padding`` of
+    its size, is stored; a full frame is kept in ``<session>/_frames/`` at most
+    every ``frame_sample_seconds`` and the crops point to the latest one. With
+    ``dedup_distance`` set, images whose difference hash is that close to a
+    recent one of the same session and class are skipped before encoding.
+    """
+
+    def __init__(
+        self,
+        output_dir,
+        workers=1,
+        queue_size=8,
+        drop_policy=DROP_OLDEST,
+        jpeg_quality=90,
+        db_path=None,
+        mode=FRAME_MODE,
+        crop_padding=0.15,
+        frame_sample_seconds=60.0,
+        dedup_distance=None,
+        dedup_recent=8,
+        dedup_keys=256,
+    ):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown snapshot drop policy '{drop_policy}'.")
+        if mode not in MODES:
+            raise ValueError(f"Unknown snapshot mode '{mode}'.")
+        self.output_dir = output_dir
+        self.db_path = db_path
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.jpeg_quality = jpeg_quality
+        self.mode = mode
+        self.crop_padding = crop_padding
+        self.frame_sample_seconds = frame_sample_seconds
+        self.dedup = None
+        if dedup_distance is not None:
+            self.dedup = DuplicateIndex(dedup_distance, recent=dedup_recent, max_keys=dedup_keys)
+        self.written = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.failed = 0
+        self.encode_count = 0
+        self.encode_seconds = 0.0
+        self.last_encode_seconds = 0.0
+        self._jobs = deque()
+        self._active = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self._sessions = {}
+        self._sampled = {}
+        self._sampling = {}
+        self._threads = [
+            threading.Thread(target=self._run, name=f"snapshot-writer-{idx}", daemon=True)
+            for idx in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, frame, session_name, class_names, timestamp, boxes=None):
+        """Queue ``frame``; ``boxes`` are the new objects' ``(x1, y1, x2, y2, class_name)`` for crop mode."""
+        if not class_names:
+            return False
+        job = (frame, session_name, sorted(set(class_names)), timestamp, boxes)
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._jobs) >= self.queue_size:
+                self.dropped += 1
+                if self.drop_policy == DROP_NEWEST:
+                    return False
+                self._jobs.popleft()
+            self._jobs.append(job)
+            self._cond.notify()
+        return True
+
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._jobs or self._active:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def stats(self):
+        with self._cond:
+            depth = len(self._jobs)
+        with self._stats_lock:
+            avg_ms = (self.encode_seconds / self.encode_count * 1000) if self.encode_count else 0.0
+            return {
+                "queue_depth": depth,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "duplicates": self.duplicates,
+                "encode_ms_avg": round(avg_ms, 2),
+                "encode_ms_last": round(self.last_encode_seconds * 1000, 2),
+            }
+
+    def session_stats(self, session_name):
+        """Files written and skipped for one session, and how much of the frames crops kept."""
+        with self._stats_lock:
+            totals = dict(self._sessions.get(session_name) or _empty_session_stats())
+        frame_pixels = totals.pop("frame_pixels")
+        totals["pixel_ratio"] = round(totals["pixels_written"] / frame_pixels, 3) if frame_pixels else None
+        return totals
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._closed:
+                    self._cond.wait()
+                if not self._jobs:
+                    return
+                job = self._jobs.popleft()
+                self._active += 1
+            try:
+                self._write(*job)
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    self._cond.notify_all()
+
+    def _write(self, frame, session_name, class_names, timestamp, boxes=None):
+        if self.mode == CROP_MODE and boxes:
+            self._write_crops(frame, session_name, timestamp, boxes)
+        else:
+            self._write_frame(frame, session_name, class_names, timestamp)
+
+    def _write_frame(self, frame, session_name, class_names, timestamp):
+        if self.dedup is not None:
+            value = dhash(frame)
+            fresh = [name for name in class_names if not self.dedup.seen((session_name, name), value)]
+            self._count_duplicates(session_name, len(class_names) - len(fresh))
+            if not fresh:
+                return
+            class_names = fresh
+
+        buffer = self._encode(frame)
+        if buffer is None:
+            return
+        filename = f"{timestamp.replace(':', '_')}.jpg"
+        first_path = None
+        write_started = time.perf_counter()
+        try:
+            for class_name in class_names:
+                class_dir = os.path.join(self.output_dir, session_name, class_name)
+                os.makedirs(class_dir, exist_ok=True)
+                snap_path = os.path.join(class_dir, filename)
+                if first_path is None:
+                    _write_bytes(snap_path, buffer)
+                    first_path = snap_path
+                else:
+                    _link_or_copy(first_path, snap_path, buffer)
+                if self.db_path:
+                    record_snapshot(
+                        session_name,
+                        class_name,
+                        timestamp,
+                        f"{session_name}/{class_name}/{filename}",
+                        buffer.size,
+                        db_path=self.db_path,
+                    )
+        except OSError:
+            with self._stats_lock:
+                self.failed += 1
+            return
+        metrics.observe("snapshot_write", time.perf_counter() - write_started)
+        pixels = frame.shape[0] * frame.shape[1]
+        self._count_written(session_name, buffer.size, pixels, pixels)
+
+    def _write_crops(self, frame, session_name, timestamp, boxes):
+        height, width = frame.shape[:2]
+        crops = []
+        for idx, (x1, y1, x2, y2, class_name) in enumerate(boxes):
+            pad_x, pad_y = int((x2 - x1) * self.crop_padding), int((y2 - y1) * self.crop_padding)
+            crop = frame[max(0, y1 - pad_y):min(height, y2 + pad_y), max(0, x1 - pad_x):min(width, x2 + pad_x)]
+            if not crop.size:
+                continue
+            if self.dedup is not None and self.dedup.seen((session_name, class_name), dhash(crop)):
+                self._count_duplicates(session_name, 1)
+                continue
+            crops.append((idx, class_name, crop))
+        if not crops:
+            return
+
+        stem = timestamp.replace(":", "_")
+        write_started = time.perf_counter()
+        try:
+            frame_path = self._sample_frame(frame, session_name, stem)
+            for idx, class_name, crop in crops:
+                buffer = self._encode(crop)
+                if buffer is None:
+                    continue
+                class_dir = os.path.join(self.output_dir, session_name, class_name)
+                os.makedirs(class_dir, exist_ok=True)
+                filename = f"{stem}_{idx}.jpg"
+                _write_bytes(os.path.join(class_dir, filename), buffer)
+                if self.db_path:
+                    record_snapshot(
+                        session_name,
+                        class_name,
+                        timestamp,
+                        f"{session_name}/{class_name}/{filename}",
+                        buffer.size,
+                        db_path=self.db_path,
+                        frame_path=frame_path,
+                    )
+                self._count_written(session_name, buffer.size, crop.shape[0] * crop.shape[1], height * width)
+        except OSError:
+            with self._stats_lock:
+                self.failed += 1
+            return
+        metrics.observe("snapshot_write", time.perf_counter() - write_started)
+
+    def _sample_frame(self, frame, session_name, stem):
+        """Relative path of the session's latest full frame, writing a new one when the last is too old.
+
+        While one worker writes a sample, the others wait for it rather than
+        recording crops without a frame.
+        """
+        now = time.monotonic()
+        with self._stats_lock:
+            sampled = self._sampled.get(session_name)
+            pending = self._sampling.get(session_name)
+            if pending is None:
+                if sampled is not None and now - sampled[0] < self.frame_sample_seconds:
+                    return sampled[1]
+                self._sampling[session_name] = threading.Event()
+        if pending is not None:
+            pending.wait()
+            with self._stats_lock:
+                sampled = self._sampled.get(session_name)
+            return sampled[1] if sampled else None
+        try:
+            buffer = self._encode(frame)
+            if buffer is None:
+                return sampled[1] if sampled else None
+            frames_dir = os.path.join(self.output_dir, session_name, FRAMES_DIR)
+            os.makedirs(frames_dir, exist_ok=True)
+            _write_bytes(os.path.join(frames_dir, f"{stem}.jpg"), buffer)
+            path = f"{session_name}/{FRAMES_DIR}/{stem}.jpg"
+            with self._stats_lock:
+                self._sampled[session_name] = (now, path)
+                totals = self._session_totals(session_name)
+                totals["full_frames"] += 1
+                totals["bytes_written"] += buffer.size
+            return path
+        finally:
+            with self._stats_lock:
+                self._sampling.pop(session_name).set()
+
+    def _encode(self, image):
+        start = time.perf_counter()
+        ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        elapsed = time.perf_counter() - start
+        metrics.observe("snapshot_encode", elapsed)
+        with self._stats_lock:
+            self.encode_count += 1
+            self.encode_seconds += elapsed
+            self.last_encode_seconds = elapsed
+            if not ok:
+                self.failed += 1
+        return buffer if ok else None
+
+    def _count_written(self, session_name, nbytes, pixels, frame_pixels):
+        with self._stats_lock:
+            self.written += 1
+            totals = self._session_totals(session_name)
+            totals["written"] += 1
+            totals["bytes_written"] += nbytes
+            totals["pixels_written"] += pixels
+            totals["frame_pixels"] += frame_pixels
+
+    def _count_duplicates(self, session_name, count):
+        if not count:
+            return
+        with self._stats_lock:
+            self.duplicates += count
+            self._session_totals(session_name)["duplicates"] += count
+
+    def _session_totals(self, session_name):
+        totals = self._sessions.get(session_name)
+        if totals is None:
+            totals = self._sessions[session_name] = _empty_session_stats()
+        return totals
+
+
+def _empty_session_stats():
+    return {
+        "written": 0,
+        "duplicates": 0,
+        "full_frames": 0,
+        "bytes_written": 0,
+        "pixels_written": 0,
+        "frame_pixels": 0,
+    }
+
+
+def _write_bytes(path, buffer):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(buffer.tobytes())
+    os.replace(tmp_path, path)
+
+
+def _link_or_copy(source, target, buffer):
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        _write_bytes(target, buffer)
@@ -0,0 +1,271 @@
+"""Frame sources: live cameras, video files and recorded ``.frames`` files.
+
+A ``.frames`` file is a 64-byte header followed by fixed-size records of a
+float64 capture timestamp and one raw uint8 frame, so it can be appended to
+while recording and memory-mapped for replay. Record from a camera with::
+
+    python -m sources record --source 0 --output lobby.frames --seconds 60
+"""
+
+import argparse
+import os
+import struct
+import time
+from urllib.parse import parse_qs
+
+import cv2
+import numpy as np
+
+
+MAGIC = b"RTFRAMES"
+VERSION = 1
+HEADER = struct.Struct("<8sIIII")
+HEADER_SIZE = 64
+FRAMES_SUFFIX = ".frames"
+
+
+def _record_dtype(shape):
+    return np.dtype([("timestamp", "<f8"), ("frame", np.uint8, shape)])
+
+
+class FrameRecorder:
+    """Appends frames and their capture timestamps to a ``.frames`` file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.shape = None
+        self.frames = 0
+        self._handle = None
+        self._record = None
+
+    def write(self, frame, timestamp=None):
+        if self._handle is None:
+            self._open(frame.shape)
+        elif frame.shape != self.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match recording shape {self.shape}.")
+        self._record["timestamp"] = time.time() if timestamp is None else timestamp
+        self._record["frame"] = frame
+        self._handle.write(self._record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def _open(self, shape):
+        if len(shape) != 3:
+            raise ValueError("Only HxWxC uint8 frames can be recorded.")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.shape = tuple(shape)
+        self._record = np.zeros(1, dtype=_record_dtype(self.shape))
+        self._handle = open(self.path, "wb")
+        self._handle.write(HEADER.pack(MAGIC, VERSION, *self.shape).ljust(HEADER_SIZE, b"\0"))
+
+
+class RecordingCapture:
+    """Wraps a capture and records every frame it returns."""
+
+    def __init__(self, capture, recorder):
+        self.capture = capture
+        self.recorder = recorder
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        success, frame = self.capture.read()
+        if success:
+            self.recorder.write(frame)
+        return success, frame
+
+    def get(self, prop):
+        return self.capture.get(prop)
+
+    def set(self, prop, value):
+        return self.capture.set(prop, value)
+
+    def release(self):
+        self.capture.release()
+        self.recorder.close()
+
+
+class ReplayCapture:
+    """Replays a ``.frames`` file with the ``cv2.VideoCapture`` read interface.
+
+    ``speed`` 1.0 keeps the recorded pace, 2.0 plays twice as fast and 0 as
+    fast as frames can be read. With ``loop`` the file restarts at the end
+    instead of reporting a failed read.
+    """
+
+    def __init__(self, path, speed=1.0, loop=False):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.position = 0
+        self.timestamp = None
+        self.error = None
+        try:
+            self._records = open_recording(path)
+        except (OSError, ValueError) as exc:
+            self._records = None
+            self.error = str(exc)
+        self._started = None
+        self._offset = 0.0
+
+    @property
+    def frame_count(self):
+        return len(self._records) if self._records is not None else 0
+
+    def isOpened(self):
+        return self._records is not None and len(self._records) > 0
+
+    def read(self):
+        if not self.isOpened():
+            return False, None
+        if self.position >= len(self._records):
+            if not self.loop:
+                return False, None
+            self._offset += self._duration()
+            self.position = 0
+
+        record = self._records[self.position]
+        self.position += 1
+        self.timestamp = float(record["timestamp"])
+        if self.speed > 0:
+            elapsed = self.timestamp - float(self._records[0]["timestamp"]) + self._offset
+            if self._started is None:
+                self._started = time.monotonic() - elapsed / self.speed
+            delay = self._started + elapsed / self.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        # Copy out of the read-only map; callers draw on the frames they get.
+        return True, np.array(record["frame"])
+
+    def get(self, prop):
+        if not self.isOpened():
+            return 0.0
+        height, width = self._records.dtype["frame"].shape[:2]
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(height)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self._records))
+        if prop == cv2.CAP_PROP_FPS:
+            duration = self._duration()
+            return len(self._records) / duration if duration > 0 else 0.0
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self._records = None
+
+    def _duration(self):
+        if len(self._records) < 2:
+            return 0.0
+        first, last = self._records[0]["timestamp"], self._records[-1]["timestamp"]
+        # One average frame gap so a looped file does not show its seam twice as fast.
+        return float(last - first) * len(self._records) / (len(self._records) - 1)
+
+
+def open_recording(path):
+    """Memory-map the records of a ``.frames`` file."""
+    with open(path, "rb") as handle:
+        magic, version, height, width, channels = HEADER.unpack(handle.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"'{path}' is not a recorded frames file.")
+    dtype = _record_dtype((height, width, channels))
+    count = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    if count <= 0:
+        return np.zeros(0, dtype=dtype)
+    # A record cut short by an interrupted recording is ignored.
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+def open_source(source, record_to=None):
+    """Open a camera index, video path/URL or ``.frames`` replay.
+
+    Replays take options as a query string: ``lobby.frames?speed=2&loop=1``
+    (``speed=max`` or ``0`` replays as fast as possible). With ``record_to``
+    every frame read is also recorded to that ``.frames`` path.
+    """
+    if isinstance(source, str) and source.strip().isdigit():
+        source = int(source)
+    if isinstance(source, str):
+        path, _, query = source.partition("?")
+        if path.endswith(FRAMES_SUFFIX):
+            options = {key: values[-1] for key, values in parse_qs(query).items()}
+            capture = ReplayCapture(
+                path,
+                speed=_parse_speed(options.get("speed", "1")),
+                loop=options.get("loop", "0") not in ("0", "false", ""),
+            )
+            return RecordingCapture(capture, FrameRecorder(record_to)) if record_to else capture
+    capture = cv2.VideoCapture(source)
+    return RecordingCapture(capture, FrameRecorder(record_to)) if record_to else capture
+
+
+def _parse_speed(speed):
+    if speed == "max":
+        return 0.0
+    try:
+        value = float(speed)
+    except ValueError:
+        value = -1.0
+    if not value >= 0:
+        raise ValueError(f"Invalid replay speed '{speed}'.")
+    return value
+
+
+def record(source, output, seconds=None, frames=None):
+    capture = open_source(source, record_to=output)
+    if not capture.isOpened():
+        raise SystemExit(f"Failed to open source '{source}'.")
+    started = time.monotonic()
+    count = 0
+    try:
+        while (frames is None or count < frames) and (seconds is None or time.monotonic() - started < seconds):
+            success, _ = capture.read()
+            if not success:
+                break
+            count += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        capture.release()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record or inspect raw frame files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="Record a camera or video to a .frames file.")
+    record_parser.add_argument("--source", default="0", help="Camera index, video path/URL or .frames file.")
+    record_parser.add_argument("--output", required=True)
+    record_parser.add_argument("--seconds", type=float)
+    record_parser.add_argument("--frames", type=int)
+    info_parser = commands.add_parser("info", help="Show the size and pace of a .frames file.")
+    info_parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        count = record(args.source, args.output, seconds=args.seconds, frames=args.frames)
+        print(f"Recorded {count} frames to {args.output}.")
+    else:
+        capture = ReplayCapture(args.path)
+        if not capture.isOpened():
+            raise SystemExit(capture.error or f"'{args.path}' holds no frames.")
+        print(
+            f"{args.path}: {capture.frame_count} frames, "
+            f"{int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))}, "
+            f"{capture.get(cv2.CAP_PROP_FPS):.1f} fps"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import calendar
+import threading
+import time
+
+import numpy as np
+
+
+RESOLUTIONS = {"second": 1, "minute": 60}
+
+# Rollup rows with this class name carry the minute's frame count only.
+FRAMES_ROW = ""
+
+
+def _now():
+    """Local wall-clock time read as UTC, the scale of ``db.to_epoch`` and ``detected_at_epoch``."""
+    now = time.time()
+    return now + calendar.timegm(time.localtime(now)) - int(now)
+
+
+class _Ring:
+    """Per-class aggregates for the last ``slots`` buckets of ``width`` seconds."""
+
+    def __init__(self, width, slots, classes):
+        self.width = width
+        self.slots = slots
+        self.bucket_ids = np.full(slots, -1, dtype=np.int64)
+        self.frames = np.zeros(slots, dtype=np.int64)
+        self.count = np.zeros((slots, classes), dtype=np.int64)
+        self.present = np.zeros((slots, classes), dtype=np.int64)
+        self.conf_sum = np.zeros((slots, classes), dtype=np.float64)
+        self.conf_min = np.full((slots, classes), np.inf, dtype=np.float64)
+        self.conf_max = np.full((slots, classes), -np.inf, dtype=np.float64)
+
+    def grow(self, classes):
+        extra = classes - self.count.shape[1]
+        for name, fill in (("count", 0), ("present", 0), ("conf_sum", 0.0), ("conf_min", np.inf), ("conf_max", -np.inf)):
+            array = getattr(self, name)
+            setattr(self, name, np.hstack([array, np.full((self.slots, extra), fill, dtype=array.dtype)]))
+
+    def slot(self, bucket_id):
+        idx = bucket_id % self.slots
+        if self.bucket_ids[idx] != bucket_id:
+            self.bucket_ids[idx] = bucket_id
+            self.frames[idx] = 0
+            self.count[idx] = 0
+            self.present[idx] = 0
+            self.conf_sum[idx] = 0.0
+            self.conf_min[idx] = np.inf
+            self.conf_max[idx] = -np.inf
+        return idx
+
+    def window(self, bucket_id, buckets):
+        ids = bucket_id - np.arange(min(buckets, self.slots))[::-1]
+        idx = ids % self.slots
+        return ids, idx, self.bucket_ids[idx] == ids
+
+
+class RollingStats:
+    """Bounded per-class time series for one session.
+
+    Every inferred frame adds its boxes to a per-second and a per-minute ring
+    of NumPy arrays (``seconds`` and ``minutes`` buckets long): box count,
+    confidence min/sum/max and how many frames contained the class. Reads
+    touch at most one ring's worth of rows, however long the session runs.
+    """
+
+    def __init__(self, seconds=300, minutes=1440, classes=16):
+        self.class_index = {}
+        self._rings = {
+            "second": _Ring(RESOLUTIONS["second"], seconds, classes),
+            "minute": _Ring(RESOLUTIONS["minute"], minutes, classes),
+        }
+        self._dirty_minutes = set()
+        self._lock = threading.Lock()
+
+    def observe(self, class_names, confidences, now=None):
+        """Record one frame; ``confidences`` are percentages, one per box.
+
+        ``now`` is on the local-time-as-UTC scale of ``db.to_epoch``, so minute
+        rollups line up with ``detected_at_epoch``.
+        """
+        now = _now() if now is None else now
+        with self._lock:
+            columns = np.array([self._column(name) for name in class_names], dtype=np.int64)
+            confidences = np.asarray(confidences, dtype=np.float64)
+            for ring in self._rings.values():
+                bucket_id = int(now // ring.width)
+                row = ring.slot(bucket_id)
+                ring.frames[row] += 1
+                if not len(columns):
+                    continue
+                np.add.at(ring.count[row], columns, 1)
+                np.add.at(ring.conf_sum[row], columns, confidences)
+                np.minimum.at(ring.conf_min[row], columns, confidences)
+                np.maximum.at(ring.conf_max[row], columns, confidences)
+                ring.present[row, np.unique(columns)] += 1
+            self._dirty_minutes.add(int(now // RESOLUTIONS["minute"]))
+
+    def summary(self, resolution="second", window=60, now=None):
+        """Per-class totals over the last ``window`` buckets of ``resolution``."""
+        now = _now() if now is None else now
+        ring = self._rings[resolution]
+        with self._lock:
+            _, idx, valid = ring.window(int(now // ring.width), window)
+            idx = idx[valid]
+            frames = int(ring.frames[idx].sum())
+            count = ring.count[idx].sum(axis=0)
+            conf_sum = ring.conf_sum[idx].sum(axis=0)
+            conf_min = ring.conf_min[idx].min(axis=0, initial=np.inf)
+            conf_max = ring.conf_max[idx].max(axis=0, initial=-np.inf)
+            present = ring.present[idx].sum(axis=0)
+            classes = {}
+            for name, col in self.class_index.items():
+                if not count[col]:
+                    continue
+                classes[name] = {
+                    "count": int(count[col]),
+                    "confidence_min": round(float(conf_min[col]), 2),
+                    "confidence_mean": round(float(conf_sum[col] / count[col]), 2),
+                    "confidence_max": round(float(conf_max[col]), 2),
+                    "occupancy": round(float(present[col]) / frames, 3) if frames else 0.0,
+                }
+        return {"resolution": resolution, "window": window, "frames": frames, "classes": classes}
+
+    def series(self, resolution="second", window=60, now=None):
+        """Per-bucket counts and occupancy per class, oldest bucket first."""
+        now = _now() if now is None else now
+        ring = self._rings[resolution]
+        with self._lock:
+            ids, idx, valid = ring.window(int(now // ring.width), window)
+            frames = np.where(valid, ring.frames[idx], 0)
+            count = np.where(valid[:, None], ring.count[idx], 0)
+            present = np.where(valid[:, None], ring.present[idx], 0)
+            occupancy = np.divide(present, frames[:, None], out=np.zeros(present.shape), where=frames[:, None] > 0)
+            classes = {
+                name: {"count": count[:, col].tolist(), "occupancy": occupancy[:, col].round(3).tolist()}
+                for name, col in self.class_index.items()
+                if count[:, col].any()
+            }
+        return {
+            "resolution": resolution,
+            "buckets": (ids * ring.width).tolist(),
+            "frames": frames.tolist(),
+            "classes": classes,
+        }
+
+    def drain_minutes(self):
+        """Rollup rows for minutes changed since the last call, for ``db.record_rollups``.
+
+        Rows hold the minute's running totals, so writing a minute again
+        simply replaces the earlier partial row.
+        """
+        ring = self._rings["minute"]
+        rows = []
+        with self._lock:
+            dirty, self._dirty_minutes = self._dirty_minutes, set()
+            for bucket_id in sorted(dirty):
+                row = bucket_id % ring.slots
+                if ring.bucket_ids[row] != bucket_id:
+                    continue
+                rows.append((FRAMES_ROW, bucket_id * ring.width, 0, None, 0.0, None, 0, int(ring.frames[row])))
+                for name, col in self.class_index.items():
+                    if ring.count[row, col]:
+                        rows.append(
+                            (
+                                name,
+                                bucket_id * ring.width,
+                                int(ring.count[row, col]),
+                                float(ring.conf_min[row, col]),
+                                float(ring.conf_sum[row, col]),
+                                float(ring.conf_max[row, col]),
+                                int(ring.present[row, col]),
+                                int(ring.frames[row]),
+                            )
+                        )
+        return rows
+
+    def restore_minutes(self, rows):
+        """Mark the minutes of undelivered ``drain_minutes`` rows dirty so the next drain retries them."""
+        width = RESOLUTIONS["minute"]
+        with self._lock:
+            self._dirty_minutes.update(int(row[1] // width) for row in rows)
+
+    @classmethod
+    def from_rollups(cls, rows, minutes=1440):
+        """Rebuild the per-minute ring of a finished session from ``db.list_rollups`` rows."""
+        stats = cls(seconds=1, minutes=minutes)
+        ring = stats._rings["minute"]
+        for name, minute_epoch, count, conf_min, conf_sum, conf_max, present, frames in rows:
+            row = ring.slot(minute_epoch // ring.width)
+            ring.frames[row] = frames
+            if name == FRAMES_ROW:
+                continue
+            col = stats._column(name)
+            ring.count[row, col] = count
+            ring.conf_min[row, col] = conf_min
+            ring.conf_sum[row, col] = conf_sum
+            ring.conf_max[row, col] = conf_max
+            ring.present[row, col] = present
+        return stats
+
+    def latest(self, resolution="second"):
+        """Start time of the newest bucket with data, or ``None``."""
+        ring = self._rings[resolution]
+        with self._lock:
+            newest = int(ring.bucket_ids.max())
+        return newest * ring.width if newest >= 0 else None
+
+    def _column(self, name):
+        col = self.class_index.get(name)
+        if col is None:
+            col = len(self.class_index)
+            self.class_index[name] = col
+            for ring in self._rings.values():
+                if col >= ring.count.shape[1]:
+                    ring.grow(ring.count.shape[1] * 2)
+        return col
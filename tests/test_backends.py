@@ -0,0 +1,186 @@
+import threading
+
+import numpy as np
+import pytest
+
+from backends import (
+    Detections,
+    LazyBackend,
+    OnnxBackend,
+    UltralyticsBackend,
+    batched_nms,
+    decode_output,
+    letterbox,
+    nms,
+    preprocess,
+    scale_boxes,
+)
+
+
+def test_nms_drops_overlapping_lower_scores():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60]], dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.7], dtype=np.float32)
+
+    assert nms(boxes, scores, 0.5).tolist() == [0, 2]
+
+
+def test_batched_nms_keeps_other_classes():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11]], dtype=np.float32)
+    scores = np.array([0.9, 0.8], dtype=np.float32)
+    classes = np.array([0, 1])
+
+    assert sorted(batched_nms(boxes, scores, classes, 0.5).tolist()) == [0, 1]
+
+
+def test_letterbox_round_trips_box_coordinates():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    padded, ratio, pad = letterbox(frame, (320, 320))
+
+    assert padded.shape == (320, 320, 3)
+    model_box = np.array([[0, 40, 160, 160]], dtype=np.float32)
+    assert np.allclose(scale_boxes(model_box, ratio, pad, frame.shape[:2]), [[0, 0, 320, 240]])
+    assert preprocess([padded]).shape == (1, 3, 320, 320)
+
+
+def test_decode_end_to_end_output():
+    output = np.array([[0, 0, 10, 10, 0.9, 2], [0, 0, 5, 5, 0.1, 1]], dtype=np.float32)
+
+    boxes, scores, classes = decode_output(output, conf=0.25, iou=0.45)
+
+    assert boxes.tolist() == [[0, 0, 10, 10]]
+    assert classes.tolist() == [2]
+
+
+def test_decode_raw_head_output():
+    # Two anchors for the same object plus one background anchor, 2 classes.
+    output = np.array(
+        [
+            [10, 11, 100],
+            [10, 10, 100],
+            [4, 4, 4],
+            [4, 4, 4],
+            [0.9, 0.8, 0.01],
+            [0.0, 0.1, 0.02],
+        ],
+        dtype=np.float32,
+    )
+
+    boxes, scores, classes = decode_output(output, conf=0.25, iou=0.45)
+
+    assert boxes.tolist() == [[8, 8, 12, 12]]
+    assert classes.tolist() == [0]
+
+
+class FakeTensor:
+    def __init__(self, values):
+        self.values = np.asarray(values)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class FakeBoxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy, self.conf, self.cls = FakeTensor(xyxy), FakeTensor(conf), FakeTensor(cls)
+
+    def __len__(self):
+        return len(self.conf.values)
+
+
+class FakeYolo:
+    """Answers like ``YOLO.predict``: one result with ``boxes`` per source frame."""
+
+    def predict(self, source, **kwargs):
+        boxes = FakeBoxes([[100.0, 100.0, 200.0, 200.0]], [0.9], [0.0])
+        return [type("Result", (), {"boxes": boxes})() for _ in source]
+
+
+class FakeOnnxSession:
+    """Answers like an end-to-end YOLOv10 export for 640x640 letterboxed input."""
+
+    def __init__(self):
+        self.shapes = []
+
+    def run(self, outputs, feeds):
+        blob = feeds["images"]
+        self.shapes.append(blob.shape)
+        # The 480x640 frame is padded by 80 px at the top; one hit and one below threshold.
+        rows = [[100, 180, 200, 280, 0.9, 0], [0, 80, 10, 90, 0.1, 0]]
+        return [np.array([rows] * len(blob), dtype=np.float32)]
+
+
+def _onnx_backend(session):
+    backend = OnnxBackend.__new__(OnnxBackend)
+    backend.names, backend.warmup_seconds = {0: "person"}, 0.0
+    backend.session, backend.input_name = session, "images"
+    backend.static_size, backend.batched = (640, 640), True
+    backend.imgsz, backend.conf, backend.iou = 640, 0.25, 0.45
+    return backend
+
+
+def _ultralytics_backend():
+    backend = UltralyticsBackend.__new__(UltralyticsBackend)
+    backend.names, backend.warmup_seconds = {0: "person"}, 0.0
+    backend.device, backend.model = "cpu", FakeYolo()
+    return backend
+
+
+def test_engines_return_the_same_detections():
+    frames = [np.zeros((480, 640, 3), dtype=np.uint8)] * 2
+    session = FakeOnnxSession()
+
+    onnx_results = _onnx_backend(session).predict(frames)
+    yolo_results = _ultralytics_backend().predict(frames)
+
+    assert session.shapes == [(2, 3, 640, 640)]
+    assert len(onnx_results) == len(yolo_results) == 2
+    for onnx, yolo in zip(onnx_results, yolo_results):
+        assert isinstance(onnx, Detections) and isinstance(yolo, Detections)
+        for onnx_field, yolo_field in zip(onnx, yolo):
+            assert onnx_field.dtype == yolo_field.dtype
+            assert onnx_field.shape == yolo_field.shape
+            assert np.allclose(onnx_field, yolo_field)
+
+
+class GatedBackend:
+    names = {0: "person"}
+
+    def __init__(self, gate):
+        gate.wait(5)
+        self.warmup_seconds = 0.0
+        self.warmups = 0
+
+    def warmup(self, runs=1):
+        self.warmups += runs
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        return [frame.shape for frame in frames]
+
+
+def test_lazy_backend_loads_and_warms_up_in_the_background():
+    gate = threading.Event()
+    backend = LazyBackend(lambda: GatedBackend(gate), warmup_runs=2).start()
+
+    assert backend.state == "loading"
+    assert not backend.wait_ready(timeout=0.01)
+    assert backend.names == {}
+
+    gate.set()
+    assert backend.predict([np.zeros((4, 6, 3), dtype=np.uint8)]) == [(4, 6, 3)]
+    assert backend.ready and backend.backend.warmups == 2
+    assert backend.stats()["ready_seconds"] >= backend.stats()["load_seconds"]
+
+
+def test_lazy_backend_reports_load_failures():
+    def missing():
+        raise FileNotFoundError("no weights")
+
+    backend = LazyBackend(missing).start()
+
+    assert not backend.wait_ready(timeout=5)
+    assert backend.stats()["state"] == "failed"
+    with pytest.raises(RuntimeError, match="no weights"):
+        backend.predict([])
@@ -0,0 +1,118 @@
+import os
+import tempfile
+from datetime import datetime
+
+import cv2
+import numpy as np
+import pytest
+
+from backends import Detections
+from batch import BatchProcessor, expand_inputs, main
+from db import get_batch_progress, init_db, list_detections
+
+
+class StubBackend:
+    names = {0: "person"}
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        self.batch_sizes.append(len(frames))
+        return [
+            Detections(
+                np.array([[1, 1, 10, 10]], dtype=np.float32),
+                np.array([0.9], dtype=np.float32),
+                np.array([0], dtype=np.int64),
+            )
+            for _ in frames
+        ]
+
+
+class MovingBackend(StubBackend):
+    """Reports a box that jumps each frame, so every frame holds a new object."""
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        results = []
+        for _ in frames:
+            offset = 100 * len(self.batch_sizes)
+            self.batch_sizes.append(1)
+            results.append(
+                Detections(
+                    np.array([[offset, 0, offset + 10, 10]], dtype=np.float32),
+                    np.array([0.9], dtype=np.float32),
+                    np.array([0], dtype=np.int64),
+                )
+            )
+        return results
+
+
+def _write_images(image_dir, count):
+    os.makedirs(image_dir)
+    for idx in range(count):
+        cv2.imwrite(os.path.join(image_dir, f"{idx:03d}.png"), np.zeros((16, 16, 3), dtype=np.uint8))
+
+
+def test_expand_inputs_accepts_dirs_and_globs():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_dir = os.path.join(tmp_dir, "images")
+        _write_images(image_dir, 3)
+        open(os.path.join(image_dir, "notes.txt"), "w").close()
+
+        from_dir = expand_inputs([image_dir])
+        from_glob = expand_inputs([os.path.join(image_dir, "*.png")])
+
+        assert len(from_dir) == 3
+        assert from_dir == from_glob
+
+
+def test_batch_run_records_detections_and_resumes():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "test.db")
+        image_dir = os.path.join(tmp_dir, "images")
+        init_db(db_path)
+        _write_images(image_dir, 5)
+        paths = expand_inputs([image_dir])
+
+        backend = StubBackend()
+        summary = BatchProcessor(backend, "backfill", db_path=db_path, batch_size=4).run(paths)
+
+        assert summary["frames"] == 5
+        assert len(list_detections("backfill", limit=10, db_path=db_path)) == 5
+        progress = get_batch_progress("backfill", db_path=db_path)
+        assert all(state["completed"] for state in progress.values())
+        assert max(backend.batch_sizes) > 1
+
+        resumed = BatchProcessor(StubBackend(), "backfill", db_path=db_path).run(paths)
+        assert resumed["frames"] == 0
+        assert resumed["skipped"] == 5
+
+
+def test_detections_are_stamped_with_footage_time():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "test.db")
+        init_db(db_path)
+        video_path = os.path.join(tmp_dir, "clip.avi")
+        writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"MJPG"), 1, (16, 16))
+        for idx in range(3):
+            writer.write(np.full((16, 16, 3), idx * 80, dtype=np.uint8))
+        writer.release()
+        image_dir = os.path.join(tmp_dir, "images")
+        _write_images(image_dir, 1)
+        image_path = expand_inputs([image_dir])[0]
+        taken = datetime(2026, 2, 11, 9, 30, 0).timestamp()
+        os.utime(image_path, (taken, taken))
+
+        start = datetime(2026, 2, 11, 10, 0, 0)
+        BatchProcessor(MovingBackend(), "video", db_path=db_path, batch_size=2, start_times={video_path: start}).run(
+            [video_path, image_path]
+        )
+
+        assert sorted(row["timestamp"] for row in list_detections("video", limit=10, db_path=db_path)) == [
+            "2026-02-11 09:30:00",
+            "2026-02-11 10:00:00",
+            "2026-02-11 10:00:01",
+            "2026-02-11 10:00:02",
+        ]
+        with pytest.raises(SystemExit):
+            main([video_path, image_dir, "--session", "x", "--db", db_path, "--start-time", "2026-02-11 10:00:00"])
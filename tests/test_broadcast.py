@@ -0,0 +1,53 @@
+from broadcast import FrameHub
+
+
+def test_hub_runs_producer_only_while_subscribed():
+    events = []
+    hub = FrameHub(on_active=lambda: events.append("active"), on_idle=lambda: events.append("idle"))
+
+    first = hub.subscribe()
+    second = hub.subscribe()
+    hub.unsubscribe(first)
+    assert events == ["active"]
+    hub.unsubscribe(second)
+    assert events == ["active", "idle"]
+    assert hub.subscriber_count == 0
+
+
+def test_slow_subscriber_skips_frames_without_blocking():
+    hub = FrameHub(queue_size=2)
+    fast = hub.subscribe()
+    slow = hub.subscribe()
+
+    for frame in range(5):
+        hub.publish(frame)
+        assert fast.get(timeout=0) == frame
+
+    assert [slow.get(timeout=0), slow.get(timeout=0)] == [3, 4]
+    assert slow.dropped == 3
+    assert fast.dropped == 0
+    stats = {client["id"]: client for client in hub.stats()["clients"]}
+    assert stats[slow.id]["drop_rate"] == 0.6
+
+
+def test_close_all_wakes_subscribers():
+    hub = FrameHub()
+    subscriber = hub.subscribe()
+    hub.close_all()
+    assert subscriber.get(timeout=1) is None
+    assert subscriber.closed
+
+
+def test_passive_subscribers_do_not_keep_the_producer_running():
+    events = []
+    hub = FrameHub(on_active=lambda: events.append("active"), on_idle=lambda: events.append("idle"))
+
+    boxes = hub.subscribe(passive=True)
+    assert events == [] and hub.subscriber_count == 0
+    viewer = hub.subscribe()
+    hub.publish("frame")
+    assert boxes.get(timeout=0) == "frame"
+    hub.unsubscribe(viewer)
+    assert events == ["active", "idle"]
+    hub.unsubscribe(boxes)
+    assert events == ["active", "idle"]
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from backends import Detections
+from cameras import BatchScheduler, CameraStream, parse_camera_sources
+
+
+class EchoBackend:
+    """Returns one box whose confidence is the frame's pixel value / 100."""
+
+    names = {0: "person"}
+    warmup_seconds = 0.0
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.batch_sizes = []
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        self.batch_sizes.append(len(frames))
+        time.sleep(self.latency)
+        return [
+            Detections(
+                np.array([[1, 1, 10, 10]], dtype=np.float32),
+                np.array([frame[0, 0, 0] / 100], dtype=np.float32),
+                np.array([0], dtype=np.int64),
+            )
+            for frame in frames
+        ]
+
+
+def test_batch_scheduler_batches_concurrent_streams_and_routes_results():
+    backend = EchoBackend(latency=0.01)
+    batcher = BatchScheduler(backend, max_batch=4, max_wait=0.2).start()
+    results = {}
+
+    def stream(value):
+        frame = np.full((8, 8, 3), value, dtype=np.uint8)
+        for _ in range(5):
+            results.setdefault(value, []).append(float(batcher.predict([frame])[0].conf[0]))
+
+    threads = [threading.Thread(target=stream, args=(value,)) for value in (10, 20, 30, 40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    batcher.stop()
+
+    for value, confs in results.items():
+        assert confs == pytest.approx([value / 100] * 5)
+    assert sum(backend.batch_sizes) == 20
+    assert max(backend.batch_sizes) == 4
+    assert batcher.stats()["avg_batch_size"] > 1
+
+
+def test_batch_scheduler_does_not_wait_for_a_single_stream():
+    batcher = BatchScheduler(EchoBackend(), max_batch=8, max_wait=1.0).start()
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+
+    started = time.monotonic()
+    for _ in range(3):
+        batcher.predict([frame])
+    batcher.stop()
+
+    assert time.monotonic() - started < 0.5
+
+
+def test_parse_camera_sources():
+    assert parse_camera_sources("front=0, door=rtsp://host/live?a=b,clip.mp4") == [
+        ("front", 0),
+        ("door", "rtsp://host/live?a=b"),
+        ("cam2", "clip.mp4"),
+    ]
+    assert parse_camera_sources("") == []
+    with pytest.raises(ValueError):
+        parse_camera_sources("front=")
+
+
+class ClosedCapture:
+    def isOpened(self):
+        return False
+
+    def release(self):
+        pass
+
+
+def test_camera_stream_reports_unopenable_source():
+    stream = CameraStream("front", 0, service=None, open_capture=lambda source: ClosedCapture())
+
+    with pytest.raises(RuntimeError, match="front"):
+        stream.start()
+    assert not stream.running
@@ -1,8 +1,24 @@
 import os
 import sqlite3
 import tempfile
+import threading
 
-from db import init_db, list_detections, list_sessions, record_detection
+import db
+import metrics
+from db import (
+    DetectionWriter,
+    get_snapshot,
+    init_db,
+    list_detections,
+    list_detections_page,
+    list_sessions,
+    list_snapshot_classes,
+    list_snapshots,
+    prune_sessions,
+    record_detection,
+    record_snapshot,
+    to_epoch,
+)
 
 
 def _db_path(tmp_dir):
@@ -50,3 +66,207 @@ def test_list_sessions_groups_counts():
 
         session_a = next(row for row in sessions if row["session_name"] == "session_a")
         assert session_a["total"] == 2
+
+
+def test_writer_batches_rows_and_flushes():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = _db_path(tmp_dir)
+        init_db(db_path)
+
+        writer = DetectionWriter(db_path, batch_size=50, flush_interval=10)
+        for idx in range(120):
+            assert writer.submit("session_a", "person", 50.0, f"2026-02-11 10:00:{idx % 60:02d}")
+        assert writer.flush(timeout=5)
+        writer.close(timeout=5)
+
+        assert writer.written == 120
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM detections").fetchone()[0] == 120
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
+
+
+def test_writer_counts_dropped_rows_when_full():
+    release = threading.Event()
+
+    class StalledWriter(DetectionWriter):
+        def _run(self):
+            release.wait()
+            super()._run()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = _db_path(tmp_dir)
+        init_db(db_path)
+
+        writer = StalledWriter(db_path, queue_size=2)
+        accepted = [writer.submit("session_a", "dog", 40.0, "2026-02-11 10:00:01") for _ in range(5)]
+        release.set()
+        writer.close(timeout=5)
+
+        assert accepted.count(True) == 2
+        assert writer.dropped == 3
+        assert writer.written == 2
+
+
+def test_writer_metrics_count_detection_rows_and_failures():
+    written = metrics.REGISTRY.counter("detector_db_rows_written_total")
+    failed = metrics.REGISTRY.counter("detector_db_rows_failed_total")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = _db_path(tmp_dir)
+        init_db(db_path)
+        before = written.value
+        writer = DetectionWriter(db_path)
+        writer.submit("session_a", "person", 50.0, "2026-02-11 10:00:00")
+        writer.submit_snapshot("session_a", "person", "2026-02-11 10:00:00", "session_a/person/a.jpg", 10)
+        writer.close(timeout=5)
+        assert (writer.written, written.value - before) == (2, 1)
+
+        before = failed.value
+        writer = DetectionWriter(os.path.join(tmp_dir, "missing.db"))
+        writer.submit("session_a", "person", 50.0, "2026-02-11 10:00:00")
+        writer.close(timeout=5)
+        assert (writer.failed, failed.value - before) == (1, 1)
+
+
+class LockedOnceConnection:
+    def __init__(self, conn):
+        self.conn = conn
+        self.attempts = 0
+
+    def __enter__(self):
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self.conn.__exit__(*exc_info)
+
+    def executemany(self, sql, rows):
+        self.attempts += 1
+        if self.attempts == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return self.conn.executemany(sql, rows)
+
+
+def test_writer_retries_a_locked_batch_and_logs_failures(monkeypatch, capsys):
+    monkeypatch.setattr(db, "WRITER_RETRY_DELAY", 0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = _db_path(tmp_dir)
+        init_db(db_path)
+        writer = DetectionWriter(db_path)
+        writer.close(timeout=5)
+        conn = sqlite3.connect(db_path)
+        row = ("session_a", "person", 50.0, "2026-02-11 10:00:00", to_epoch("2026-02-11 10:00:00"))
+
+        writer._write_rows(LockedOnceConnection(conn), [("detection", row)])
+        assert (writer.written, writer.failed) == (1, 0)
+
+        writer._write_rows(conn, [("detection", row[:4])])
+        assert writer.failed == 1
+        assert "[ERROR] Dropped 1 queued rows" in capsys.readouterr().out
+        assert conn.execute("SELECT COUNT(*) FROM detections").fetchone()[0] == 1
+        conn.close()
+
+
+def test_snapshot_catalog_keyset_pagination():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = _db_path(tmp_dir)
+        init_db(db_path)
+
+        for idx in range(5):
+            class_name = "person" if idx % 2 == 0 else "dog"
+            path = f"session_a/{class_name}/2026-02-11 10_00_0{idx}.jpg"
+            record_snapshot("session_a", class_name, f"2026-02-11 10:00:0{idx}", path, 100 + idx, db_path)
+
+        first = list_snapshots("session_a", limit=2, db_path=db_path)
+        second = list_snapshots("session_a", before_id=first[-1]["id"], limit=2, db_path=db_path)
+        people = list_snapshots("session_a", class_name="person", db_path=db_path)
+
+        assert [row["size_bytes"] for row in first + second] == [104, 103, 102, 101]
+        assert len(people) == 3
+        assert list_snapshot_classes("session_a", db_path=db_path) == [
+            {"class_name": "dog", "total": 2},
+            {"class_name": "person", "total": 3},
+        ]
+        assert get_snapshot(first[0]["id"], db_path=db_path)["path"].endswith("10_00_04.jpg")
+
+
+def test_init_db_migrates_legacy_schema():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = _db_path(tmp_dir)
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            """
+            CREATE TABLE detections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_name TEXT NOT NULL,
+                class_name TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                detected_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "INSERT INTO detections (session_name, class_name, confidence, detected_at) "
+            "VALUES ('old', 'person', 90.0, '2026-02-11 10:00:00')"
+        )
+        conn.commit()
+        conn.close()
+
+        init_db(db_path)
+        init_db(db_path)
+
+        conn = sqlite3.connect(db_path)
+        epoch = conn.execute("SELECT detected_at_epoch FROM detections").fetchone()[0]
+        conn.close()
+        assert epoch == to_epoch("2026-02-11 10:00:00")
+        assert list_sessions(db_path=db_path) == [
+            {"session_name": "old", "last_seen": "2026-02-11 10:00:00", "total": 1}
+        ]
+
+
+def test_sessions_summary_is_maintained_incrementally():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = _db_path(tmp_dir)
+        init_db(db_path)
+
+        record_detection("session_a", "person", 91.2, "2026-02-11 10:05:00", db_path)
+        list_sessions(db_path=db_path)
+        record_detection("session_a", "dog", 88.4, "2026-02-11 10:01:00", db_path)
+        record_detection("session_b", "chair", 70.1, "2026-02-11 11:00:00", db_path)
+
+        sessions = list_sessions(db_path=db_path)
+        assert [row["session_name"] for row in sessions] == ["session_b", "session_a"]
+        assert sessions[1] == {"session_name": "session_a", "last_seen": "2026-02-11 10:05:00", "total": 2}
+
+
+def test_detections_keyset_pagination():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = _db_path(tmp_dir)
+        init_db(db_path)
+        for minute in range(5):
+            record_detection("session_a", f"class_{minute}", 50.0, f"2026-02-11 10:0{minute}:00", db_path)
+
+        first, cursor = list_detections_page("session_a", limit=2, db_path=db_path)
+        second, cursor = list_detections_page("session_a", limit=2, cursor=cursor, db_path=db_path)
+        third, cursor = list_detections_page("session_a", limit=2, cursor=cursor, db_path=db_path)
+
+        names = [row["class_name"] for row in first + second + third]
+        assert names == ["class_4", "class_3", "class_2", "class_1", "class_0"]
+        assert cursor is None
+
+
+def test_prune_sessions_removes_old_rows():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = _db_path(tmp_dir)
+        init_db(db_path)
+        for second in range(7):
+            record_detection("old", "person", 50.0, f"2026-01-01 10:00:0{second}", db_path)
+        record_snapshot("old", "person", "2026-01-01 10:00:00", "old/person/a.jpg", 10, db_path)
+        record_detection("new", "person", 50.0, "2026-03-01 10:00:00", db_path)
+        list_sessions(db_path=db_path)
+
+        pruned = prune_sessions(to_epoch("2026-02-01 00:00:00"), batch_size=3, db_path=db_path)
+
+        assert pruned == ["old"]
+        assert [row["session_name"] for row in list_sessions(db_path=db_path)] == ["new"]
+        assert list_detections("old", db_path=db_path) == []
+        assert list_snapshots("old", db_path=db_path) == []
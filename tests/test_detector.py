@@ -0,0 +1,126 @@
+import tempfile
+
+import numpy as np
+
+import detector
+
+from backends import Detections
+from db import close_writers, init_db, list_rollups
+from detector import DetectionService
+from scheduler import InferenceScheduler
+
+
+class ScriptedBackend:
+    names = {0: "person", 1: "dog"}
+
+    def __init__(self):
+        self.next = []
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        boxes = [box for box, _, _ in self.next]
+        return [
+            Detections(
+                np.array(boxes, dtype=np.float32).reshape(-1, 4),
+                np.array([conf for _, conf, _ in self.next], dtype=np.float32),
+                np.array([cls for _, _, cls in self.next], dtype=np.int64),
+            )
+        ]
+
+
+def _service(tmp_dir):
+    db_path = f"{tmp_dir}/detections.db"
+    init_db(db_path)
+    # Positional arguments follow the original (model_path, device, output_dir, db_path) order.
+    service = DetectionService("yolov10n.pt", "cpu", f"{tmp_dir}/snapshots", db_path, backend=ScriptedBackend())
+    service.start_session("test")
+    return service
+
+
+def _frame():
+    return np.zeros((64, 64, 3), dtype=np.uint8)
+
+
+def test_version_only_moves_when_history_changes():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        service = _service(tmp_dir)
+        start = service.version
+        assert service.model is service.backend
+
+        service.backend.next = [([1, 1, 20, 20], 0.8, 0)]
+        service.process_frame(_frame())
+        assert service.version == start + 1
+
+        service.backend.next = [([1, 1, 20, 20], 0.7, 0)]
+        service.process_frame(_frame())
+        assert service.version == start + 1
+
+        service.backend.next = [([1, 1, 20, 20], 0.9, 0), ([30, 30, 60, 60], 0.5, 1)]
+        service.process_frame(_frame())
+        assert service.version == start + 2
+        assert [d["class_name"] for d in service.latest_detections] == ["person", "dog"]
+        assert service.latest_detections[0]["confidence"] == 90.0
+
+        service.snapshot_writer.close()
+        close_writers()
+
+
+def test_detections_since_returns_deltas_and_full_after_reset():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        service = _service(tmp_dir)
+        start = service.version
+
+        service.backend.next = [([1, 1, 20, 20], 0.8, 0)]
+        service.process_frame(_frame())
+        service.backend.next = [([1, 1, 20, 20], 0.8, 0), ([30, 30, 60, 60], 0.5, 1)]
+        service.process_frame(_frame())
+
+        kind, version, entries = service.detections_since(start + 1)
+        assert (kind, version) == ("delta", start + 2)
+        assert [d["class_name"] for d in entries] == ["dog"]
+        assert service.detections_since(version) == (None, version, [])
+        assert service.detections_since(None)[0] == "full"
+
+        service.start_session("again")
+        kind, version, entries = service.detections_since(start + 2)
+        assert (kind, version, entries) == ("full", start + 3, [])
+        assert service.wait_for_change(start + 2, timeout=0)
+        assert not service.wait_for_change(version, timeout=0.01)
+
+        service.snapshot_writer.close()
+        close_writers()
+
+
+def test_rejected_rollups_are_retried_on_the_next_flush(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        service = _service(tmp_dir)
+        service.backend.next = [([1, 1, 20, 20], 0.8, 0)]
+        service.process_frame(_frame())
+
+        monkeypatch.setattr(detector, "record_rollups", lambda *args, **kwargs: False)
+        service.flush_stats()
+        monkeypatch.undo()
+        service.flush_stats(block=True)
+
+        rows = list_rollups("test", db_path=service.db_path)
+        assert sorted(row[0] for row in rows if row[2]) == ["person"]
+
+        service.snapshot_writer.close()
+        close_writers()
+
+
+def test_skipped_frames_count_towards_stats_with_the_last_detections():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        service = _service(tmp_dir)
+        service.scheduler = InferenceScheduler(motion_threshold=4.0, max_skip=30)
+        service.backend.next = [([1, 1, 20, 20], 0.8, 0)]
+
+        service.process_frame(_frame())
+        service.submit_frame(_frame())()
+
+        summary = service.stats.summary("minute", window=1)
+        assert service.scheduler.stats()["skipped"] == 1
+        assert summary["frames"] == 2
+        assert (summary["classes"]["person"]["count"], summary["classes"]["person"]["occupancy"]) == (2, 1.0)
+
+        service.snapshot_writer.close()
+        close_writers()
@@ -0,0 +1,62 @@
+import numpy as np
+
+from encoder import AdaptiveEncoder
+from pipeline import FramePacket
+
+LADDER = ((1.0, 80, None), (0.5, 60, 10), (0.25, 40, 2))
+
+
+def _packet(seq, captured_at):
+    packet = FramePacket(seq, captured_at, np.full((120, 160, 3), 200, dtype=np.uint8))
+    packet.raw = np.zeros((120, 160, 3), dtype=np.uint8)
+    return packet
+
+
+def test_packet_encodes_each_variant_once():
+    packet = _packet(1, 0.0)
+
+    full = packet.encode(80)
+    assert packet.encode(80) is full
+    assert packet.encode(60, 0.5) is packet.encode(60, 0.5)
+    assert packet.encode(80, raw=True) is not full
+    assert len(packet._variants) == 3
+
+
+def test_raw_request_falls_back_to_drawn_frame():
+    packet = FramePacket(1, 0.0, np.zeros((8, 8, 3), dtype=np.uint8))
+
+    assert packet.encode(80, raw=True) is packet.encode(80)
+
+
+def test_slow_sends_step_down_and_fast_sends_step_back_up():
+    encoder = AdaptiveEncoder(LADDER, hold_seconds=1.0)
+    now = 100.0
+    for idx in range(10):
+        encoder.record(10000, 0.1, captured_at=idx / 30, now=now + idx * 0.5)
+    assert encoder.level == 2
+
+    for idx in range(10, 30):
+        encoder.record(1000, 0.001, captured_at=idx / 2, now=now + idx * 0.5)
+    assert encoder.level == 0
+
+
+def test_dropped_frames_step_down_and_fixed_level_never_moves():
+    encoder = AdaptiveEncoder(LADDER, hold_seconds=0.0)
+    encoder.record(1000, 0.001, captured_at=0.0, now=1.0)
+    encoder.record(1000, 0.001, captured_at=0.1, dropped=3, now=2.0)
+    assert encoder.level == 1
+
+    pinned = AdaptiveEncoder(LADDER, level=2, hold_seconds=0.0)
+    for idx in range(5):
+        pinned.record(1000, 0.001, captured_at=idx * 0.5, now=float(idx))
+    assert pinned.level == 2
+
+
+def test_fps_cap_skips_frames_between_sends():
+    encoder = AdaptiveEncoder(LADDER, level=1)
+
+    assert encoder.encode(_packet(1, 0.0)) is not None
+    encoder.record(100, 0.001, captured_at=0.0)
+    assert encoder.encode(_packet(2, 0.05)) is None
+    assert encoder.encode(_packet(3, 0.1)) is not None
+    assert encoder.stats()["skipped"] == 1
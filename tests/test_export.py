@@ -0,0 +1,82 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+
+import pytest
+
+from db import DetectionWriter, init_db, iter_detections
+from export import export_detections, main, parse_time
+
+
+def _seed(tmp_dir):
+    db_path = os.path.join(tmp_dir, "test.db")
+    init_db(db_path)
+    writer = DetectionWriter(db_path)
+    for idx in range(25):
+        class_name = "person" if idx % 2 else "dog"
+        writer.submit("session_a", class_name, 50.0 + idx, f"2026-02-11 10:00:{idx:02d}")
+    writer.submit("session_b", "person", 90.0, "2026-02-11 10:00:00")
+    writer.close()
+    return db_path
+
+
+def test_iter_detections_streams_chunks_with_filters():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = _seed(tmp_dir)
+
+        chunks = list(iter_detections("session_a", chunk_size=10, db_path=db_path))
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+        assert chunks[0][0]["timestamp"] == "2026-02-11 10:00:00"
+
+        start, end = parse_time("2026-02-11 10:00:05"), parse_time("2026-02-11 10:00:10")
+        rows = [row for chunk in iter_detections("session_a", start, end, ["person"], db_path=db_path) for row in chunk]
+        assert [row["timestamp"][-2:] for row in rows] == ["05", "07", "09"]
+
+
+def test_epoch_bounds_match_local_timestamps(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = _seed(tmp_dir)
+            start = int(time.mktime(time.strptime("2026-02-11 10:00:05", "%Y-%m-%d %H:%M:%S")))
+
+            assert parse_time(str(start)) == parse_time("2026-02-11 10:00:05")
+            ndjson = "".join(export_detections("session_a", start=str(start), end=str(start + 3), db_path=db_path))
+            assert [json.loads(line)["timestamp"][-2:] for line in ndjson.splitlines()] == ["05", "06", "07"]
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_export_formats_and_gzip():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = _seed(tmp_dir)
+
+        ndjson = "".join(export_detections("session_b", db_path=db_path))
+        assert [json.loads(line)["confidence"] for line in ndjson.splitlines()] == [90.0]
+
+        packed = b"".join(export_detections("session_a", fmt="csv", compress=True, chunk_size=7, db_path=db_path))
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(packed).decode("utf-8"))))
+        assert len(rows) == 25
+        assert rows[-1]["class_name"] == "dog"
+
+        with pytest.raises(ValueError):
+            export_detections("session_a", fmt="xml", db_path=db_path)
+        with pytest.raises(ValueError):
+            export_detections("session_a", start="yesterday", db_path=db_path)
+
+
+def test_cli_writes_export_file():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = _seed(tmp_dir)
+        output = os.path.join(tmp_dir, "person.ndjson.gz")
+
+        main(["--session", "session_a", "--class", "person", "--gzip", "--output", output, "--db", db_path])
+
+        with gzip.open(output, "rt") as handle:
+            assert sum(1 for _ in handle) == 12
@@ -0,0 +1,45 @@
+from metrics import Histogram, Registry
+
+
+def test_histogram_buckets_and_prometheus_text():
+    registry = Registry(buckets=(0.01, 0.1))
+    registry.observe("inference", 0.005)
+    registry.observe("inference", 0.05)
+    registry.observe("inference", 1.0)
+    registry.counter("detector_frames_processed_total", "Frames.").inc(3)
+
+    text = registry.render()
+
+    assert "# TYPE detector_frames_processed_total counter" in text
+    assert "detector_frames_processed_total 3" in text
+    assert 'detector_stage_seconds_bucket{stage="inference",le="0.01"} 1' in text
+    assert 'detector_stage_seconds_bucket{stage="inference",le="0.1"} 2' in text
+    assert 'detector_stage_seconds_bucket{stage="inference",le="+Inf"} 3' in text
+    assert 'detector_stage_seconds_count{stage="inference"} 3' in text
+
+
+def test_disabled_registry_records_nothing():
+    registry = Registry(enabled=False)
+
+    with registry.timer("encode"):
+        pass
+    registry.inc("detector_detections_total")
+
+    assert registry.render() == "\n"
+
+
+def test_render_tolerates_metrics_registered_mid_scrape():
+    registry = Registry()
+
+    class RegisteringHistogram(Histogram):
+        """Registers another stage while render is reading the first one."""
+
+        def snapshot(self):
+            registry.observe("late", 0.01)
+            registry.inc("late_total")
+            return super().snapshot()
+
+    registry._stages["early"] = RegisteringHistogram()
+
+    registry.render()
+    assert "late_total" in registry.render()
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import numpy as np
+
+from pipeline import BLOCK, FrameSlot, StreamPipeline
+
+
+class FakeCamera:
+    def __init__(self, frames):
+        self.remaining = frames
+
+    def read(self):
+        time.sleep(0.001)
+        if self.remaining <= 0:
+            return False, None
+        self.remaining -= 1
+        return True, np.zeros((48, 64, 3), dtype=np.uint8)
+
+
+def test_latest_slot_replaces_unconsumed_item():
+    slot = FrameSlot()
+    slot.put(1)
+    slot.put(2)
+    assert slot.get(timeout=0) == 2
+    assert slot.dropped == 1
+    assert slot.get(timeout=0) is None
+
+
+def test_block_slot_waits_for_consumer():
+    slot = FrameSlot(BLOCK)
+    slot.put(1)
+    producer = threading.Thread(target=slot.put, args=(2,))
+    producer.start()
+    producer.join(timeout=0.1)
+    assert producer.is_alive()
+    assert slot.get(timeout=1) == 1
+    producer.join(timeout=1)
+    assert slot.get(timeout=1) == 2
+    assert slot.dropped == 0
+
+
+def test_pipeline_publishes_frames_and_reports_latency():
+    pipeline = StreamPipeline(FakeCamera(10000), lambda frame: frame, drop_policy=BLOCK).start()
+    packet = pipeline.get(timeout=5)
+    pipeline.stop()
+
+    assert packet._variants == {}
+    assert packet.jpeg.startswith(b"\xff\xd8")
+    assert list(packet._variants) == [(80, 1.0, False)]
+    assert packet.latency >= 0
+    stats = pipeline.stats()
+    assert stats["frames_published"] >= 1
+    assert stats["latency_ms_avg"] is not None
+
+
+def test_pipeline_surfaces_camera_failure():
+    pipeline = StreamPipeline(FakeCamera(0), lambda frame: frame).start()
+    assert pipeline.get(timeout=0.5) is None
+    assert pipeline.error == "Failed to read from camera."
+    assert not pipeline.running
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from backends import Detections
+from roi import RegionBackend, RegionPlanner, parse_regions, tile_windows
+from workers import WorkerPool
+
+
+class CornerBackend:
+    """Finds one object: the bright square drawn in each test frame."""
+
+    names = {0: "person"}
+    warmup_seconds = 0.0
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        self.calls.append([frame.shape for frame in frames])
+        results = []
+        for frame in frames:
+            ys, xs = np.nonzero(frame[..., 0])
+            if not len(xs):
+                results.append(Detections(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)))
+                continue
+            box = [xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]
+            results.append(Detections(np.array([box], np.float32), np.array([0.9], np.float32), np.array([0])))
+        return results
+
+
+def test_tile_windows_cover_region_with_overlap():
+    windows = tile_windows(0, 0, 1000, 300, 400, overlap=0.25)
+
+    assert windows == [(0, 0, 400, 300), (300, 0, 700, 300), (600, 0, 1000, 300)]
+    assert tile_windows(10, 10, 100, 100, 400) == [(10, 10, 100, 100)]
+
+
+def test_planner_resolves_fractional_and_pixel_regions():
+    planner = RegionPlanner([(0.5, 0.0, 0.5, 0.5), (10, 10, 5000, 20)])
+
+    assert planner.windows((400, 800, 3)) == [(400, 0, 800, 200), (10, 10, 800, 30)]
+    assert RegionPlanner().windows((40, 60, 3)) == [(0, 0, 60, 40)]
+
+
+def test_region_backend_batches_crops_and_maps_boxes_back():
+    frame = np.zeros((200, 400, 3), dtype=np.uint8)
+    frame[120:140, 300:330] = 255
+    backend = CornerBackend()
+    regions = RegionBackend(backend, RegionPlanner(tile_size=200, overlap=0.5))
+
+    detections = regions.predict([frame, frame])
+
+    assert len(backend.calls) == 1
+    assert len(backend.calls[0]) == 2 * 3
+    for result in detections:
+        assert result.xyxy.tolist() == [[300, 120, 330, 140]]
+
+
+def test_region_backend_skips_areas_outside_regions():
+    frame = np.zeros((200, 400, 3), dtype=np.uint8)
+    frame[10:20, 10:20] = 255
+    backend = CornerBackend()
+
+    detections = RegionBackend(backend, RegionPlanner([(200, 0, 200, 200)])).predict([frame])[0]
+
+    assert backend.calls == [[(200, 200, 3)]]
+    assert len(detections.xyxy) == 0
+
+
+def test_region_backend_pipelines_crops_through_a_worker_pool():
+    frame = np.zeros((200, 400, 3), dtype=np.uint8)
+    frame[120:140, 300:330] = 255
+    planner = RegionPlanner(tile_size=200, overlap=0.5)
+    assert not hasattr(RegionBackend(CornerBackend(), planner), "submit")
+
+    pool = WorkerPool(CornerBackend, workers=2).start()
+    try:
+        regions = RegionBackend(pool, planner)
+        handles = [regions.submit(frame), regions.submit(frame[:, :200])]
+        detections, elapsed = regions.result(handles[0], timeout=10)
+        assert detections.xyxy.tolist() == [[300, 120, 330, 140]]
+        assert elapsed >= 0
+        assert len(regions.result(handles[1], timeout=10)[0].xyxy) == 0
+        assert pool.stats()["completed"] == 3 + 1
+    finally:
+        pool.close()
+
+
+def test_parse_regions():
+    assert parse_regions("0,0.5,1,0.5; 10,20,300,400") == [(0, 0.5, 1, 0.5), (10, 20, 300, 400)]
+    assert parse_regions("") == []
+    with pytest.raises(ValueError):
+        parse_regions("0,0,1")
@@ -0,0 +1,77 @@
+import sys
+import threading
+
+import numpy as np
+
+from scheduler import InferenceScheduler
+
+
+def _frame(value):
+    return np.full((120, 160, 3), value, dtype=np.uint8)
+
+
+def test_static_scene_skips_inference_until_max_skip():
+    scheduler = InferenceScheduler(motion_threshold=4.0, max_skip=3)
+
+    decisions = [scheduler.should_infer(_frame(100)) for _ in range(6)]
+
+    assert decisions == [True, False, False, False, True, False]
+    stats = scheduler.stats()
+    assert stats["inferred"] == 2
+    assert stats["skip_ratio"] == round(4 / 6, 3)
+
+
+def test_motion_triggers_inference():
+    scheduler = InferenceScheduler(motion_threshold=4.0)
+    scheduler.should_infer(_frame(100))
+
+    assert not scheduler.should_infer(_frame(102))
+    assert scheduler.should_infer(_frame(140))
+    assert scheduler.stats()["last_motion"] == 40.0
+
+
+def test_zero_threshold_disables_gating():
+    scheduler = InferenceScheduler(motion_threshold=0)
+
+    assert all(scheduler.should_infer(_frame(100)) for _ in range(3))
+
+
+def test_imgsz_steps_down_under_pressure_and_recovers():
+    scheduler = InferenceScheduler(imgsz_ladder=[640, 480, 320], frame_budget=0.1)
+    assert scheduler.imgsz == 640
+
+    scheduler.record_inference(0.3)
+    assert scheduler.imgsz == 480
+    scheduler.record_inference(0.3)
+    assert scheduler.imgsz == 320
+    scheduler.record_inference(0.01)
+    assert scheduler.imgsz == 480
+
+
+def test_stats_can_be_polled_while_inference_is_recorded():
+    scheduler = InferenceScheduler(window_seconds=0.01)
+    stop = threading.Event()
+    errors = []
+
+    def record():
+        while not stop.is_set():
+            scheduler.record_inference(0.001)
+
+    def poll():
+        try:
+            for _ in range(1000):
+                scheduler.stats()
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    recorder = threading.Thread(target=record)
+    recorder.start()
+    try:
+        poll()
+    finally:
+        stop.set()
+        recorder.join()
+        sys.setswitchinterval(interval)
+    assert errors == []
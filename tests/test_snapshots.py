@@ -0,0 +1,132 @@
+import os
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from db import close_writers, init_db, list_snapshots
+from snapshots import CROP_MODE, DROP_NEWEST, DuplicateIndex, SnapshotWriter, dhash
+
+
+def _frame():
+    return np.zeros((48, 64, 3), dtype=np.uint8)
+
+
+def test_one_image_shared_by_all_classes():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        writer = SnapshotWriter(tmp_dir)
+        assert writer.submit(_frame(), "session_a", {"person", "dog"}, "2026-02-11 10:00:00")
+        writer.close(timeout=5)
+
+        person = os.path.join(tmp_dir, "session_a", "person", "2026-02-11 10_00_00.jpg")
+        dog = os.path.join(tmp_dir, "session_a", "dog", "2026-02-11 10_00_00.jpg")
+        assert os.path.exists(person)
+        assert os.path.exists(dog)
+        assert writer.stats()["written"] == 1
+
+
+def test_drop_newest_when_queue_is_full():
+    release = threading.Event()
+
+    class StalledWriter(SnapshotWriter):
+        def _run(self):
+            release.wait()
+            super()._run()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        writer = StalledWriter(tmp_dir, queue_size=2, drop_policy=DROP_NEWEST)
+        accepted = [
+            writer.submit(_frame(), "session_a", ["person"], f"2026-02-11 10:00:0{idx}")
+            for idx in range(4)
+        ]
+        assert accepted == [True, True, False, False]
+        assert writer.stats()["queue_depth"] == 2
+        release.set()
+        writer.close(timeout=5)
+
+        files = sorted(os.listdir(os.path.join(tmp_dir, "session_a", "person")))
+        assert files == ["2026-02-11 10_00_00.jpg", "2026-02-11 10_00_01.jpg"]
+        assert writer.stats()["dropped"] == 2
+
+
+def _scene(seed):
+    rng = np.random.default_rng(seed)
+    return cv2.resize(rng.integers(0, 255, (12, 16, 3), dtype=np.uint8), (160, 120))
+
+
+def test_crop_mode_stores_padded_boxes_pointing_at_a_sampled_frame():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "detections.db")
+        init_db(db_path)
+        writer = SnapshotWriter(tmp_dir, db_path=db_path, mode=CROP_MODE, crop_padding=0.1)
+        boxes = [(20, 20, 60, 40, "person"), (100, 50, 150, 110, "dog")]
+        writer.submit(_scene(1), "session_a", {"person", "dog"}, "2026-02-11 10:00:00", boxes=boxes)
+        writer.submit(_scene(2), "session_a", {"person"}, "2026-02-11 10:00:01", boxes=boxes[:1])
+        writer.close(timeout=5)
+
+        crop = cv2.imread(os.path.join(tmp_dir, "session_a", "person", "2026-02-11 10_00_00_0.jpg"))
+        assert crop.shape[:2] == (24, 48)
+        rows = list_snapshots("session_a", db_path=db_path)
+        assert len(rows) == 3
+        assert {row["frame_path"] for row in rows} == {"session_a/_frames/2026-02-11 10_00_00.jpg"}
+        stats = writer.session_stats("session_a")
+        assert (stats["written"], stats["full_frames"]) == (3, 1)
+        assert stats["pixel_ratio"] < 0.2
+        close_writers()
+
+
+def test_crops_wait_for_a_frame_sample_in_flight():
+    started, release = threading.Event(), threading.Event()
+
+    class SlowFrameWriter(SnapshotWriter):
+        def _encode(self, image):
+            if image.shape == (120, 160, 3):
+                started.set()
+                release.wait(5)
+            return super()._encode(image)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "detections.db")
+        init_db(db_path)
+        writer = SlowFrameWriter(tmp_dir, db_path=db_path, workers=2, mode=CROP_MODE)
+        writer.submit(_scene(1), "session_a", {"person"}, "2026-02-11 10:00:00", boxes=[(20, 20, 60, 40, "person")])
+        assert started.wait(5)
+        writer.submit(_scene(2), "session_a", {"dog"}, "2026-02-11 10:00:01", boxes=[(100, 50, 150, 110, "dog")])
+        time.sleep(0.2)
+        release.set()
+        writer.close(timeout=5)
+
+        rows = list_snapshots("session_a", db_path=db_path)
+        assert {row["frame_path"] for row in rows} == {"session_a/_frames/2026-02-11 10_00_00.jpg"}
+        assert writer.session_stats("session_a")["full_frames"] == 1
+        close_writers()
+
+
+def test_near_duplicate_snapshots_are_skipped_per_class():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        writer = SnapshotWriter(tmp_dir, dedup_distance=4)
+        noisy = np.clip(_scene(1).astype(int) + 3, 0, 255).astype(np.uint8)
+        writer.submit(_scene(1), "session_a", {"person"}, "2026-02-11 10:00:00")
+        writer.submit(noisy, "session_a", {"person", "dog"}, "2026-02-11 10:00:01")
+        writer.submit(_scene(2), "session_a", {"person"}, "2026-02-11 10:00:02")
+        writer.close(timeout=5)
+
+        assert sorted(os.listdir(os.path.join(tmp_dir, "session_a", "person"))) == [
+            "2026-02-11 10_00_00.jpg",
+            "2026-02-11 10_00_02.jpg",
+        ]
+        assert os.listdir(os.path.join(tmp_dir, "session_a", "dog")) == ["2026-02-11 10_00_01.jpg"]
+        assert writer.session_stats("session_a")["duplicates"] == 1
+
+
+def test_duplicate_index_evicts_least_recently_used_keys():
+    index = DuplicateIndex(max_distance=2, recent=2, max_keys=2)
+    value = dhash(_scene(1))
+
+    assert not index.seen(("a", "person"), value)
+    assert index.seen(("a", "person"), value ^ 0b11)
+    assert not index.seen(("b", "person"), value)
+    assert not index.seen(("c", "person"), value)
+    assert not index.seen(("a", "person"), value)
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from cameras import parse_camera_sources
+from sources import FrameRecorder, ReplayCapture, open_source
+
+
+def _record(path, count, gap=0.05):
+    recorder = FrameRecorder(path)
+    for idx in range(count):
+        recorder.write(np.full((24, 32, 3), idx, dtype=np.uint8), timestamp=1000.0 + idx * gap)
+    recorder.close()
+
+
+def test_record_and_replay_round_trip():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "clip.frames")
+        _record(path, 5)
+        with open(path, "ab") as handle:
+            handle.write(b"partial record")
+
+        capture = open_source(f"{path}?speed=max")
+        frames = []
+        while True:
+            success, frame = capture.read()
+            if not success:
+                break
+            frames.append(frame)
+
+        assert [int(frame[0, 0, 0]) for frame in frames] == [0, 1, 2, 3, 4]
+        assert capture.timestamp == 1000.2
+        assert capture.get(cv2.CAP_PROP_FRAME_WIDTH) == 32
+        assert round(capture.get(cv2.CAP_PROP_FPS)) == 20
+        frames[0][:] = 255
+
+
+def test_replay_keeps_pace_scaled_by_speed_and_loops():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "clip.frames")
+        _record(path, 3, gap=0.1)
+
+        capture = ReplayCapture(path, speed=2.0, loop=True)
+        started = time.monotonic()
+        values = [int(capture.read()[1][0, 0, 0]) for _ in range(6)]
+        elapsed = time.monotonic() - started
+
+        assert values == [0, 1, 2, 0, 1, 2]
+        # Five gaps of 0.1s (counting the loop seam) at 2x speed.
+        assert 0.2 <= elapsed < 0.5
+
+
+def test_recording_capture_records_what_it_reads():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source, copy = os.path.join(tmp_dir, "a.frames"), os.path.join(tmp_dir, "b.frames")
+        _record(source, 4)
+
+        capture = open_source(f"{source}?speed=0", record_to=copy)
+        for _ in range(3):
+            capture.read()
+        capture.release()
+
+        replay = ReplayCapture(copy)
+        assert replay.frame_count == 3
+        assert not ReplayCapture(os.path.join(tmp_dir, "missing.frames")).isOpened()
+
+
+def test_camera_sources_accept_replay_specs():
+    assert parse_camera_sources("a=clips/a.frames?speed=2&loop=1,clips/b.frames?loop=1") == [
+        ("a", "clips/a.frames?speed=2&loop=1"),
+        ("cam1", "clips/b.frames?loop=1"),
+    ]
+
+
+def test_replay_speed_must_be_a_non_negative_number():
+    for speed in ("fast", "-1", "nan"):
+        with pytest.raises(ValueError, match="Invalid replay speed"):
+            open_source(f"lobby.frames?speed={speed}")
@@ -0,0 +1,67 @@
+import tempfile
+import time
+
+from db import TIMESTAMP_FORMAT, close_writers, init_db, list_rollups, record_rollups, to_epoch
+from stats import RollingStats
+
+
+def test_summary_aggregates_per_class_over_the_window():
+    stats = RollingStats(seconds=10)
+    stats.observe(["person", "person", "dog"], [80.0, 60.0, 50.0], now=100.2)
+    stats.observe(["person"], [90.0], now=100.7)
+    stats.observe([], [], now=101.1)
+
+    summary = stats.summary("second", window=5, now=101.5)
+    assert summary["frames"] == 3
+    assert summary["classes"]["person"] == {
+        "count": 3,
+        "confidence_min": 60.0,
+        "confidence_mean": 76.67,
+        "confidence_max": 90.0,
+        "occupancy": 0.667,
+    }
+    assert summary["classes"]["dog"]["occupancy"] == 0.333
+    assert stats.summary("second", window=1, now=101.5)["classes"] == {}
+
+
+def test_rings_stay_bounded_and_forget_old_buckets():
+    stats = RollingStats(seconds=4, classes=1)
+    for second in range(10):
+        stats.observe(["person", f"class{second % 3}"], [50.0, 50.0], now=float(second))
+
+    assert stats._rings["second"].count.shape == (4, 4)
+    series = stats.series("second", window=8, now=9.0)
+    assert series["buckets"] == [6, 7, 8, 9]
+    assert series["classes"]["person"]["count"] == [1, 1, 1, 1]
+    assert stats.summary("minute", window=1, now=9.0)["classes"]["person"]["count"] == 10
+
+
+def test_minute_rollups_round_trip_through_the_database():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = f"{tmp_dir}/detections.db"
+        init_db(db_path)
+        stats = RollingStats()
+        stats.observe(["person"], [70.0], now=60.0)
+        stats.observe([], [], now=61.0)
+        stats.observe(["person", "dog"], [90.0, 40.0], now=125.0)
+
+        record_rollups("test", stats.drain_minutes(), db_path=db_path)
+        assert stats.drain_minutes() == []
+        stats.observe(["person"], [50.0], now=126.0)
+        record_rollups("test", stats.drain_minutes(), db_path=db_path)
+
+        rows = list_rollups("test", db_path=db_path)
+        restored = RollingStats.from_rollups(rows)
+        assert restored.latest("minute") == 120
+        assert restored.summary("minute", 5, now=120) == stats.summary("minute", 5, now=126.0)
+        assert [row[1] for row in list_rollups("test", minutes=1, db_path=db_path)] == [120, 120, 120]
+        close_writers()
+
+
+def test_minutes_use_the_detection_epoch_scale():
+    before = to_epoch(time.strftime(TIMESTAMP_FORMAT)) // 60 * 60
+    stats = RollingStats()
+    stats.observe(["person"], [70.0])
+    after = to_epoch(time.strftime(TIMESTAMP_FORMAT)) // 60 * 60
+
+    assert stats.drain_minutes()[0][1] in {before, after}
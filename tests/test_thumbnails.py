@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from thumbnails import ThumbnailCache
+
+
+def _write_source(path):
+    cv2.imwrite(path, np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8))
+
+
+def test_thumbnail_is_generated_once_and_resized():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, "frame.jpg")
+        _write_source(source)
+        cache = ThumbnailCache(os.path.join(tmp_dir, "thumbs"), width=120)
+
+        first = cache.get(1, source)
+        second = cache.get(1, source)
+
+        assert first == second
+        assert cv2.imread(first).shape[:2] == (90, 120)
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hits"] == 1
+
+
+def test_least_recently_used_thumbnail_is_evicted():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, "frame.jpg")
+        _write_source(source)
+        cache = ThumbnailCache(os.path.join(tmp_dir, "thumbs"), width=120)
+        one = cache.get(1, source)
+        cache.max_bytes = os.path.getsize(one) * 2
+
+        cache.get(2, source)
+        cache.get(1, source)
+        cache.get(3, source)
+
+        assert os.path.exists(one)
+        assert not os.path.exists(os.path.join(tmp_dir, "thumbs", "2.jpg"))
+        assert cache.stats()["evictions"] == 1
+
+        reloaded = ThumbnailCache(os.path.join(tmp_dir, "thumbs"), max_bytes=cache.max_bytes)
+        assert reloaded.stats()["entries"] == 2
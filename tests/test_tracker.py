@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from tracker import HUNGARIAN, IoUTracker, greedy_assign, hungarian_assign, iou_matrix
+
+
+def test_iou_matrix_matches_pairwise_values():
+    boxes_a = [[0, 0, 10, 10], [20, 20, 30, 30]]
+    boxes_b = [[0, 0, 10, 10], [5, 0, 15, 10], [100, 100, 110, 110]]
+
+    iou = iou_matrix(boxes_a, boxes_b)
+
+    assert iou.shape == (2, 3)
+    assert iou[0, 0] == 1.0
+    assert np.isclose(iou[0, 1], 50 / 150)
+    assert iou[1].sum() == 0.0
+
+
+def test_assignment_respects_threshold():
+    iou = np.array([[0.9, 0.6], [0.8, 0.1]], dtype=np.float32)
+
+    assert greedy_assign(iou, 0.5) == [(0, 0)]
+
+
+def test_hungarian_assignment_maximises_total_iou():
+    pytest.importorskip("scipy")
+    iou = np.array([[0.9, 0.6], [0.8, 0.1]], dtype=np.float32)
+
+    assert sorted(hungarian_assign(iou, 0.5)) == [(0, 1), (1, 0)]
+
+
+def test_tracker_reports_new_objects_once():
+    tracker = IoUTracker(iou_threshold=0.5, max_age=2)
+
+    first = tracker.update([[0, 0, 10, 10], [50, 50, 60, 60]], [0, 1])
+    second = tracker.update([[1, 0, 11, 10], [50, 50, 60, 60]], [0, 1])
+
+    assert [is_new for _, is_new in first] == [True, True]
+    assert [is_new for _, is_new in second] == [False, False]
+    assert [track.id for track, _ in first] == [track.id for track, _ in second]
+
+
+def test_tracker_keeps_classes_apart():
+    tracker = IoUTracker(method=HUNGARIAN)
+    tracker.update([[0, 0, 10, 10]], [0])
+
+    (track, is_new), = tracker.update([[0, 0, 10, 10]], [1])
+
+    assert is_new
+    assert track.class_id == 1
+
+
+def test_tracker_evicts_stale_tracks():
+    tracker = IoUTracker(max_age=1)
+    tracker.update([[0, 0, 10, 10]], [0])
+    tracker.update([], [])
+    tracker.update([], [])
+
+    assert tracker.tracks == []
+    (_, is_new), = tracker.update([[0, 0, 10, 10]], [0])
+    assert is_new
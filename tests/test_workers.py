@@ -0,0 +1,115 @@
+import functools
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pytest
+
+from backends import Detections
+from workers import FrameRing, WorkerPool
+
+
+class ValueBackend:
+    """Reports the frame's first pixel as the confidence; exits the process once if asked."""
+
+    names = {0: "person"}
+    warmup_seconds = 0.0
+
+    def __init__(self, crash_marker=None):
+        self.crash_marker = crash_marker
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        if self.crash_marker and not os.path.exists(self.crash_marker):
+            open(self.crash_marker, "w").close()
+            os._exit(1)
+        return [
+            Detections(
+                np.array([[0, 0, frame.shape[1], frame.shape[0]]], dtype=np.float32),
+                np.array([frame[0, 0, 0] / 100], dtype=np.float32),
+                np.array([0], dtype=np.int64),
+            )
+            for frame in frames
+        ]
+
+
+_HELD_BY_PARENT_THREAD = threading.Lock()
+
+
+class LockingBackend(ValueBackend):
+    """Takes a lock that a parent thread holds while the crashed worker is restarted."""
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        with _HELD_BY_PARENT_THREAD:
+            return super().predict(frames, imgsz=imgsz, conf=conf, iou=iou)
+
+
+def test_frame_ring_round_trip():
+    ring = FrameRing(2, 4 * 4 * 3)
+    other = FrameRing(2, 4 * 4 * 3, name=ring.name)
+    try:
+        ring.write(1, np.full((4, 4, 3), 7, dtype=np.uint8))
+        assert other.view(1, (4, 4, 3)).min() == 7
+        assert other.view(0, (4, 4, 3)).max() == 0
+        with pytest.raises(ValueError):
+            ring.write(0, np.zeros((8, 8, 3), dtype=np.uint8))
+    finally:
+        other.close()
+        ring.close()
+
+
+def test_pool_returns_results_per_ticket_and_grows_the_ring():
+    pool = WorkerPool(ValueBackend, workers=2).start(wait=False)
+    try:
+        assert pool.wait_ready(timeout=30)
+        assert pool.stats()["state"] == "ready"
+        frames = [np.full((16, 16, 3), value, dtype=np.uint8) for value in (10, 20, 30, 40)]
+        tickets = [pool.submit(frame) for frame in frames[:2]]
+        assert [pool.result(ticket)[0].conf[0] for ticket in reversed(tickets)] == pytest.approx([0.2, 0.1])
+        assert [d.conf[0] for d in pool.predict(frames)] == pytest.approx([0.1, 0.2, 0.3, 0.4])
+
+        large = pool.predict([np.full((32, 48, 3), 50, dtype=np.uint8)])[0]
+        assert large.xyxy[0].tolist() == [0, 0, 48, 32]
+        assert pool.stats()["completed"] == 7
+    finally:
+        pool.close()
+
+
+def test_pool_restarts_a_crashed_worker_and_retries_the_frame():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        marker = os.path.join(tmp_dir, "crashed")
+        pool = WorkerPool(functools.partial(ValueBackend, crash_marker=marker), workers=1).start()
+        try:
+            detections = pool.predict([np.full((8, 8, 3), 60, dtype=np.uint8)])[0]
+            assert detections.conf[0] == pytest.approx(0.6)
+            stats = pool.stats()
+            assert stats["restarts"] == 1
+            assert stats["alive"] == 1
+        finally:
+            pool.close()
+
+
+def test_restarted_worker_is_not_forked_from_the_threaded_parent():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        marker = os.path.join(tmp_dir, "crashed")
+        pool = WorkerPool(functools.partial(LockingBackend, crash_marker=marker), workers=1).start()
+        holding, release = threading.Event(), threading.Event()
+
+        def hold():
+            with _HELD_BY_PARENT_THREAD:
+                holding.set()
+                release.wait(30)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        try:
+            holding.wait(5)
+            # A child forked from this process now would inherit the lock held forever.
+            ticket = pool.submit(np.full((8, 8, 3), 70, dtype=np.uint8))
+            detections, _ = pool.result(ticket, timeout=20)
+            assert detections.conf[0] == pytest.approx(0.7)
+            assert pool.stats()["restarts"] == 1
+        finally:
+            release.set()
+            holder.join()
+            pool.close()
@@ -0,0 +1,94 @@
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+
+
+class ThumbnailCache:
+    """Lazily generated, disk-backed thumbnails with an LRU size budget.
+
+    Thumbnails are stored as ``<cache_dir>/<key>.jpg``. Every hit moves the
+    entry to the back of the LRU order; when the cache grows past ``max_bytes``
+    the least recently used files are deleted.
+    """
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024, width=240, jpeg_quality=75):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.width = width
+        self.jpeg_quality = jpeg_quality
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_existing()
+
+    def get(self, key, source_path):
+        """Path of the thumbnail for ``key``, generating it from ``source_path`` if needed."""
+        key = str(key)
+        thumb_path = os.path.join(self.cache_dir, f"{key}.jpg")
+        with self._lock:
+            if key in self._entries and os.path.exists(thumb_path):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return thumb_path
+
+        frame = cv2.imread(source_path)
+        if frame is None:
+            return None
+        height, width = frame.shape[:2]
+        if width > self.width:
+            frame = cv2.resize(frame, (self.width, max(1, height * self.width // width)), interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return None
+        tmp_path = f"{thumb_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as handle:
+            handle.write(buffer.tobytes())
+        os.replace(tmp_path, thumb_path)
+
+        with self._lock:
+            self.misses += 1
+            self.total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = buffer.size
+            self.total_bytes += buffer.size
+            self._evict()
+        return thumb_path
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.cache_dir, f"{key}.jpg"))
+            except FileNotFoundError:
+                pass
+
+    def _load_existing(self):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".jpg"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self.total_bytes += size
+        self._evict()
@@ -0,0 +1,126 @@
+import itertools
+
+import numpy as np
+
+
+GREEDY = "greedy"
+HUNGARIAN = "hungarian"
+ASSIGN_METHODS = (GREEDY, HUNGARIAN)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between ``(N, 4)`` and ``(M, 4)`` xyxy boxes as an ``(N, M)`` array."""
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def greedy_assign(iou, threshold):
+    """Match rows to columns by descending IoU, skipping pairs below ``threshold``."""
+    if iou.size == 0:
+        return []
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols], kind="stable")
+    used_rows, used_cols, pairs = set(), set(), []
+    for idx in order:
+        row, col = int(rows[idx]), int(cols[idx])
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        pairs.append((row, col))
+    return pairs
+
+
+def hungarian_assign(iou, threshold):
+    """Optimal assignment maximising total IoU; falls back to greedy without SciPy."""
+    if iou.size == 0:
+        return []
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        return greedy_assign(iou, threshold)
+    rows, cols = linear_sum_assignment(-iou)
+    return [(int(row), int(col)) for row, col in zip(rows, cols) if iou[row, col] >= threshold]
+
+
+class Track:
+    __slots__ = ("id", "class_id", "box", "confidence", "hits", "misses")
+
+    def __init__(self, track_id, class_id, box, confidence):
+        self.id = track_id
+        self.class_id = class_id
+        self.box = box
+        self.confidence = confidence
+        self.hits = 1
+        self.misses = 0
+
+
+class IoUTracker:
+    """Associates per-frame boxes with tracks by class-aware IoU.
+
+    ``update`` returns ``(track, is_new)`` for every input box, so callers can
+    emit rows and snapshots once per object instead of once per frame. Tracks
+    not matched for more than ``max_age`` updates are evicted, which keeps the
+    per-frame cost bounded by the number of objects actually in view.
+    """
+
+    def __init__(self, iou_threshold=0.5, max_age=30, method=GREEDY):
+        if method not in ASSIGN_METHODS:
+            raise ValueError(f"Unknown assignment method '{method}'.")
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.method = method
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def reset(self):
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def update(self, boxes, class_ids, confidences=None):
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        class_ids = np.asarray(class_ids, dtype=np.int64).reshape(-1)
+        if confidences is None:
+            confidences = np.zeros(len(boxes), dtype=np.float32)
+
+        matches = {}
+        if self.tracks and len(boxes):
+            track_boxes = np.stack([track.box for track in self.tracks])
+            track_classes = np.array([track.class_id for track in self.tracks], dtype=np.int64)
+            iou = iou_matrix(boxes, track_boxes)
+            iou[class_ids[:, None] != track_classes[None, :]] = 0.0
+            assign = hungarian_assign if self.method == HUNGARIAN else greedy_assign
+            matches = dict(assign(iou, self.iou_threshold))
+
+        matched_tracks = set(matches.values())
+        for idx, track in enumerate(self.tracks):
+            if idx not in matched_tracks:
+                track.misses += 1
+
+        results = []
+        new_tracks = []
+        for det_idx in range(len(boxes)):
+            track_idx = matches.get(det_idx)
+            if track_idx is None:
+                track = Track(next(self._ids), int(class_ids[det_idx]), boxes[det_idx], float(confidences[det_idx]))
+                new_tracks.append(track)
+                results.append((track, True))
+                continue
+            track = self.tracks[track_idx]
+            track.box = boxes[det_idx]
+            track.confidence = float(confidences[det_idx])
+            track.hits += 1
+            track.misses = 0
+            results.append((track, False))
+
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_age] + new_tracks
+        return results
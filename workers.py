@@ -0,0 +1,475 @@
+import itertools
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from multiprocessing import connection, reduction, resource_tracker, shared_memory, util
+from multiprocessing.connection import Connection
+
+import numpy as np
+
+import metrics
+from backends import Detections, empty_detections
+
+
+class FrameRing:
+    """Fixed-size uint8 frame slots in one ``multiprocessing.shared_memory`` block.
+
+    The parent creates the ring and copies each frame into a slot once; worker
+    processes attach by ``name`` and read their slot in place.
+    """
+
+    def __init__(self, slots, slot_bytes, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1, slots * slot_bytes))
+        else:
+            self.shm = _attach(name)
+        self.name = self.shm.name
+
+    def view(self, slot, shape):
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, slot, frame):
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of {frame.nbytes} bytes does not fit a {self.slot_bytes} byte slot.")
+        self.view(slot, frame.shape)[...] = frame
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the block again. Workers share
+        # the parent's resource tracker (``WorkerPool.start`` launches it before
+        # forking), so that is a no-op; unregistering would drop the parent's entry.
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(worker_id, factory, tasks, results):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        backend = factory()
+    except Exception as exc:
+        results.send(("error", worker_id, None, repr(exc)))
+        return
+    results.send(("ready", worker_id, None, (backend.names, getattr(backend, "warmup_seconds", 0.0))))
+
+    ring = None
+    while True:
+        try:
+            task = tasks.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        ticket, ring_name, slot_bytes, slot, shape, imgsz, conf, iou = task
+        if ring is None or ring.name != ring_name:
+            if ring is not None:
+                ring.close()
+            ring = FrameRing(0, slot_bytes, name=ring_name)
+        started = time.perf_counter()
+        try:
+            detections = backend.predict([ring.view(slot, shape)], imgsz=imgsz, conf=conf, iou=iou)[0]
+        except Exception as exc:
+            results.send(("failed", worker_id, ticket, repr(exc)))
+            continue
+        results.send(("result", worker_id, ticket, (tuple(detections), time.perf_counter() - started)))
+    if ring is not None:
+        ring.close()
+
+
+def _spawner_main(control, parent_end, factory):
+    """Forks workers on request from ``WorkerPool``.
+
+    The pool starts this process before it has any threads, so every worker,
+    including restarts long after Flask, the pipeline and the writers are
+    running, is forked from a single-threaded copy. Each request is a worker
+    id followed by the fds of its task pipe, result pipe and liveness
+    sentinel; the reply is the new worker's pid.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    parent_end.close()
+    ctx = mp.get_context("fork")
+    while True:
+        if not control.poll(1.0):
+            mp.active_children()  # reap workers that exited
+            continue
+        try:
+            worker_id = control.recv()
+        except EOFError:
+            break
+        if worker_id is None:
+            break
+        tasks = Connection(reduction.recv_handle(control), writable=False)
+        results = Connection(reduction.recv_handle(control), readable=False)
+        sentinel = Connection(reduction.recv_handle(control), readable=False)
+        proc = ctx.Process(
+            target=_worker_main,
+            args=(worker_id, factory, tasks, results),
+            name=f"inference-worker-{worker_id}",
+            daemon=True,
+        )
+        proc.start()
+        # The worker keeps its inherited copies; its sentinel closes when it exits.
+        tasks.close()
+        results.close()
+        sentinel.close()
+        control.send(proc.pid)
+
+
+def _stop_spawner(control, spawner, timeout=5.0):
+    try:
+        control.send(None)
+    except OSError:
+        pass
+    control.close()
+    spawner.join(timeout)
+    if spawner.is_alive():
+        spawner.terminate()
+        spawner.join(timeout)
+
+
+class _ForkedWorker:
+    """Parent-side handle for a worker forked by the spawner process."""
+
+    def __init__(self, pid, sentinel):
+        self.pid = pid
+        self.sentinel = sentinel
+
+    def is_alive(self):
+        return not connection.wait([self.sentinel], 0)
+
+    def join(self, timeout=None):
+        connection.wait([self.sentinel], timeout)
+
+    def terminate(self):
+        try:
+            os.kill(self.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def close(self):
+        self.sentinel.close()
+
+
+class WorkerPool:
+    """Runs inference in ``workers`` child processes, each with its own model.
+
+    ``factory`` is called once in every worker to build its backend (e.g. a
+    ``functools.partial`` of ``load_backend``). Worker ``i`` owns slot ``i`` of
+    a shared-memory ``FrameRing``: ``submit`` copies the frame into an idle
+    worker's slot and sends only a small task tuple, and the worker sends back
+    the boxes. ``result`` returns them per ticket, so callers decide the order
+    frames are finished in. A worker that dies is restarted and its frame is
+    retried up to ``max_retries`` times before it is given up as empty.
+
+    ``predict`` makes the pool usable anywhere a backend is expected.
+
+    Workers are forked where the platform allows it: spawned children would
+    re-import the Flask module and open cameras and writers of their own.
+    Forks come from a spawner process that ``start`` forks first, so the pool
+    should be started before other threads are; restarts then never fork the
+    threaded parent.
+    """
+
+    def __init__(self, factory, workers=2, start_timeout=300.0, max_retries=1, start_method=None):
+        if start_method is None:
+            start_method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        self.factory = factory
+        self.workers = workers
+        self.start_timeout = start_timeout
+        self.max_retries = max_retries
+        self.names = {}
+        self.warmup_seconds = 0.0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.error = None
+        self.ready_seconds = None
+        self._started = None
+        self._ctx = mp.get_context(start_method)
+        self._procs = [None] * workers
+        self._tasks = [None] * workers
+        self._results = [None] * workers
+        self._busy = [None] * workers
+        self._ready = [False] * workers
+        self._jobs = {}
+        self._done = {}
+        self._ring = None
+        self._tickets = itertools.count(1)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._collector = None
+        self._spawner = None
+        self._control = None
+        self._stop_spawner = None
+
+    def start(self, wait=True):
+        """Fork the workers; with ``wait`` block until they have loaded their models.
+
+        Without ``wait``, frames submitted early queue until a worker is ready.
+        """
+        self._started = time.monotonic()
+        # Children started before the tracker exists would each launch their
+        # own, which unlinks the ring when that worker exits.
+        resource_tracker.ensure_running()
+        if self._ctx.get_start_method() == "fork":
+            self._start_spawner()
+        for idx in range(self.workers):
+            self._spawn(idx)
+        self._collector = threading.Thread(target=self._collect_loop, name="worker-results", daemon=True)
+        self._collector.start()
+
+        if wait and not self.wait_ready(self.start_timeout):
+            error = self.error or "timed out waiting for inference workers"
+            self.close()
+            raise RuntimeError(f"Inference workers failed to start: {error}")
+        return self
+
+    @property
+    def ready(self):
+        return self.error is None and all(self._ready)
+
+    @property
+    def state(self):
+        if self.error is not None:
+            return "failed"
+        return "ready" if all(self._ready) else "loading"
+
+    def wait_ready(self, timeout=None):
+        """True once every worker has loaded its model; False on timeout or failure."""
+        with self._cond:
+            self._cond.wait_for(lambda: all(self._ready) or self.error is not None, timeout)
+            return self.ready
+
+    def submit(self, frame, imgsz=None, conf=None, iou=None):
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        with self._cond:
+            while True:
+                if self._stop.is_set() or self.error is not None:
+                    raise RuntimeError(f"Inference workers unavailable: {self.error or 'pool closed'}")
+                idle = next((idx for idx, ticket in enumerate(self._busy) if ticket is None), None)
+                grow = self._ring is None or self._ring.slot_bytes < frame.nbytes
+                # A bigger ring replaces the old one, so wait until no worker reads it.
+                if idle is not None and not (grow and any(ticket is not None for ticket in self._busy)):
+                    break
+                self._cond.wait(0.5)
+
+            if grow:
+                if self._ring is not None:
+                    self._ring.close()
+                self._ring = FrameRing(self.workers, frame.nbytes)
+            self._ring.write(idle, frame)
+            ticket = next(self._tickets)
+            task = (ticket, self._ring.name, self._ring.slot_bytes, idle, frame.shape, imgsz, conf, iou)
+            self._busy[idle] = ticket
+            self._jobs[ticket] = [task, 0]
+            try:
+                self._tasks[idle].send(task)
+            except OSError:
+                # The worker is gone; ``_check_workers`` restarts it and resends the task.
+                pass
+        return ticket
+
+    def result(self, ticket, timeout=None):
+        """``(detections, seconds)`` for ``ticket`` once its worker is done."""
+        with self._cond:
+            finished = self._cond.wait_for(lambda: ticket in self._done or self._stop.is_set(), timeout)
+            outcome = self._done.pop(ticket, None)
+        if not finished or outcome is None:
+            raise RuntimeError("Inference worker did not return a result.")
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def predict(self, frames, imgsz=None, conf=None, iou=None):
+        tickets = [self.submit(frame, imgsz=imgsz, conf=conf, iou=iou) for frame in frames]
+        return [self.result(ticket)[0] for ticket in tickets]
+
+    def stats(self):
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "alive": sum(1 for proc in self._procs if proc is not None and proc.is_alive()),
+                "in_flight": sum(1 for ticket in self._busy if ticket is not None),
+                "completed": self.completed,
+                "failed": self.failed,
+                "restarts": self.restarts,
+                "state": self.state,
+                "ready_seconds": round(self.ready_seconds, 3) if self.ready_seconds is not None else None,
+                "error": self.error,
+            }
+
+    def close(self, timeout=5.0):
+        self._stop.set()
+        with self._cond:
+            # ``_check_workers`` re-checks ``_stop`` under the lock, so no
+            # restart replaces these after this point.
+            procs, task_pipes = list(self._procs), list(self._tasks)
+        for tasks in task_pipes:
+            if tasks is not None:
+                try:
+                    tasks.send(None)
+                except OSError:
+                    pass
+        for proc in procs:
+            if proc is None:
+                continue
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(timeout)
+            if isinstance(proc, _ForkedWorker):
+                proc.close()
+        for tasks in task_pipes:
+            if tasks is not None:
+                tasks.close()
+        if self._stop_spawner is not None:
+            self._stop_spawner()
+        if self._collector is not None and self._collector is not threading.current_thread():
+            self._collector.join(timeout)
+        with self._cond:
+            for idx, results in enumerate(self._results):
+                if results is not None:
+                    results.close()
+                    self._results[idx] = None
+            if self._ring is not None:
+                self._ring.close()
+                self._ring = None
+            self._cond.notify_all()
+
+    def _start_spawner(self):
+        self._control, spawner_end = self._ctx.Pipe()
+        self._spawner = self._ctx.Process(
+            target=_spawner_main,
+            args=(spawner_end, self._control, self.factory),
+            name="inference-spawner",
+        )
+        self._spawner.start()
+        spawner_end.close()
+        # The spawner is not daemonic (it has children), so stop it before
+        # multiprocessing joins it at interpreter exit.
+        self._stop_spawner = util.Finalize(
+            self, _stop_spawner, args=(self._control, self._spawner), exitpriority=15
+        )
+
+    def _spawn(self, idx):
+        # Each worker gets fresh pipes: one that died mid-message leaves its
+        # old ones unusable, but cannot wedge the others as a shared queue can.
+        for pipes in (self._tasks, self._results):
+            if pipes[idx] is not None:
+                pipes[idx].close()
+        if isinstance(self._procs[idx], _ForkedWorker):
+            self._procs[idx].close()
+        tasks, self._tasks[idx] = self._ctx.Pipe(duplex=False)
+        self._results[idx], results = self._ctx.Pipe(duplex=False)
+        self._ready[idx] = False
+        if self._spawner is None:
+            proc = self._ctx.Process(
+                target=_worker_main,
+                args=(idx, self.factory, tasks, results),
+                name=f"inference-worker-{idx}",
+                daemon=True,
+            )
+            proc.start()
+        else:
+            sentinel, keep_open = self._ctx.Pipe(duplex=False)
+            self._control.send(idx)
+            for conn in (tasks, results, keep_open):
+                reduction.send_handle(self._control, conn.fileno(), self._spawner.pid)
+            keep_open.close()
+            if not self._control.poll(10.0):
+                sentinel.close()
+                tasks.close()
+                results.close()
+                raise RuntimeError("worker spawner did not respond")
+            proc = _ForkedWorker(self._control.recv(), sentinel)
+        tasks.close()
+        results.close()
+        self._procs[idx] = proc
+
+    def _collect_loop(self):
+        while not self._stop.is_set():
+            readers = [results for results in self._results if results is not None]
+            for results in connection.wait(readers, timeout=0.5):
+                self._receive(results)
+            self._check_workers()
+
+    def _receive(self, results):
+        try:
+            kind, worker_id, ticket, payload = results.recv()
+        except (EOFError, OSError):
+            # The worker exited; stop polling its pipe until ``_check_workers`` restarts it.
+            idx = self._results.index(results)
+            results.close()
+            self._results[idx] = None
+            return
+        with self._cond:
+            if kind == "ready":
+                self._ready[worker_id] = True
+                if self.ready_seconds is None and all(self._ready):
+                    self.ready_seconds = time.monotonic() - self._started
+                self.names, warmup_seconds = payload
+                self.warmup_seconds = max(self.warmup_seconds, warmup_seconds)
+            elif kind == "error":
+                self.error = payload
+                self._fail_pending(RuntimeError(f"Inference worker {worker_id} failed to load: {payload}"))
+            elif kind == "result":
+                (xyxy, conf, cls), elapsed = payload
+                metrics.observe("worker_inference", elapsed)
+                self.completed += 1
+                self._finish(worker_id, ticket, (Detections(xyxy, conf, cls), elapsed))
+            elif kind == "failed":
+                self._finish(worker_id, ticket, RuntimeError(f"Inference worker {worker_id} failed: {payload}"))
+            self._cond.notify_all()
+
+    def _check_workers(self):
+        if self._stop.is_set() or self.error is not None:
+            return
+        for idx, proc in enumerate(self._procs):
+            if proc is None or proc.is_alive():
+                continue
+            with self._cond:
+                if self._stop.is_set():
+                    return
+                self.restarts += 1
+                try:
+                    self._spawn(idx)
+                except (OSError, RuntimeError) as exc:
+                    self.error = f"could not restart worker {idx}: {exc}"
+                    self._fail_pending(RuntimeError(f"Inference worker {idx} could not be restarted: {exc}"))
+                    self._cond.notify_all()
+                    return
+                ticket = self._busy[idx]
+                job = self._jobs.get(ticket)
+                if job is not None and job[1] < self.max_retries:
+                    job[1] += 1
+                    try:
+                        self._tasks[idx].send(job[0])
+                    except OSError:
+                        pass
+                elif job is not None:
+                    self.failed += 1
+                    self._finish(idx, ticket, (empty_detections(), 0.0))
+                self._cond.notify_all()
+
+    def _finish(self, worker_id, ticket, outcome):
+        if self._jobs.pop(ticket, None) is None:
+            return
+        if self._busy[worker_id] == ticket:
+            self._busy[worker_id] = None
+        self._done[ticket] = outcome
+
+    def _fail_pending(self, error):
+        for worker_id, ticket in enumerate(self._busy):
+            if ticket is not None:
+                self._finish(worker_id, ticket, error)